@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Warm claude processes for more-loop's task phase. Uses only stdlib.
+
+Every phase starts a new `claude -p` process, and only once its prompt has
+been assembled, so process startup lands between iterations. With
+--warm-agent, more-loop spawns the next task phase's process while verify
+is still running: its command line (model, system prompt, output format) is
+known by then, and the prompt follows on stdin. run_claude then attaches to
+it, and the agent's output and exit code are relayed as if it had just been
+started. If there is no warm agent, or it was started with a different
+command, attach runs the command itself.
+
+A warm agent lives in <run-dir>/.agent/, which its supervisor process has
+as working directory (attach renames the directory to claim it). claude
+itself runs in the directory spawn was called from, like a cold call:
+
+    cmd     the command, NUL-separated
+    pid     the supervisor's pid (also its process group)
+    prompt  written by attach; the supervisor feeds it to claude's stdin
+    out     claude's stdout, appended as it arrives
+    stderr  claude's stderr
+    rc      claude's exit code, written once out is complete
+
+An agent that isn't claimed stops itself after MAX_IDLE seconds, or once
+the more-loop process that spawned it has exited.
+
+Usage:
+    agent_pool.py spawn <run-dir> <owner-pid> <cmd...>
+    agent_pool.py attach <run-dir> <prompt> <cmd...>
+    agent_pool.py discard <run-dir>
+"""
+
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from state_indexer import atomic_write
+
+AGENT_DIR = ".agent"
+POLL_INTERVAL = 0.05
+MAX_IDLE = 1800
+COPY_BLOCK = 64 * 1024
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def encode_cmd(cmd):
+    return b"\0".join(os.fsencode(arg) for arg in cmd)
+
+
+def read_pid(agent_dir):
+    try:
+        return int((agent_dir / "pid").read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def discard(run_dir):
+    """Stop the run's warm agent, if it has one."""
+    agent_dir = Path(run_dir) / AGENT_DIR
+    pid = read_pid(agent_dir)
+    if pid is not None:
+        try:
+            os.killpg(pid, signal.SIGTERM)
+        except OSError:
+            pass
+    shutil.rmtree(agent_dir, ignore_errors=True)
+
+
+def spawn(run_dir, owner_pid, cmd):
+    """Start a warm agent for cmd in the background; returns the supervisor's pid."""
+    discard(run_dir)
+    agent_dir = Path(run_dir) / AGENT_DIR
+    agent_dir.mkdir()
+    (agent_dir / "cmd").write_bytes(encode_cmd(cmd))
+    pid = os.fork()
+    if pid:
+        atomic_write(agent_dir / "pid", str(pid))
+        return pid
+    # Supervisor: detached from the caller, so it outlives this command
+    rc = 1
+    try:
+        os.setsid()
+        workdir = os.getcwd()
+        os.chdir(agent_dir)
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        rc = supervise(owner_pid, cmd, workdir)
+    finally:
+        os._exit(rc)
+
+
+def supervise(owner_pid, cmd, workdir, max_idle=MAX_IDLE):
+    """Run cmd in workdir with its prompt still to come; relay it to ./out once ./prompt appears."""
+    with open("stderr", "wb") as stderr:
+        proc = subprocess.Popen(cmd, cwd=workdir, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=stderr)
+
+    def stop(signum, _frame):
+        proc.kill()
+        os._exit(128 + signum)
+
+    signal.signal(signal.SIGTERM, stop)
+    deadline = time.monotonic() + max_idle
+    while not os.path.exists("prompt"):
+        if time.monotonic() > deadline or not pid_alive(owner_pid) or proc.poll() is not None:
+            # Not claimed in time, or no longer usable: attach will run the
+            # command itself if it comes now
+            proc.kill()
+            proc.wait()
+            shutil.rmtree(os.getcwd(), ignore_errors=True)
+            return 0
+        time.sleep(POLL_INTERVAL)
+    try:
+        with open("prompt", "rb") as f:
+            proc.stdin.write(f.read())
+        proc.stdin.close()
+    except OSError:
+        # Exited early: its output says why
+        pass
+    with open("out", "ab") as out:
+        while True:
+            data = proc.stdout.read1(COPY_BLOCK)
+            if not data:
+                break
+            out.write(data)
+            out.flush()
+    rc = proc.wait()
+    atomic_write(Path("rc"), str(rc))
+    return 0
+
+
+def claim(run_dir, cmd):
+    """Take the run's warm agent if it was started for cmd; returns its directory."""
+    agent_dir = Path(run_dir) / AGENT_DIR
+    try:
+        if (agent_dir / "cmd").read_bytes() != encode_cmd(cmd):
+            return None
+    except OSError:
+        return None
+    pid = read_pid(agent_dir)
+    if pid is None or not pid_alive(pid):
+        return None
+    claimed = agent_dir.with_name(f"{AGENT_DIR}.{os.getpid()}")
+    try:
+        os.rename(agent_dir, claimed)
+    except OSError:
+        return None
+    return claimed
+
+
+def attach(run_dir, prompt, cmd, stdout=None, stderr=None):
+    """Run cmd with prompt on a warm agent; returns its exit code.
+
+    Without a usable agent, replaces this process with cmd + [prompt].
+    """
+    agent_dir = claim(run_dir, cmd)
+    if agent_dir is not None:
+        try:
+            atomic_write(agent_dir / "prompt", prompt)
+        except OSError:
+            # The agent gave up just as it was claimed
+            agent_dir = None
+    if agent_dir is None:
+        os.execvp(cmd[0], cmd + [prompt])
+    stdout = stdout or sys.stdout.buffer
+    stderr = stderr or sys.stderr.buffer
+    pid = read_pid(agent_dir)
+
+    def stop(signum, _frame):
+        try:
+            os.killpg(pid, signal.SIGTERM)
+        except OSError:
+            pass
+        shutil.rmtree(agent_dir, ignore_errors=True)
+        os._exit(128 + signum)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    out_path, rc_path = agent_dir / "out", agent_dir / "rc"
+    rc = None
+    out = None
+    try:
+        while True:
+            done = rc_path.exists()
+            if out is None and out_path.exists():
+                out = open(out_path, "rb")
+            while out is not None:
+                data = out.read(COPY_BLOCK)
+                if not data:
+                    break
+                stdout.write(data)
+                stdout.flush()
+            if done:
+                rc = int(rc_path.read_text())
+                break
+            if not pid_alive(pid) and not rc_path.exists():
+                if out is None:
+                    # It gave up before taking the prompt
+                    shutil.rmtree(agent_dir, ignore_errors=True)
+                    os.execvp(cmd[0], cmd + [prompt])
+                rc = 1
+                break
+            time.sleep(POLL_INTERVAL)
+        try:
+            stderr.write((agent_dir / "stderr").read_bytes())
+            stderr.flush()
+        except OSError:
+            pass
+    finally:
+        if out is not None:
+            out.close()
+        shutil.rmtree(agent_dir, ignore_errors=True)
+    return rc
+
+
+def main(argv):
+    if len(argv) >= 4 and argv[0] == "spawn" and argv[2].isdigit():
+        spawn(argv[1], int(argv[2]), argv[3:])
+        return 0
+    if len(argv) >= 4 and argv[0] == "attach":
+        return attach(argv[1], argv[2], argv[3:])
+    if len(argv) == 2 and argv[0] == "discard":
+        discard(argv[1])
+        return 0
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Iteration artifacts, plain or gzip-compressed, read in pieces. Uses only stdlib.
+
+Verify output and claude's stream log (iterations/N-verify.md, N.log) can
+reach hundreds of kilobytes per iteration. With --compress-artifacts,
+more-loop gzips them to N-verify.md.gz / N.log.gz once an iteration is old
+enough that no prompt reads it any more. Everything else keeps using the
+plain name: locate() finds whichever form exists and open_artifact() reads
+both the same way.
+
+Reads are seek-based. read_range() and tail() return at most the bytes they
+were asked for (a compressed file is decompressed as a stream up to that
+point), so serving a slice of a large log costs the slice, not the log.
+
+Usage (called by more-loop at the start of each iteration):
+    artifacts.py compress <run-dir> <iteration>
+        gzip the verify output and logs of iterations <= iteration - KEEP_PLAIN
+"""
+
+import gzip
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+GZ_SUFFIX = ".gz"
+# Served at /iterations/<n>/<kind>
+ARTIFACTS = {
+    "summary": "{n}.md",
+    "verify": "{n}-verify.md",
+    "honesty": "{n}-honesty.md",
+    "checks": "{n}-verify.json",
+    "log": "{n}.log",
+}
+COMPRESSIBLE_RE = re.compile(r"^(\d+)(-verify\.md|\.log)$")
+# The previous iteration's verify output goes into the next task prompt
+KEEP_PLAIN = 2
+# Below this, gzip saves too little to be worth a decompression on every read
+COMPRESS_MIN_SIZE = 16 * 1024
+COPY_BLOCK = 64 * 1024
+
+
+def plain_name(name):
+    """The name an artifact is known by, whether or not it is compressed."""
+    return name[:-len(GZ_SUFFIX)] if name.endswith(GZ_SUFFIX) else name
+
+
+def locate(path):
+    """The file holding the artifact at path (plain or .gz), or None."""
+    path = Path(path)
+    if path.is_file():
+        return path
+    compressed = path.with_name(path.name + GZ_SUFFIX)
+    return compressed if compressed.is_file() else None
+
+
+def is_compressed(path):
+    return str(path).endswith(GZ_SUFFIX)
+
+
+def open_artifact(path):
+    """Binary file object over the artifact's uncompressed bytes."""
+    return gzip.open(path, "rb") if is_compressed(path) else open(path, "rb")
+
+
+def size(path):
+    """Uncompressed size of a located artifact.
+
+    For a .gz file this is the ISIZE trailer (size mod 2**32): compress()
+    writes a single gzip member, so it is exact below 4 GiB.
+    """
+    if not is_compressed(path):
+        return os.stat(path).st_size
+    with open(path, "rb") as f:
+        f.seek(-4, os.SEEK_END)
+        return struct.unpack("<I", f.read(4))[0]
+
+
+def read_text(path):
+    """Whole artifact as text ('' if it doesn't exist or can't be read)."""
+    found = locate(path)
+    if found is None:
+        return ""
+    try:
+        with open_artifact(found) as f:
+            return f.read().decode(errors="replace")
+    except (OSError, EOFError):
+        return ""
+
+
+def read_first_line(path):
+    found = locate(path)
+    if found is None:
+        return ""
+    try:
+        with open_artifact(found) as f:
+            return f.readline().decode(errors="replace")
+    except (OSError, EOFError):
+        return ""
+
+
+def read_range(f, start, length):
+    """Up to length bytes of an open artifact starting at start."""
+    f.seek(start)
+    return f.read(length)
+
+
+def tail(f, total, lines, limit):
+    """(offset, data) for the last `lines` lines of an open artifact.
+
+    Reads at most `limit` bytes from the end. If the window holds fewer
+    lines, the partial line it starts in is dropped unless it is all there is.
+    """
+    start = max(0, total - limit)
+    data = read_range(f, start, total - start)
+    end = len(data) - 1 if data.endswith(b"\n") else len(data)
+    cut = end
+    for _ in range(lines):
+        cut = data.rfind(b"\n", 0, cut)
+        if cut < 0:
+            break
+    if cut >= 0:
+        cut += 1
+    elif start > 0:
+        newline = data.find(b"\n")
+        cut = newline + 1 if 0 <= newline < end else 0
+    else:
+        cut = 0
+    return start + cut, data[cut:]
+
+
+def compress(path):
+    """Replace path with path.gz, keeping its mtime. Returns the new path."""
+    path = Path(path)
+    st = path.stat()
+    target = path.with_name(path.name + GZ_SUFFIX)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+    try:
+        with open(path, "rb") as src, os.fdopen(fd, "wb") as raw, \
+                gzip.GzipFile(filename=path.name, mode="wb", fileobj=raw, mtime=int(st.st_mtime)) as dst:
+            shutil.copyfileobj(src, dst, COPY_BLOCK)
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.rename(tmp, str(target))
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    path.unlink()
+    return target
+
+
+def compress_old(run_dir, iteration, keep=KEEP_PLAIN, min_size=COMPRESS_MIN_SIZE):
+    """Compress large verify outputs and logs of iterations <= iteration - keep."""
+    iter_dir = Path(run_dir) / "iterations"
+    done = []
+    try:
+        entries = list(os.scandir(iter_dir))
+    except OSError:
+        return done
+    for entry in entries:
+        m = COMPRESSIBLE_RE.match(entry.name)
+        if not m or int(m.group(1)) > iteration - keep:
+            continue
+        try:
+            if not entry.is_file() or entry.stat().st_size < min_size:
+                continue
+            done.append(compress(entry.path))
+        except OSError:
+            continue
+    return sorted(done)
+
+
+def main(argv):
+    if len(argv) != 3 or argv[0] != "compress" or not argv[2].isdigit():
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+    for path in compress_old(argv[1], int(argv[2])):
+        print(path.name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
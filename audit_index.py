@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""Per-file audit verdicts, for auditing only what changed. Uses only stdlib.
+
+The first audit (once every task is done) reads the whole implementation and
+writes <run-dir>/audit.md, including a File Ratings table: one row per
+source file with its rating and the tasks it implements. `record` keeps
+those ratings in <run-dir>/audit.json, keyed by the git blob hash each file
+had, together with the blob hash of every file in the working tree and the
+tasks that were done.
+
+When more tasks get done after that (a re-plan, or a resumed run with added
+tasks), `plan` lists what an audit has to look at again: the new tasks, the
+files whose blob changed since the last audit, and the earlier tasks those
+files were rated for. The audit agent reads only that and writes an update
+in the same format, which `merge` folds into audit.json and audit.md. Ratings
+of tasks and files that weren't re-examined, and earlier priority fixes that
+don't mention them, are kept.
+
+Outside a git work tree no file hashes are kept; `plan` then lists only the
+tasks.
+
+Usage (called by more-loop's run_audit_iteration):
+    audit_index.py pending <run-dir>                  exit 0 if tasks were done since the last audit
+    audit_index.py plan <run-dir>                     what to re-audit, as prompt markdown
+    audit_index.py record <run-dir> <iteration>       index audit.md after a full audit
+    audit_index.py merge <run-dir> <iteration> <file> fold an audit update into audit.md
+
+`pending` and `plan` exit 1 if the run has no audit index or nothing to re-audit.
+"""
+
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from state_indexer import atomic_write
+from verify_cache import git, working_tree_index
+
+INDEX_FILE = "audit.json"
+REPORT_FILE = "audit.md"
+DONE_TASK_RE = re.compile(r'^- \[x\] (.+)$', re.MULTILINE)
+SECTION_RE = re.compile(r'^## +(.+?)\s*$', re.MULTILINE)
+CELL_SPLIT_RE = re.compile(r'(?<!\\)\|')
+FIX_RE = re.compile(r'^\s*\d+[.)]\s+(.+)$', re.MULTILINE)
+RATINGS = ("SOLID", "WEAK", "INCOMPLETE")
+# Longest list of changed files put into the prompt
+MAX_LISTED = 200
+
+
+def tree_files(runs_root):
+    """{path: blob hash} for every file in the working tree, or None outside git."""
+    with working_tree_index(runs_root) as snapshot:
+        if snapshot is None:
+            return None
+        env, top = snapshot
+        try:
+            listing = git("ls-files", "-s", "-z", env=env, cwd=top)
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    files = {}
+    for entry in listing.split("\0"):
+        meta, _, path = entry.partition("\t")
+        fields = meta.split()
+        if path and len(fields) == 3:
+            files[path] = fields[1]
+    return files
+
+
+def done_tasks(run_dir):
+    try:
+        text = (Path(run_dir) / "tasks.md").read_text()
+    except (OSError, UnicodeDecodeError):
+        return []
+    return [task.strip() for task in DONE_TASK_RE.findall(text)]
+
+
+def _key(text):
+    return re.sub(r'\s+', " ", text.replace("`", "")).strip().rstrip(".").lower()
+
+
+def same_task(a, b):
+    """Whether two task names refer to the same task (the audit may shorten them)."""
+    a, b = _key(a), _key(b)
+    return bool(a and b) and (a == b or a in b or b in a)
+
+
+def clean_path(cell):
+    """'`src/app.py:12`' -> 'src/app.py'."""
+    path = cell.replace("`", "").strip()
+    return re.sub(r':\d+(-\d+)?$', "", path)
+
+
+def clean_rating(cell):
+    word = cell.replace("*", "").strip().split(" ", 1)[0].upper()
+    return word if word in RATINGS else cell.strip()
+
+
+def _cell(text):
+    return str(text).replace("\n", " ").replace("|", "\\|")
+
+
+def _uncell(text):
+    return text.replace("\\|", "|").strip()
+
+
+# ── Report parsing ──
+
+def sections(text):
+    """{heading (lowercase): body} for the report's ## sections."""
+    found = {}
+    matches = list(SECTION_RE.finditer(text))
+    for m, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(text)
+        found[m.group(1).lower()] = text[m.end():end].strip()
+    return found
+
+
+def table_rows(body):
+    """Cells of a markdown table's body rows (header and separator skipped)."""
+    rows = []
+    lines = [line.strip() for line in body.splitlines() if line.strip().startswith("|")]
+    for line in lines[1:]:
+        cells = [_uncell(c) for c in CELL_SPLIT_RE.split(line.strip("|"))]
+        if all(set(c) <= set("-: ") for c in cells):
+            continue
+        rows.append(cells)
+    return rows
+
+
+def parse_report(text):
+    """The summary, task ratings, file ratings and priority fixes of an audit report."""
+    parts = sections(text)
+    tasks = []
+    for cells in table_rows(parts.get("task ratings", "")):
+        if len(cells) >= 2 and cells[0]:
+            tasks.append({"task": cells[0], "rating": clean_rating(cells[1]),
+                          "issues": cells[2] if len(cells) > 2 else ""})
+    files = []
+    for cells in table_rows(parts.get("file ratings", "")):
+        if len(cells) >= 2 and clean_path(cells[0]):
+            names = cells[2] if len(cells) > 2 else ""
+            files.append({"path": clean_path(cells[0]), "rating": clean_rating(cells[1]),
+                          "tasks": [t.strip() for t in names.split(";") if t.strip()],
+                          "issues": cells[3] if len(cells) > 3 else ""})
+    return {
+        "summary": parts.get("audit summary", ""),
+        "tasks": tasks,
+        "files": files,
+        "fixes": [fix.strip() for fix in FIX_RE.findall(parts.get("priority fixes", ""))],
+    }
+
+
+# ── Index ──
+
+def load(run_dir):
+    try:
+        index = json.loads((Path(run_dir) / INDEX_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+    return index if isinstance(index, dict) else None
+
+
+def save(run_dir, index):
+    atomic_write(Path(run_dir) / INDEX_FILE, json.dumps(index, indent=1, sort_keys=True) + "\n")
+
+
+def record(run_dir, iteration):
+    """Index a full audit's audit.md. Returns the index."""
+    run_dir = Path(run_dir)
+    report = parse_report((run_dir / REPORT_FILE).read_text())
+    tree = tree_files(run_dir.parent)
+    index = {
+        "iteration": int(iteration),
+        "tree": tree,
+        "tasks": done_tasks(run_dir),
+        "task_ratings": [dict(row, iteration=int(iteration)) for row in report["tasks"]],
+        "files": {},
+        "summary": report["summary"],
+        "fixes": report["fixes"],
+        "history": [{"iteration": int(iteration), "mode": "full",
+                     "tasks": len(report["tasks"]), "files": len(report["files"])}],
+    }
+    _add_files(index, report["files"], tree, iteration)
+    save(run_dir, index)
+    return index
+
+
+def _add_files(index, rows, tree, iteration):
+    for row in rows:
+        index["files"][row["path"]] = {
+            "blob": (tree or {}).get(row["path"]),
+            "rating": row["rating"],
+            "tasks": row["tasks"],
+            "issues": row["issues"],
+            "iteration": int(iteration),
+        }
+
+
+def new_tasks(run_dir, index):
+    """Tasks done now that weren't done at the last audit."""
+    audited = index.get("tasks") or []
+    return [task for task in done_tasks(run_dir) if not any(same_task(task, a) for a in audited)]
+
+
+def pending(run_dir):
+    index = load(run_dir)
+    return index is not None and bool(new_tasks(run_dir, index))
+
+
+def plan(run_dir):
+    """What the next audit has to look at, or None if nothing is due.
+
+    {"since": iteration, "changed": [(path, added|modified|deleted)],
+     "tasks": [(task, reason)], "ratings": [earlier task rows],
+     "files": {path: earlier file entry}}
+    """
+    run_dir = Path(run_dir)
+    index = load(run_dir)
+    if index is None:
+        return None
+    fresh = new_tasks(run_dir, index)
+    if not fresh:
+        return None
+    done = done_tasks(run_dir)
+
+    old_tree = index.get("tree")
+    tree = tree_files(run_dir.parent) if old_tree is not None else None
+    changed = []
+    if tree is not None:
+        changed = [(path, "added" if path not in old_tree else "modified")
+                   for path, blob in sorted(tree.items()) if old_tree.get(path) != blob]
+        changed += [(path, "deleted") for path in sorted(old_tree) if path not in tree]
+    changed_paths = {path for path, _ in changed}
+
+    tasks = [(task, "done since the last audit") for task in fresh]
+    touched = {}
+    for path, entry in sorted(index.get("files", {}).items()):
+        if path not in changed_paths:
+            continue
+        for name in entry.get("tasks", []):
+            task = next((t for t in done if same_task(t, name)), None)
+            if task is not None and task not in fresh:
+                touched.setdefault(task, []).append(path)
+    tasks += [(task, "its files changed: " + ", ".join(paths)) for task, paths in touched.items()]
+
+    names = [task for task, _ in tasks]
+    return {
+        "since": index.get("iteration"),
+        "changed": changed,
+        "tasks": tasks,
+        "ratings": [row for row in index.get("task_ratings", [])
+                    if any(same_task(row["task"], name) for name in names)],
+        "files": {path: entry for path, entry in index.get("files", {}).items() if path in changed_paths},
+    }
+
+
+def format_plan(due):
+    lines = ["## Tasks to audit:"]
+    lines += [f"- {task} ({reason})" for task, reason in due["tasks"]]
+    lines += ["", f"## Files changed since the last audit (iteration {due['since']}):"]
+    if not due["changed"]:
+        lines.append("(none tracked — outside a git work tree, or no file changed)")
+    lines += [f"- {path} ({status})" for path, status in due["changed"][:MAX_LISTED]]
+    if len(due["changed"]) > MAX_LISTED:
+        lines.append(f"- ... and {len(due['changed']) - MAX_LISTED} more")
+    if due["ratings"] or due["files"]:
+        lines += ["", "## Earlier ratings (superseded by this audit):"]
+        lines += [f"- {row['task']}: {row['rating']} — {row['issues'] or '—'}" for row in due["ratings"]]
+        lines += [f"- {path}: {entry['rating']} — {entry.get('issues') or '—'}"
+                  for path, entry in sorted(due["files"].items())]
+    return "\n".join(lines) + "\n"
+
+
+def merge(run_dir, iteration, update_path):
+    """Fold an incremental audit's report into audit.json and audit.md."""
+    run_dir = Path(run_dir)
+    index = load(run_dir)
+    if index is None:
+        raise ValueError(f"no {INDEX_FILE} in {run_dir}")
+    update = parse_report(Path(update_path).read_text())
+    tree = tree_files(run_dir.parent) if index.get("tree") is not None else None
+
+    ratings = index.get("task_ratings", [])
+    for row in update["tasks"]:
+        row = dict(row, iteration=int(iteration))
+        at = next((i for i, old in enumerate(ratings) if same_task(old["task"], row["task"])), None)
+        if at is None:
+            ratings.append(row)
+        else:
+            ratings[at] = row
+    index["task_ratings"] = ratings
+    if tree is not None:
+        index["files"] = {path: entry for path, entry in index.get("files", {}).items() if path in tree}
+    _add_files(index, update["files"], tree, iteration)
+
+    # Earlier fixes about what was just re-audited are replaced by the new ones
+    redone = [row["task"] for row in update["tasks"]] + [row["path"] for row in update["files"]]
+    kept = [fix for fix in index.get("fixes", [])
+            if not any(_key(name) in _key(fix) for name in redone if _key(name))]
+    index["fixes"] = update["fixes"] + kept
+    if update["summary"]:
+        index["summary"] = update["summary"]
+    index["iteration"] = int(iteration)
+    index["tree"] = tree
+    index["tasks"] = done_tasks(run_dir)
+    index.setdefault("history", []).append({"iteration": int(iteration), "mode": "incremental",
+                                             "tasks": len(update["tasks"]), "files": len(update["files"])})
+    save(run_dir, index)
+    atomic_write(run_dir / REPORT_FILE, render(index))
+    return index
+
+
+def render(index):
+    """audit.md for an index, in the format the audit prompt asks for."""
+    history = index.get("history", [])
+    audits = ", ".join(
+        f"iteration {h['iteration']} ({h['mode']}"
+        + (f": {h['tasks']} tasks, {h['files']} files re-examined)" if h["mode"] != "full" else ")")
+        for h in history)
+    lines = ["## Audit Summary", index.get("summary") or "—", ""]
+    if audits:
+        lines += [f"_Audits: {audits}._", ""]
+    lines += ["## Task Ratings", "", "| Task | Rating | Issues |", "|------|--------|--------|"]
+    lines += [f"| {_cell(r['task'])} | {_cell(r['rating'])} | {_cell(r['issues'] or '—')} |"
+              for r in index.get("task_ratings", [])]
+    lines += ["", "## File Ratings", "", "| File | Rating | Tasks | Issues |",
+              "|------|--------|-------|--------|"]
+    lines += [f"| {_cell(path)} | {_cell(e['rating'])} | {_cell('; '.join(e['tasks']) or '—')} "
+              f"| {_cell(e['issues'] or '—')} |"
+              for path, e in sorted(index.get("files", {}).items())]
+    lines += ["", "## Priority Fixes"]
+    lines += [f"{n}. {fix}" for n, fix in enumerate(index.get("fixes", []), 1)]
+    return "\n".join(lines) + "\n"
+
+
+def main(argv):
+    try:
+        if len(argv) == 2 and argv[0] == "pending":
+            return 0 if pending(argv[1]) else 1
+        if len(argv) == 2 and argv[0] == "plan":
+            due = plan(argv[1])
+            if due is None:
+                return 1
+            sys.stdout.write(format_plan(due))
+            return 0
+        if len(argv) == 3 and argv[0] == "record" and argv[2].isdigit():
+            index = record(argv[1], argv[2])
+            print(f"{len(index['task_ratings'])} tasks, {len(index['files'])} files")
+            return 0
+        if len(argv) == 4 and argv[0] == "merge" and argv[2].isdigit():
+            index = merge(argv[1], argv[2], argv[3])
+            last = index["history"][-1]
+            print(f"{last['tasks']} tasks, {last['files']} files")
+            return 0
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""Benchmarks for the state pipeline and the dashboard server. Uses only stdlib.
+
+Generates synthetic run directories (iteration summaries, verify logs of
+realistic sizes, honesty checks, tasks.md) at several scales. Then it measures:
+
+  state    state_indexer.write_state for a cold index, a warm index with no
+           changes and an incremental update (one new iteration). It also
+           measures the state_indexer.py CLI as more-loop's write_state_json
+           runs it, interpreter startup included. Records the sizes of
+           state.json and .state-index.json.
+  server   a DashboardServer over the largest run, load-tested by concurrent
+           pollers (GET /state.json, /iterations?since=R, /iterations/<n>)
+           and POSTers (/reviews, /test-guide), while a background writer
+           process keeps adding iterations the way a live loop does. Reports
+           p50/p99 latency per endpoint and overall throughput.
+
+Results are written as JSON. `compare` diffs two result files and exits 1
+if a metric regressed by more than the threshold, so runs from two commits
+can be checked against each other.
+
+Usage:
+    bench.py run [--scales 10,100,1000,5000] [--repeat 5] [--pollers 8]
+                 [--posters 2] [--duration 5] [--output results.json]
+    bench.py compare <baseline.json> <current.json> [--threshold 0.25]
+"""
+
+import argparse
+import http.client
+import json
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+import state_indexer
+
+RESULTS_VERSION = 1
+DEFAULT_SCALES = (10, 100, 1000, 5000)
+# Verify log sizes in bytes and how often each occurs; most checks print a
+# short summary, a few dump a long test log
+VERIFY_SIZES = ((1024, 40), (4096, 35), (16384, 20), (65536, 5))
+FAIL_RATE = 0.2
+SEED = 1234
+STATE_ARGS = ("task", "Implement the next task", "opus", 0, 0, 0)
+
+
+def verify_log(rng, size, passed):
+    lines = ["PASS" if passed else "FAIL: 1 check failed", ""]
+    total = 0
+    n = 0
+    while total < size:
+        n += 1
+        status = "PASSED" if passed or n % 7 else "FAILED"
+        line = f"tests/test_module_{n % 40}.py::test_case_{n} {status} [{rng.randint(0, 100):3d}%]"
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def generate_run(root, iterations, seed=SEED):
+    """Create a synthetic run directory with `iterations` finished iterations."""
+    rng = random.Random(seed + iterations)
+    run_dir = Path(root) / f"run-{iterations}"
+    iter_dir = run_dir / "iterations"
+    iter_dir.mkdir(parents=True)
+    sizes, weights = zip(*VERIFY_SIZES)
+    for n in range(1, iterations + 1):
+        passed = rng.random() >= FAIL_RATE
+        (iter_dir / f"{n}.md").write_text(
+            f"# Iteration {n}\n\nImplemented task {n}.\n\n" + "- changed src/module_%d.py\n" % n * 20)
+        (iter_dir / f"{n}-verify.md").write_text(
+            verify_log(rng, rng.choices(sizes, weights)[0], passed))
+        (iter_dir / f"{n}-honesty.md").write_text(
+            "HONEST\n\nThe summary matches the diff.\n" if passed else "DISHONEST\n\nTests were skipped.\n")
+    tasks = [f"- [x] Task {n}: implement module_{n}" for n in range(1, iterations + 1)]
+    tasks += [f"- [ ] Task {n}: implement module_{n}" for n in range(iterations + 1, iterations + 11)]
+    (run_dir / "tasks.md").write_text("# Tasks\n\n" + "\n".join(tasks) + "\n")
+    (run_dir / "acceptance.md").write_text(
+        "# Acceptance\n\n" + "".join(f"- [ ] Criterion {n}\n" for n in range(1, 21)))
+    (run_dir / "test-guide.md").write_text("# Test Guide\n\n## Level 1: Syntax\n")
+    return run_dir
+
+
+def add_iteration(run_dir, number):
+    iter_dir = Path(run_dir) / "iterations"
+    (iter_dir / f"{number}.md").write_text(f"# Iteration {number}\n\nImplemented task {number}.\n")
+    (iter_dir / f"{number}-verify.md").write_text(verify_log(random.Random(number), 4096, True))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def state_cli(run_dir):
+    """The command more-loop's write_state_json runs."""
+    return [sys.executable, str(REPO_DIR / "state_indexer.py"), str(run_dir), *map(str, STATE_ARGS)]
+
+
+def run_cli(cmd):
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+
+
+def milliseconds(samples):
+    return round(statistics.median(samples), 3)
+
+
+def reset_index(run_dir):
+    for name in (state_indexer.INDEX_FILE, "state.json"):
+        (run_dir / name).unlink(missing_ok=True)
+
+
+def bench_state(run_dir, iterations, repeat):
+    """write_state latencies (median ms) and output sizes for one run directory."""
+    cold = []
+    for _ in range(repeat):
+        reset_index(run_dir)
+        cold.append(timed(state_indexer.write_state, run_dir, *STATE_ARGS))
+    warm = [timed(state_indexer.write_state, run_dir, *STATE_ARGS) for _ in range(repeat)]
+    incremental = []
+    for i in range(repeat):
+        add_iteration(run_dir, iterations + 1 + i)
+        incremental.append(timed(state_indexer.write_state, run_dir, *STATE_ARGS))
+    cli_samples = [timed(run_cli, state_cli(run_dir)) for _ in range(repeat)]
+    return {
+        "iterations": iterations,
+        "cold_ms": milliseconds(cold),
+        "warm_ms": milliseconds(warm),
+        "incremental_ms": milliseconds(incremental),
+        "cli_ms": milliseconds(cli_samples),
+        "state_json_bytes": (run_dir / "state.json").stat().st_size,
+        "index_bytes": (run_dir / state_indexer.INDEX_FILE).stat().st_size,
+    }
+
+
+def import_server(run_dir, data_dir):
+    # server.py parses sys.argv at import time
+    argv = sys.argv
+    sys.argv = ["server.py", str(run_dir), "0"]
+    try:
+        import server
+    finally:
+        sys.argv = argv
+    server.RUN_DIR = Path(run_dir)
+    server.DATA_DIR = Path(data_dir)
+    return server
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    k = min(len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1))))
+    return round(sorted_samples[k], 3)
+
+
+class LoadClient(threading.Thread):
+    """Sends requests over one keep-alive connection until the deadline."""
+
+    def __init__(self, port, deadline, next_request, samples, lock):
+        super().__init__(daemon=True)
+        self.port = port
+        self.deadline = deadline
+        self.next_request = next_request
+        self.samples = samples
+        self.lock = lock
+        self.rng = random.Random(id(self))
+
+    def run(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        local = {}
+        while time.monotonic() < self.deadline:
+            name, method, path, body = self.next_request(self.rng)
+            headers = {"Accept-Encoding": "gzip"}
+            if body is not None:
+                headers["Content-Type"] = "application/json"
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                ok = resp.status < 400
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+                ok = False
+            elapsed = (time.perf_counter() - start) * 1000
+            latencies, errors = local.setdefault(name, ([], [0]))
+            latencies.append(elapsed)
+            errors[0] += 0 if ok else 1
+        conn.close()
+        with self.lock:
+            for name, (latencies, errors) in local.items():
+                total = self.samples.setdefault(name, ([], [0]))
+                total[0].extend(latencies)
+                total[1][0] += errors[0]
+
+
+def bench_server(run_dir, iterations, pollers, posters, duration):
+    """Load-test DashboardHandler over run_dir; latency per endpoint and throughput."""
+    data_dir = run_dir.parent / "data"
+    data_dir.mkdir(exist_ok=True)
+    (data_dir / "dashboard.html").write_text("<html><body>dashboard</body></html>")
+    server = import_server(run_dir, data_dir)
+    state_indexer.write_state(run_dir, *STATE_ARGS)
+    httpd = server.DashboardServer(("127.0.0.1", 0), server.DashboardHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    port = httpd.server_address[1]
+
+    def poll(rng):
+        roll = rng.random()
+        if roll < 0.6:
+            return "GET /state.json", "GET", "/state.json", None
+        if roll < 0.8:
+            since = rng.randint(0, iterations * 3)
+            return "GET /iterations?since", "GET", f"/iterations?since={since}", None
+        return "GET /iterations/<n>", "GET", f"/iterations/{rng.randint(1, iterations)}", None
+
+    def post(rng):
+        if rng.random() < 0.7:
+            reviews = [{"iteration": rng.randint(1, iterations), "comment": "Please add tests"}
+                       for _ in range(rng.randint(1, 5))]
+            return "POST /reviews", "POST", "/reviews", json.dumps({"reviews": reviews})
+        return "POST /test-guide", "POST", "/test-guide", json.dumps({"content": "# Test Guide\n" * 50})
+
+    stop = threading.Event()
+
+    def writer():
+        # A live loop adds an iteration and rewrites state.json (from its own
+        # process) on every phase change
+        number = iterations + 1000
+        while not stop.wait(0.25):
+            add_iteration(run_dir, number)
+            run_cli(state_cli(run_dir))
+            number += 1
+
+    samples = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    clients = [LoadClient(port, deadline, poll, samples, lock) for _ in range(pollers)]
+    clients += [LoadClient(port, deadline, post, samples, lock) for _ in range(posters)]
+    writer_thread = threading.Thread(target=writer, daemon=True)
+    started = time.perf_counter()
+    writer_thread.start()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    writer_thread.join()
+    httpd.shutdown()
+    httpd.server_close()
+
+    endpoints = {}
+    all_latencies = []
+    for name in sorted(samples):
+        latencies, errors = samples[name]
+        latencies.sort()
+        all_latencies.extend(latencies)
+        endpoints[name] = {
+            "requests": len(latencies),
+            "errors": errors[0],
+            "p50_ms": percentile(latencies, 50),
+            "p99_ms": percentile(latencies, 99),
+            "throughput_rps": round(len(latencies) / elapsed, 1),
+        }
+    all_latencies.sort()
+    return {
+        "iterations": iterations,
+        "pollers": pollers,
+        "posters": posters,
+        "duration_s": round(elapsed, 3),
+        "requests": len(all_latencies),
+        "errors": sum(e["errors"] for e in endpoints.values()),
+        "p50_ms": percentile(all_latencies, 50),
+        "p99_ms": percentile(all_latencies, 99),
+        "throughput_rps": round(len(all_latencies) / elapsed, 1),
+        "endpoints": endpoints,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scales, repeat=5, pollers=8, posters=2, duration=5.0, log=None):
+    tmpdir = Path(tempfile.mkdtemp(prefix="more-loop-bench-"))
+    try:
+        state = []
+        run_dir = None
+        for iterations in scales:
+            if log:
+                log(f"state: {iterations} iterations")
+            run_dir = generate_run(tmpdir, iterations)
+            state.append(bench_state(run_dir, iterations, repeat))
+        server = None
+        if run_dir is not None and duration > 0:
+            if log:
+                log(f"server: {scales[-1]} iterations, {pollers} pollers, {posters} posters")
+            server = bench_server(run_dir, scales[-1], pollers, posters, duration)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return {
+        "version": RESULTS_VERSION,
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"scales": list(scales), "repeat": repeat, "pollers": pollers,
+                   "posters": posters, "duration_s": duration},
+        "state": state,
+        "server": server,
+    }
+
+
+def flatten(results):
+    """{"state.1000.cold_ms": 12.3, "server.GET /state.json.p99_ms": 4.5, ...}"""
+    flat = {}
+    for entry in results.get("state") or []:
+        for key, value in entry.items():
+            if key != "iterations":
+                flat[f"state.{entry['iterations']}.{key}"] = value
+    server = results.get("server") or {}
+    for key in ("p50_ms", "p99_ms", "throughput_rps"):
+        if key in server:
+            flat[f"server.{key}"] = server[key]
+    for name, entry in (server.get("endpoints") or {}).items():
+        for key in ("p50_ms", "p99_ms", "throughput_rps"):
+            flat[f"server.{name}.{key}"] = entry[key]
+    return flat
+
+
+def compare(baseline, current, threshold):
+    """Rows of (metric, baseline, current, change) and the metrics that regressed.
+
+    Latencies and sizes regress when they grow, throughput when it shrinks.
+    """
+    old, new = flatten(baseline), flatten(current)
+    rows, regressions = [], []
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        change = (after - before) / before if before else 0.0
+        worse = -change if key.endswith("_rps") else change
+        rows.append((key, before, after, change))
+        if worse > threshold:
+            regressions.append(key)
+    return rows, regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="bench.py", description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="run the benchmarks and write JSON results")
+    run.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                     help="comma-separated iteration counts (default: %(default)s)")
+    run.add_argument("--repeat", type=int, default=5, help="samples per state measurement")
+    run.add_argument("--pollers", type=int, default=8, help="concurrent GET clients")
+    run.add_argument("--posters", type=int, default=2, help="concurrent POST clients")
+    run.add_argument("--duration", type=float, default=5.0,
+                     help="server load test seconds, 0 to skip (default: %(default)s)")
+    run.add_argument("--output", "-o", help="write results here instead of stdout")
+    cmp = sub.add_parser("compare", help="compare two result files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.25,
+                     help="allowed relative regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        try:
+            baseline, current = (json.loads(Path(p).read_text()) for p in (args.baseline, args.current))
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        rows, regressions = compare(baseline, current, args.threshold)
+        for key, before, after, change in rows:
+            mark = "  REGRESSED" if key in regressions else ""
+            print(f"{key:55} {before:>12} {after:>12} {change:+8.1%}{mark}")
+        return 1 if regressions else 0
+
+    try:
+        scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    except ValueError:
+        parser.error("--scales must be comma-separated integers")
+    if not scales or min(scales) < 1 or args.repeat < 1:
+        parser.error("--scales and --repeat must be positive")
+    results = run_benchmarks(scales, args.repeat, args.pollers, args.posters, args.duration,
+                             log=lambda msg: print(msg, file=sys.stderr))
+    output = json.dumps(results, indent=2) + "\n"
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        sys.stdout.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
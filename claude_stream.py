@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Stream claude's output into a per-iteration log as it arrives. Uses only stdlib.
+
+run_claude pipes `claude -p --output-format stream-json` through `relay`.
+Each event (assistant text, tool calls, tool results, the final result) is
+turned into readable text and appended to iterations/<n>.log right away.
+The dashboard can then tail the log at /iterations/<n>/stream while the call
+is still running, and a crash mid-call keeps everything streamed so far.
+Every phase of an iteration (task, honesty, verify, ...) appends its own
+section to the same log.
+
+Only the final result text is printed, for the caller to capture. Its token
+usage is appended to the phase's usage file (see metrics.py). Output that
+isn't a stream of JSON events passes through unchanged:
+`--output-format json` from CLIs without stream-json, or plain text.
+
+Usage (called by more-loop's run_claude):
+    claude_stream.py relay <log-file> <phase> [usage-file] [--echo] < claude-output
+
+--echo also copies the log text to stderr (verbose mode).
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import metrics
+
+LOG_SUFFIX = ".log"
+# Tool input keys worth showing in a one-line summary, most useful first
+TOOL_SUMMARY_KEYS = ("command", "file_path", "path", "pattern", "url", "description")
+TOOL_SUMMARY_CHARS = 160
+
+
+def stream_log_path(run_dir, number):
+    return Path(run_dir) / "iterations" / f"{number}{LOG_SUFFIX}"
+
+
+def tool_summary(block):
+    params = block.get("input") if isinstance(block.get("input"), dict) else {}
+    detail = next((str(params[k]) for k in TOOL_SUMMARY_KEYS if params.get(k)), "")
+    detail = " ".join(detail.split())
+    if len(detail) > TOOL_SUMMARY_CHARS:
+        detail = detail[:TOOL_SUMMARY_CHARS - 3] + "..."
+    name = block.get("name", "tool")
+    return f"→ {name}: {detail}\n" if detail else f"→ {name}\n"
+
+
+def tool_result_summary(block):
+    content = block.get("content")
+    if isinstance(content, list):
+        content = "".join(c.get("text", "") for c in content if isinstance(c, dict))
+    lines = len(str(content or "").splitlines())
+    status = "error" if block.get("is_error") else "ok"
+    return f"← {status} ({lines} line{'' if lines == 1 else 's'})\n"
+
+
+def format_event(event):
+    """Readable log text for one stream-json event ("" for events not worth logging)."""
+    kind = event.get("type")
+    message = event.get("message") if isinstance(event.get("message"), dict) else {}
+    blocks = message.get("content") if isinstance(message.get("content"), list) else []
+    parts = []
+    if kind == "assistant":
+        for block in blocks:
+            if not isinstance(block, dict):
+                continue
+            if block.get("type") == "text" and block.get("text"):
+                parts.append(block["text"].rstrip("\n") + "\n")
+            elif block.get("type") == "tool_use":
+                parts.append(tool_summary(block))
+    elif kind == "user":
+        for block in blocks:
+            if isinstance(block, dict) and block.get("type") == "tool_result":
+                parts.append(tool_result_summary(block))
+    return "".join(parts)
+
+
+class StreamLog:
+    """Append-only log file; every write is flushed so readers see it at once."""
+
+    def __init__(self, path, echo=False):
+        self.echo = echo
+        self.fd = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def write(self, text):
+        if not text:
+            return
+        if self.fd is not None:
+            try:
+                os.write(self.fd, text.encode(errors="replace"))
+            except OSError:
+                # A full disk loses the log, never the result
+                self.close()
+        if self.echo:
+            sys.stderr.write(text)
+            sys.stderr.flush()
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def parse_event(line):
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return None
+    if isinstance(event, list) or isinstance(event, dict) and isinstance(event.get("type"), str):
+        return event
+    return None
+
+
+def relay(lines, log, phase, usage_file=None, now=time.monotonic):
+    """Log claude's output as it streams in; return the text the caller should get."""
+    started = now()
+    log.write(f"━━━ {phase} · {datetime.now().strftime('%H:%M:%S')} ━━━\n")
+    result = None
+    logged_text = False
+    passthrough = []
+    for line in lines:
+        event = parse_event(line) if line.lstrip().startswith(("{", "[")) else None
+        if event is None:
+            # Not stream-json: log and return it as it is
+            passthrough.append(line)
+            log.write(line if line.endswith("\n") else line + "\n")
+            continue
+        if isinstance(event, list) or event.get("type") == "result":
+            text, usage = metrics.parse_claude_output(line)
+            if usage is not None:
+                result = text
+                if usage_file:
+                    metrics.append_line(usage_file, usage)
+                if not logged_text:
+                    # --output-format json: the result is all there is
+                    log.write(text.rstrip("\n") + "\n" if text else "")
+                log.write(f"━━━ {phase} done in {now() - started:.1f}s · "
+                          f"{usage['output_tokens']} output tokens ━━━\n")
+            continue
+        text = format_event(event)
+        if text:
+            logged_text = True
+            log.write(text)
+    if result is None:
+        raw = "".join(passthrough)
+        # Pretty-printed --output-format json spans several lines
+        result, usage = metrics.parse_claude_output(raw)
+        if usage is not None and usage_file:
+            metrics.append_line(usage_file, usage)
+    return result
+
+
+def main(argv):
+    echo = "--echo" in argv
+    args = [a for a in argv if a != "--echo"]
+    if len(args) not in (3, 4) or args[0] != "relay":
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+    _, log_file, phase = args[:3]
+    usage_file = args[3] if len(args) == 4 else None
+    try:
+        log = StreamLog(log_file, echo)
+    except OSError as e:
+        print(f"Warning: cannot write {log_file}: {e}", file=sys.stderr)
+        log = StreamLog(None, echo)
+    sys.stdin.reconfigure(errors="replace")
+    try:
+        sys.stdout.write(relay(sys.stdin, log, phase, usage_file))
+    finally:
+        log.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""Token-budgeted prompt context for more-loop phases. Uses only stdlib.
+
+Prompts used to inline whole files (tasks.md, iteration summaries, verify
+output, every N-verify.md for the audit), so long runs produced prompts that
+grew without bound. Each section of each phase's prompt now has a token
+budget (BUDGETS). A section that is over budget is compacted:
+
+- consecutive repeated lines collapse into one line plus a count
+- a long log keeps its head, its tail and the sections around failure
+  markers (FAIL, Error, Traceback, ...), with "[... N lines omitted ...]"
+  where it was cut
+- a long task list keeps every open task and only the most recent done ones
+- in the audit's verify history, identical outputs are listed once and the
+  oldest digests are dropped first when the history is over budget
+
+Digests are cached in <run-dir>/.context-cache.json, keyed on file name,
+mtime, size and budget, so iteration files (which never change once written)
+are compacted once, not once per prompt. Verify outputs that more-loop has
+compressed (--compress-artifacts) are read through artifacts.py.
+
+Usage (called by more-loop's build_context):
+    context_builder.py section <phase> <section> <run-dir> <file>
+    context_builder.py verify-history <phase> <run-dir>
+"""
+
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+
+import artifacts
+from state_indexer import ITERATION_FILE_RE, atomic_write
+
+# Rough chars-per-token ratio for English text and code
+TOKEN_CHARS = 4
+# Per-phase, per-section budgets in tokens
+BUDGETS = {
+    "task": {"tasks": 4000, "summary": 1500, "verify": 2000, "test-guide": 4000},
+    "honesty": {"summary": 2000},
+    "audit": {"tasks": 6000, "verify-history": 8000},
+    "improve": {"tasks": 4000, "audit": 3000, "verify": 2000},
+    "fix": {"tasks": 4000, "verify": 4000},
+}
+CACHE_FILE = ".context-cache.json"
+# Share of a log's budget given to its head and tail; failing sections get the rest
+HEAD_SHARE = 0.25
+TAIL_SHARE = 0.35
+# Lines kept around a failure marker
+FAIL_CONTEXT_BEFORE = 2
+FAIL_CONTEXT_AFTER = 8
+MAX_LINE_CHARS = 500
+# A digest in the verify history never gets less than this many tokens
+MIN_DIGEST_TOKENS = 150
+FAIL_RE = re.compile(r'FAIL|Error|ERROR|Traceback|panic|✗|assert', re.IGNORECASE)
+CACHED_SUFFIX = " [cached]"
+
+
+def tokens(text):
+    return (len(text) + TOKEN_CHARS - 1) // TOKEN_CHARS
+
+
+def collapse_repeats(lines):
+    """Collapse runs of identical lines into one line plus a repeat count."""
+    out = []
+    i = 0
+    while i < len(lines):
+        j = i
+        while j + 1 < len(lines) and lines[j + 1] == lines[i]:
+            j += 1
+        out.append(lines[i])
+        if j > i:
+            out.append(f"[previous line repeated {j - i} more times]")
+        i = j + 1
+    return out
+
+
+def compact_log(text, budget):
+    """Fit a log into `budget` tokens: head, tail and failing sections."""
+    if tokens(text) <= budget:
+        return text
+    lines = [line if len(line) <= MAX_LINE_CHARS else line[:MAX_LINE_CHARS] + " [...]"
+             for line in collapse_repeats(text.split("\n"))]
+    compacted = "\n".join(lines)
+    if tokens(compacted) <= budget:
+        return compacted
+
+    limit = budget * TOKEN_CHARS
+    keep = set()
+    used = 0
+
+    def take(index):
+        nonlocal used
+        if index in keep:
+            return True
+        cost = len(lines[index]) + 1
+        if used + cost > limit:
+            return False
+        keep.add(index)
+        used += cost
+        return True
+
+    head_limit = limit * HEAD_SHARE
+    for i in range(len(lines)):
+        if used >= head_limit or not take(i):
+            break
+    tail_start = used
+    for i in range(len(lines) - 1, -1, -1):
+        if used - tail_start >= limit * TAIL_SHARE or not take(i):
+            break
+    for i, line in enumerate(lines):
+        if i in keep or not FAIL_RE.search(line):
+            continue
+        for j in range(max(0, i - FAIL_CONTEXT_BEFORE), min(len(lines), i + FAIL_CONTEXT_AFTER + 1)):
+            take(j)
+
+    out = []
+    skipped = 0
+    for i, line in enumerate(lines):
+        if i in keep:
+            if skipped:
+                out.append(f"[... {skipped} lines omitted ...]")
+                skipped = 0
+            out.append(line)
+        else:
+            skipped += 1
+    if skipped:
+        out.append(f"[... {skipped} lines omitted ...]")
+    return "\n".join(out)
+
+
+def compact_tasks(text, budget):
+    """Fit a task list into `budget` tokens, keeping every open task.
+
+    Done tasks are dropped oldest first; other lines (headings) stay.
+    """
+    if tokens(text) <= budget:
+        return text
+    lines = text.split("\n")
+    done = [i for i, line in enumerate(lines) if line.startswith("- [x]")]
+    limit = budget * TOKEN_CHARS
+    size = len(text)
+    dropped = set()
+    for i in done:
+        if size <= limit:
+            break
+        dropped.add(i)
+        size -= len(lines[i]) + 1
+    out = []
+    if dropped:
+        out.append(f"[{len(dropped)} earlier completed tasks omitted]")
+    out += [line for i, line in enumerate(lines) if i not in dropped]
+    return "\n".join(out)
+
+
+def compact(section, text, budget):
+    if section == "tasks":
+        return compact_tasks(text, budget)
+    return compact_log(text, budget)
+
+
+def budget_for(phase, section):
+    try:
+        return BUDGETS[phase][section]
+    except KeyError:
+        raise ValueError(f"no context budget for {phase}/{section}") from None
+
+
+def fingerprint(text):
+    """Hash of a verify output; a result reused from the verify cache hashes like the original."""
+    first, sep, rest = text.partition("\n")
+    if first.endswith(CACHED_SUFFIX):
+        first = first[:-len(CACHED_SUFFIX)]
+    return hashlib.sha256((first + sep + rest).encode()).hexdigest()
+
+
+class DigestCache:
+    """Compacted file contents keyed on (name, mtime, size, budget)."""
+
+    def __init__(self, run_dir):
+        self.path = Path(run_dir) / CACHE_FILE
+        self.entries = self.read()
+        self.updated = {}
+
+    def read(self):
+        try:
+            entries = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def digest(self, path, section, budget):
+        """Return the compacted content of path, or None if it can't be read."""
+        return self._cached(path, f"{Path(path).name}:{section}:{budget}",
+                            lambda text: compact(section, text.rstrip("\n"), budget))
+
+    def fingerprint(self, path):
+        """Hash of a verify output, ignoring a [cached] mark; None if it can't be read."""
+        return self._cached(path, f"{Path(path).name}:fingerprint", fingerprint)
+
+    def _cached(self, path, key, make):
+        """make(text of path), reused while the file's mtime and size are unchanged."""
+        path = Path(path)
+        # Old verify outputs may have been compressed (artifacts.py)
+        found = artifacts.locate(path)
+        if found is None:
+            return None
+        try:
+            st = found.stat()
+        except OSError:
+            return None
+        signature = [st.st_mtime_ns, st.st_size]
+        entry = self.entries.get(key)
+        if entry and entry.get("signature") == signature:
+            return entry["digest"]
+        try:
+            with artifacts.open_artifact(found) as f:
+                text = f.read().decode(errors="replace")
+        except (OSError, EOFError):
+            return None
+        result = make(text)
+        self.entries[key] = self.updated[key] = {"signature": signature, "digest": result}
+        return result
+
+    def save(self):
+        if not self.updated:
+            return
+        # Merged into the file as it is now: another phase may have saved
+        # its own digests since this cache was loaded (--pipeline)
+        entries = self.read()
+        entries.update(self.updated)
+        atomic_write(self.path, json.dumps(entries, ensure_ascii=False))
+        self.entries = entries
+        self.updated = {}
+
+
+def section(phase, name, run_dir, path):
+    """Compacted content of one file for a phase's prompt section."""
+    cache = DigestCache(run_dir)
+    result = cache.digest(path, name, budget_for(phase, name))
+    cache.save()
+    return result or ""
+
+
+def verify_files(run_dir):
+    """The run's N-verify.md files in iteration order."""
+    try:
+        import run_store
+    except ImportError:
+        run_store = None
+    store = run_store.store_for(run_dir) if run_store else None
+    if store is not None:
+        iter_dir = Path(run_dir) / "iterations"
+        return [iter_dir / name for name in store.verify_files(Path(run_dir).resolve().name)]
+    files = {}
+    for path in (Path(run_dir) / "iterations").glob("*-verify.md*"):
+        name = artifacts.plain_name(path.name)
+        m = ITERATION_FILE_RE.match(name)
+        if m:
+            files[int(m.group(1))] = path.with_name(name)
+    return [files[n] for n in sorted(files)]
+
+
+def verify_history(phase, run_dir):
+    """Every verify output so far, deduplicated and fit into the phase budget."""
+    budget = budget_for(phase, "verify-history")
+    files = verify_files(run_dir)
+    cache = DigestCache(run_dir)
+
+    # Identical outputs (e.g. the same failure several iterations running, or
+    # cached verify results) are shown once and referenced afterwards:
+    # [path, name of the identical earlier output or None]
+    entries = []
+    seen = {}
+    for path in files:
+        fp = cache.fingerprint(path)
+        if fp is None:
+            continue
+        if fp in seen:
+            entries.append([path, seen[fp]])
+        else:
+            seen[fp] = path.name
+            entries.append([path, None])
+
+    unique = sum(1 for _, same in entries if same is None) or 1
+    share = max(MIN_DIGEST_TOKENS, budget // unique)
+
+    def block(entry):
+        path, same = entry
+        body = f"(identical to {same})" if same is not None else cache.digest(path, "verify", share)
+        return f"--- {path.name} ---\n{body}\n" if body is not None else ""
+
+    blocks = [block(entry) for entry in entries]
+
+    # Still over budget with many iterations: drop the oldest first
+    omitted = 0
+    while len(blocks) > 1 and tokens("".join(blocks)) > budget:
+        path, same = entries.pop(0)
+        blocks.pop(0)
+        omitted += 1
+        if same is not None:
+            continue
+        # Outputs identical to the dropped one can't refer to it: the first
+        # of them is shown in its place
+        heir = None
+        for i, entry in enumerate(entries):
+            if entry[1] == path.name:
+                entry[1] = heir
+                heir = heir or entry[0].name
+                blocks[i] = block(entry)
+    cache.save()
+    blocks = [b for b in blocks if b]
+    if omitted:
+        blocks.insert(0, f"[{omitted} earlier verify outputs omitted]\n")
+    return "\n".join(blocks)
+
+
+def main(argv):
+    try:
+        if len(argv) == 5 and argv[0] == "section":
+            print(section(argv[1], argv[2], argv[3], argv[4]))
+            return 0
+        if len(argv) == 3 and argv[0] == "verify-history":
+            print(verify_history(argv[1], argv[2]))
+            return 0
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
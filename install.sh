@@ -55,11 +55,13 @@ install() {
 
   # Web dashboard files — remove first to handle existing symlinks
   mkdir -p "$DATA_DIR"
-  if [[ -f "$SCRIPT_DIR/server.py" ]]; then
-    rm -f "$DATA_DIR/server.py"
-    cp "$SCRIPT_DIR/server.py" "$DATA_DIR/server.py"
-    echo "  Installed $DATA_DIR/server.py"
-  fi
+  # Python helpers (server.py, state_indexer.py, ...) live side by side
+  for f in "$SCRIPT_DIR"/*.py; do
+    [[ -f "$f" ]] || continue
+    rm -f "$DATA_DIR/$(basename "$f")"
+    cp "$f" "$DATA_DIR/$(basename "$f")"
+    echo "  Installed $DATA_DIR/$(basename "$f")"
+  done
   if [[ -f "$SCRIPT_DIR/dashboard.html" ]]; then
     rm -f "$DATA_DIR/dashboard.html"
     cp "$SCRIPT_DIR/dashboard.html" "$DATA_DIR/dashboard.html"
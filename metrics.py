@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""Per-phase timing and token metrics for more-loop runs. Uses only stdlib.
+
+more-loop's timed_phase appends one JSON line to <run-dir>/metrics.jsonl
+every time a phase (bootstrap, oracle, task, honesty, verify, audit, improve,
+fix) finishes. The line has the phase's wall-clock duration and exit code. It
+also has the token usage and cost that claude reported for its calls in that
+phase, taken from claude's JSON result by claude_stream.py. Each record is
+written with a single O_APPEND write, so parallel task workers can share the
+file.
+
+server.py aggregates the file per run and phase. It serves the totals as
+/metrics in the Prometheus text format (MetricsReader, render_prometheus).
+
+Usage (`record` is called by more-loop's timed_phase):
+    metrics.py record <run-dir> <phase> <iteration> <exit-code> <start-epoch> [usage-file]
+    metrics.py overlap <run-dir> <iteration> <start-epoch> <phase>...
+    metrics.py tier <usage-file> <model> <start-epoch> <outcome>
+    metrics.py retry <usage-file> <budget-file> <budget> <kind> <start-epoch> <wait>
+
+`retry` exits 3, recording nothing, once the budget is used up.
+
+The usage file of a phase gets one line per claude call, appended by
+claude_stream.relay, plus the `tier` and `retry` lines above.
+"""
+
+import fcntl
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+METRICS_FILE = "metrics.jsonl"
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cache_read_input_tokens",
+                "cache_creation_input_tokens")
+# How far back `overlap` looks for the records of the phases it overlapped
+RECENT_BYTES = 64 * 1024
+BUDGET_SPENT = 3
+
+
+def parse_claude_output(raw):
+    """Return (result text, usage dict or None) for `claude -p` output."""
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return raw, None
+    if isinstance(data, list):
+        # Some CLI versions print the whole message list; the result is last
+        data = next((m for m in reversed(data)
+                     if isinstance(m, dict) and m.get("type") == "result"), None)
+    if not isinstance(data, dict) or "result" not in data and "usage" not in data:
+        return raw, None
+    text = data.get("result")
+    usage = data.get("usage") if isinstance(data.get("usage"), dict) else {}
+    counts = {field: _number(usage.get(field), int) for field in TOKEN_FIELDS}
+    counts["cost_usd"] = _number(data.get("total_cost_usd"), float)
+    return text if isinstance(text, str) else "", counts
+
+
+def _number(value, kind):
+    try:
+        return kind(value or 0)
+    except (TypeError, ValueError):
+        return kind(0)
+
+
+def append_line(path, record):
+    """Append one JSON line in a single write, so concurrent writers don't interleave."""
+    data = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def read_usage(path):
+    """Sum the usage lines claude_stream.relay appended during one phase.
+
+    `tier` lines are collected, in order, under "tiers"; `retry` lines are
+    counted under "retries" and "retry_seconds".
+    """
+    totals = {field: 0 for field in TOKEN_FIELDS}
+    totals.update(cost_usd=0.0, claude_calls=0, tiers=[], retries=0, retry_seconds=0.0)
+    if not path:
+        return totals
+    try:
+        lines = Path(path).read_text().splitlines()
+    except OSError:
+        return totals
+    for line in lines:
+        try:
+            usage = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(usage, dict):
+            continue
+        if "tier" in usage:
+            totals["tiers"].append({"model": str(usage["tier"]),
+                                    "duration": _number(usage.get("duration"), float),
+                                    "outcome": str(usage.get("outcome", ""))})
+            continue
+        if "retry" in usage:
+            totals["retries"] += 1
+            totals["retry_seconds"] += _number(usage.get("duration"), float) + _number(usage.get("wait"), float)
+            continue
+        totals["claude_calls"] += 1
+        for field in TOKEN_FIELDS:
+            totals[field] += _number(usage.get(field), int)
+        totals["cost_usd"] += _number(usage.get("cost_usd"), float)
+    return totals
+
+
+def _epoch(value):
+    # EPOCHREALTIME uses the locale's decimal separator
+    return float(str(value).replace(",", "."))
+
+
+def _record(phase, iteration, exit_code, start, now):
+    start = _epoch(start)
+    return {
+        "time": datetime.fromtimestamp(now, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "phase": phase,
+        "iteration": int(iteration),
+        "exit_code": int(exit_code),
+        "duration": round(max(0.0, now - start), 3),
+    }
+
+
+def record_phase(run_dir, phase, iteration, exit_code, start, usage_file=None, now=None):
+    now = time.time() if now is None else now
+    record = _record(phase, iteration, exit_code, start, now)
+    record.update(read_usage(usage_file))
+    record["cost_usd"] = round(record["cost_usd"], 6)
+    tiers = record.pop("tiers")
+    if tiers:
+        record["tiers"] = tiers
+        record["escalated"] = len(tiers) > 1
+    if record["retries"]:
+        record["retry_seconds"] = round(record["retry_seconds"], 3)
+    else:
+        del record["retries"], record["retry_seconds"]
+    append_line(Path(run_dir) / METRICS_FILE, record)
+    return record
+
+
+def record_tier(usage_file, model, start, outcome, now=None):
+    """Note one try of a tiered judgment in the phase's usage file.
+
+    Judgment phases (the honesty check, verify of a .md plan) first run on a
+    fast model and are asked again on the main model when the answer is
+    unclear or negative; more-loop's run_judgment records each try. The
+    phase's record lists them as "tiers" (model, duration, outcome) and sets
+    "escalated" if the main model was asked too.
+    """
+    now = time.time() if now is None else now
+    tier = {"tier": model, "duration": round(max(0.0, now - _epoch(start)), 3), "outcome": outcome}
+    append_line(usage_file, tier)
+    return tier
+
+
+def take_retry(budget_file, budget):
+    """Take one retry from a run's budget; False once `budget` have been taken.
+
+    more-loop's run_claude retries a call that failed transiently (overload,
+    rate limit, network) within the same phase, after a jittered exponential
+    backoff. The retries taken are counted in <run-dir>/.retry-budget.
+    """
+    fd = os.open(budget_file, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        # Parallel task workers share the budget
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        used = _number(os.read(fd, 32).decode(errors="replace").strip(), int)
+        if used >= int(budget):
+            return False
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.ftruncate(fd, 0)
+        os.write(fd, str(used + 1).encode())
+        return True
+    finally:
+        os.close(fd)
+
+
+def record_retry(usage_file, kind, start, wait, now=None):
+    """Note a failed try that is retried after `wait` seconds in the phase's usage file.
+
+    The line says why the try failed and how long it ran. The phase's record
+    then has "retries" and "retry_seconds", the time lost to them.
+    """
+    now = time.time() if now is None else now
+    retry = {"retry": kind, "duration": round(max(0.0, now - _epoch(start)), 3), "wait": _epoch(wait)}
+    append_line(usage_file, retry)
+    return retry
+
+
+def recent_records(path, limit=RECENT_BYTES):
+    """The records in the last `limit` bytes of a metrics file, oldest first."""
+    try:
+        with open(path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - limit))
+            lines = f.read().split(b"\n")
+    except OSError:
+        return []
+    if size > limit:
+        lines = lines[1:]  # cut mid-line
+    records = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict):
+            records.append(record)
+    return records
+
+
+def record_overlap(run_dir, iteration, start, phases, now=None):
+    """Append a "pipeline" record for phases of an iteration that ran concurrently.
+
+    With --pipeline, the honesty check and verify of an iteration run at the
+    same time. saved_seconds is the sum of their durations minus the
+    wall-clock time from `start` until now: how much shorter the iteration
+    was than running them one after the other.
+    """
+    now = time.time() if now is None else now
+    record = _record("pipeline", iteration, 0, start, now)
+    path = Path(run_dir) / METRICS_FILE
+    durations = {}
+    for earlier in recent_records(path):
+        if earlier.get("iteration") == record["iteration"] and earlier.get("phase") in phases:
+            durations[earlier["phase"]] = _number(earlier.get("duration"), float)
+    record["saved_seconds"] = round(max(0.0, sum(durations.values()) - record["duration"]), 3)
+    append_line(path, record)
+    return record
+
+
+def new_totals():
+    totals = {"count": 0, "failures": 0, "duration": 0.0, "last_duration": 0.0,
+              "claude_calls": 0, "cost_usd": 0.0, "saved_seconds": 0.0,
+              "judgments": 0, "escalations": 0, "models": {}, "retries": 0, "retry_seconds": 0.0}
+    totals.update((field, 0) for field in TOKEN_FIELDS)
+    return totals
+
+
+class MetricsReader:
+    """Per-phase totals of one metrics.jsonl.
+
+    refresh() reads only the lines appended since the previous call. The file
+    is re-read from the start if it was replaced or truncated.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.reset(None)
+
+    def reset(self, inode):
+        self.inode = inode
+        self.offset = 0
+        self.partial = b""
+        self.phases = {}
+
+    def refresh(self):
+        try:
+            st = self.path.stat()
+        except OSError:
+            self.reset(None)
+            return self.phases
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            self.reset(st.st_ino)
+        if st.st_size == self.offset:
+            return self.phases
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read(st.st_size - self.offset)
+        except OSError:
+            return self.phases
+        self.offset += len(data)
+        lines = (self.partial + data).split(b"\n")
+        # A line still being written is finished by a later refresh
+        self.partial = lines.pop()
+        for line in lines:
+            try:
+                self.add(json.loads(line))
+            except (ValueError, AttributeError):
+                continue
+        return self.phases
+
+    def add(self, record):
+        totals = self.phases.setdefault(str(record.get("phase", "unknown")), new_totals())
+        duration = _number(record.get("duration"), float)
+        totals["count"] += 1
+        totals["failures"] += 1 if _number(record.get("exit_code"), int) != 0 else 0
+        totals["duration"] += duration
+        totals["last_duration"] = duration
+        totals["claude_calls"] += _number(record.get("claude_calls"), int)
+        totals["cost_usd"] += _number(record.get("cost_usd"), float)
+        totals["saved_seconds"] += _number(record.get("saved_seconds"), float)
+        totals["retries"] += _number(record.get("retries"), int)
+        totals["retry_seconds"] += _number(record.get("retry_seconds"), float)
+        for field in TOKEN_FIELDS:
+            totals[field] += _number(record.get(field), int)
+        tiers = record.get("tiers")
+        if isinstance(tiers, list) and tiers:
+            totals["judgments"] += 1
+            totals["escalations"] += 1 if record.get("escalated") else 0
+            for tier in tiers:
+                if not isinstance(tier, dict):
+                    continue
+                model = totals["models"].setdefault(str(tier.get("model", "")), {"count": 0, "duration": 0.0})
+                model["count"] += 1
+                model["duration"] += _number(tier.get("duration"), float)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _value(value):
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+# Plain per-phase series: (name, type, help, key in the phase's totals)
+SERIES = [
+    ("more_loop_phase_last_duration_seconds", "gauge",
+     "Duration of the most recent run of each phase", "last_duration"),
+    ("more_loop_phase_failures_total", "counter", "Phase runs that exited non-zero", "failures"),
+    ("more_loop_claude_calls_total", "counter", "claude invocations made by each phase", "claude_calls"),
+    ("more_loop_cost_usd_total", "counter", "Cost claude reported for each phase, in USD", "cost_usd"),
+    ("more_loop_overlap_saved_seconds_total", "counter",
+     "Wall-clock time saved by running phases concurrently (--pipeline)", "saved_seconds"),
+    ("more_loop_judgments_total", "counter",
+     "Judgment phase runs that started on the fast model", "judgments"),
+    ("more_loop_escalations_total", "counter",
+     "Judgments that were asked again on the main model", "escalations"),
+    ("more_loop_retries_total", "counter", "claude calls retried after a transient failure", "retries"),
+    ("more_loop_retry_seconds_total", "counter",
+     "Time lost to retried calls: the failed tries plus the backoff before each retry", "retry_seconds"),
+]
+TOKEN_KINDS = {"input_tokens": "input", "output_tokens": "output",
+               "cache_read_input_tokens": "cache_read",
+               "cache_creation_input_tokens": "cache_creation"}
+
+
+def render_prometheus(runs):
+    """Prometheus text exposition for [(run name, {phase: totals}), ...]."""
+    series = [(f'run="{_label(run)}",phase="{_label(phase)}"', phases[phase])
+              for run, phases in runs for phase in sorted(phases)]
+
+    name = "more_loop_phase_duration_seconds"
+    lines = [f"# HELP {name} Wall-clock time spent in each phase", f"# TYPE {name} summary"]
+    for labels, totals in series:
+        lines.append(f"{name}_sum{{{labels}}} {_value(totals['duration'])}")
+        lines.append(f"{name}_count{{{labels}}} {totals['count']}")
+
+    for name, kind, help_text, key in SERIES:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        lines += [f"{name}{{{labels}}} {_value(totals[key])}" for labels, totals in series]
+
+    name = "more_loop_judgment_duration_seconds"
+    lines += [f"# HELP {name} Time each model took per try of a judgment", f"# TYPE {name} summary"]
+    for labels, totals in series:
+        for model, tier in sorted(totals["models"].items()):
+            model_labels = f'{labels},model="{_label(model)}"'
+            lines.append(f"{name}_sum{{{model_labels}}} {_value(tier['duration'])}")
+            lines.append(f"{name}_count{{{model_labels}}} {tier['count']}")
+
+    name = "more_loop_tokens_total"
+    lines += [f"# HELP {name} Tokens claude reported for each phase", f"# TYPE {name} counter"]
+    for labels, totals in series:
+        for field, token_kind in TOKEN_KINDS.items():
+            lines.append(f'{name}{{{labels},kind="{token_kind}"}} {totals[field]}')
+    return "\n".join(lines) + "\n"
+
+
+def main(argv):
+    try:
+        if argv and argv[0] == "record" and len(argv) in (6, 7):
+            record_phase(*argv[1:])
+            return 0
+        if argv and argv[0] == "overlap" and len(argv) >= 5:
+            record_overlap(argv[1], argv[2], argv[3], argv[4:])
+            return 0
+        if argv and argv[0] == "tier" and len(argv) == 5:
+            record_tier(*argv[1:])
+            return 0
+        if argv and argv[0] == "retry" and len(argv) == 7:
+            if not take_retry(argv[2], argv[3]):
+                return BUDGET_SPENT
+            record_retry(argv[1], argv[4], argv[5], argv[6])
+            return 0
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""Review comments of a run, saved one change at a time. Uses only stdlib.
+
+reviews.json holds the review set as last written in full ({"reviews":
+[...]}, as POST /reviews and /request-changes send it). Adding, editing or
+deleting a single review appends one line to reviews.journal instead of
+rewriting the whole set:
+
+    {"seq": 4, "op": "add", "review": {"id": "r-1", ...}}
+    {"seq": 5, "op": "edit", "id": "r-1", "fields": {"comment": "..."}}
+    {"seq": 6, "op": "delete", "id": "r-1"}
+
+Reading replays the journal on top of reviews.json. A store that keeps
+changing reviews keeps the merged set in memory and, before each change,
+reads only the journal lines appended since its last one, so a change
+costs one append rather than a parse of the whole set. Once the journal holds
+COMPACT_OPS entries, the merged set is written back to reviews.json along
+with the last seq applied, and the journal is removed. Entries at or below
+that seq are skipped on replay, so a compaction cut short between the two
+steps applies nothing twice. A line left incomplete by a crash is ignored.
+
+Writers must be serialized (the dashboard server holds its write_lock for
+reviews.json, and keeps one store per run); readers need no lock.
+
+Usage:
+    review_store.py export <run-dir>    print the merged review set as JSON
+"""
+
+import json
+import os
+import sys
+import uuid
+from pathlib import Path
+
+from state_indexer import atomic_write
+
+REVIEWS_FILE = "reviews.json"
+JOURNAL_FILE = "reviews.journal"
+COMPACT_OPS = 64
+
+
+class ReviewError(Exception):
+    """A change that doesn't apply to the current review set."""
+
+
+class UnknownReview(ReviewError):
+    """An edit or delete of a review id that isn't in the set."""
+
+
+class ReviewStore:
+
+    def __init__(self, run_dir):
+        self.dir = Path(run_dir)
+        self.base_file = self.dir / REVIEWS_FILE
+        self.journal_file = self.dir / JOURNAL_FILE
+        self._index = None
+
+    def _read_base(self):
+        try:
+            data = json.loads(self.base_file.read_text())
+        except (OSError, ValueError):
+            return [], 0
+        if not isinstance(data, dict) or not isinstance(data.get("reviews"), list):
+            return [], 0
+        seq = data.get("seq")
+        return data["reviews"], seq if isinstance(seq, int) else 0
+
+    def _read_journal(self):
+        """Journal entries in order, and whether the file ends mid-line."""
+        try:
+            raw = self.journal_file.read_bytes()
+        except OSError:
+            return [], False
+        ops = []
+        for line in raw.splitlines():
+            try:
+                op = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(op, dict) and isinstance(op.get("seq"), int):
+                ops.append(op)
+        return ops, bool(raw) and not raw.endswith(b"\n")
+
+    def state(self):
+        """Return (reviews, last seq, journal entries, journal ends mid-line)."""
+        reviews, seq = self._read_base()
+        reviews = list(reviews)
+        ops, torn = self._read_journal()
+        for op in ops:
+            if op["seq"] <= seq:
+                continue
+            seq = op["seq"]
+            try:
+                apply(reviews, op)
+            except ReviewError:
+                pass
+        return reviews, seq, len(ops), torn
+
+    def load(self):
+        return self.state()[0]
+
+    def _refresh_index(self):
+        """The review set changes are checked against, brought up to date.
+
+        Only journal lines appended since the previous call are read; the set
+        is rebuilt from the files if reviews.json or the journal was replaced.
+        """
+        try:
+            st = self.base_file.stat()
+            base = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            base = None
+        try:
+            st = self.journal_file.stat()
+            inode, size = st.st_ino, st.st_size
+        except OSError:
+            inode, size = None, 0
+        index = self._index
+        if index is None or index["base"] != base or index["inode"] != inode or size < index["offset"]:
+            reviews, seq = self._read_base()
+            index = self._index = {"base": base, "inode": inode, "offset": 0, "reviews": list(reviews),
+                                   "seq": seq, "count": 0, "torn": False}
+        if size > index["offset"]:
+            try:
+                with open(self.journal_file, "rb") as f:
+                    f.seek(index["offset"])
+                    data = f.read(size - index["offset"])
+            except OSError:
+                data = b""
+            # A line left incomplete is read again (and skipped) next time
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(op, dict) or not isinstance(op.get("seq"), int):
+                    continue
+                index["count"] += 1
+                if op["seq"] <= index["seq"]:
+                    continue
+                index["seq"] = op["seq"]
+                try:
+                    apply(index["reviews"], op)
+                except ReviewError:
+                    pass
+            index["offset"] += end
+            index["torn"] = end < len(data)
+        return index
+
+    def add(self, review):
+        """Append a review (given an id if it has none); returns it."""
+        review = dict(review)
+        if review.get("id") is None:
+            review["id"] = "r-" + uuid.uuid4().hex[:12]
+        self._change({"op": "add", "review": review})
+        return review
+
+    def edit(self, review_id, fields):
+        """Update fields of one review; returns the edited review."""
+        reviews = self._change({"op": "edit", "id": review_id, "fields": dict(fields)})
+        return reviews[find(reviews, review_id)]
+
+    def delete(self, review_id):
+        self._change({"op": "delete", "id": review_id})
+
+    def replace(self, data):
+        """Write a whole review set (a dict with a "reviews" list)."""
+        if self.journal_file.exists():
+            # Keep the journal's seq so a leftover journal can't replay over it
+            data = dict(data, seq=self.state()[1])
+        atomic_write(self.base_file, json.dumps(data, indent=2))
+        self._remove_journal()
+        self._index = None
+
+    def compact(self):
+        reviews, seq, _, _ = self.state()
+        atomic_write(self.base_file, json.dumps({"reviews": reviews, "seq": seq}, indent=2))
+        self._remove_journal()
+        self._index = None
+
+    def _remove_journal(self):
+        try:
+            self.journal_file.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _change(self, op):
+        """Journal op if it applies; returns the review set after it."""
+        index = self._refresh_index()
+        apply(index["reviews"], op)
+        line = json.dumps({"seq": index["seq"] + 1, **op}, separators=(",", ":")) + "\n"
+        if index["torn"]:
+            line = "\n" + line
+        try:
+            # One O_APPEND write per entry: a concurrent reader sees it whole or not at all
+            fd = os.open(self.journal_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line.encode())
+                st = os.fstat(fd)
+            finally:
+                os.close(fd)
+        except BaseException:
+            # The in-memory set already has op: read it all again next time
+            self._index = None
+            raise
+        index.update(inode=st.st_ino, offset=st.st_size, seq=index["seq"] + 1,
+                     count=index["count"] + 1, torn=False)
+        reviews = index["reviews"]
+        if index["count"] >= COMPACT_OPS:
+            self.compact()
+        return reviews
+
+
+def find(reviews, review_id):
+    for i, review in enumerate(reviews):
+        if isinstance(review, dict) and review.get("id") == review_id:
+            return i
+    return None
+
+
+def apply(reviews, op):
+    """Apply one journal entry to reviews in place; ReviewError if it can't."""
+    kind = op.get("op")
+    if kind == "add":
+        review = op.get("review")
+        if not isinstance(review, dict):
+            raise ReviewError("Review must be an object")
+        if find(reviews, review.get("id")) is not None:
+            raise ReviewError(f"Review {review.get('id')!r} already exists")
+        reviews.append(review)
+    elif kind in ("edit", "delete"):
+        i = find(reviews, op.get("id"))
+        if i is None:
+            raise UnknownReview(f"No review {op.get('id')!r}")
+        if kind == "delete":
+            del reviews[i]
+        else:
+            fields = op.get("fields")
+            if not isinstance(fields, dict):
+                raise ReviewError("Fields must be an object")
+            reviews[i] = {**reviews[i], **fields, "id": op["id"]}
+    else:
+        raise ReviewError(f"Unknown operation {kind!r}")
+
+
+def main(argv):
+    if len(argv) == 2 and argv[0] == "export":
+        print(json.dumps({"reviews": ReviewStore(argv[1]).load()}, indent=2))
+        return 0
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
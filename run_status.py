@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""Status and provider comparison for the runs under a runs root. Uses only stdlib.
+
+`multi-loop --status` shows every run in .more-loop/ with this single
+process, which reads the runs concurrently. The output has three parts:
+
+- the schedule's jobs, if there is one (scheduler.format_status)
+- one line per run: phase, iteration, tasks
+- a comparison of providers on the same spec, one row per spec and provider:
+    tasks/h      tasks done per hour the run's phases were running
+    verify       share of verify results that passed
+    dishonest    share of honesty checks that rejected the task
+    iter         mean wall-clock time of an iteration
+
+The times come from metrics.jsonl: each record's end time and duration give
+the interval its phase ran. Active time is the union of those intervals, so
+neither pauses between a run and its resume nor phases running side by side
+(--pipeline, --jobs) skew it. A run's provider is the one its name ends with
+among those in providers.json (multi-loop names runs <spec>-<provider>).
+
+`watch` redraws whenever a run changes. Every POLL_INTERVAL it only stats each
+run's state.json, metrics.jsonl and iterations/, and re-reads just the runs
+whose signature changed.
+
+Usage (called by multi-loop --status [--watch]):
+    run_status.py show <runs-root> [--config providers.json]
+    run_status.py watch <runs-root> [--config providers.json]
+"""
+
+import json
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import artifacts
+import metrics
+import scheduler
+from state_indexer import ITERATION_FILE_RE, classify_verdict
+
+SCHEDULE_DIR = ".schedule"
+MAX_READERS = 8
+POLL_INTERVAL = 1.0
+CLEAR = "\x1b[H\x1b[2J"
+
+
+def run_dirs(runs_root):
+    try:
+        entries = sorted(Path(runs_root).iterdir())
+    except OSError:
+        return []
+    return [p for p in entries if not p.name.startswith(".") and (p / "state.json").is_file()]
+
+
+def signature(run_dir):
+    """What `watch` compares to tell whether a run changed."""
+    sig = []
+    for name in ("state.json", metrics.METRICS_FILE, "iterations"):
+        try:
+            st = (run_dir / name).stat()
+            sig.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append(None)
+    return tuple(sig)
+
+
+def provider_names(config_file):
+    try:
+        with open(config_file) as f:
+            return list(json.load(f).get("providers", {}))
+    except (OSError, ValueError, AttributeError):
+        return []
+
+
+def split_name(name, providers):
+    """(spec, provider) of a run named <spec>-<provider>[-<timestamp>]."""
+    for provider in sorted(providers, key=len, reverse=True):
+        m = re.fullmatch(rf"(.+)-{re.escape(provider)}(?:-\d+)?", name)
+        if m:
+            return m.group(1), provider
+    return name, "-"
+
+
+def _number(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _parse_time(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def union_seconds(intervals):
+    """Total length of the union of (start, end) intervals."""
+    total = 0.0
+    end = None
+    for start, stop in sorted(intervals):
+        if end is None or start > end:
+            total += stop - start
+            end = stop
+        elif stop > end:
+            total += stop - end
+            end = stop
+    return total
+
+
+def phase_intervals(path):
+    """{iteration: [(start, end), ...]} of the phases in a metrics.jsonl."""
+    by_iteration = {}
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return by_iteration
+    with f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            end = _parse_time(record.get("time"))
+            iteration = record.get("iteration")
+            if end is None or not isinstance(iteration, int):
+                continue
+            duration = max(0.0, _number(record.get("duration")))
+            by_iteration.setdefault(iteration, []).append((end - duration, end))
+    return by_iteration
+
+
+def verdicts(run_dir):
+    """Counts of each verify and honesty verdict in a run's iterations/."""
+    counts = {"verify": {}, "honesty": {}}
+    try:
+        names = {artifacts.plain_name(p.name) for p in (run_dir / "iterations").iterdir()}
+    except OSError:
+        return counts
+    for name in names:
+        m = ITERATION_FILE_RE.match(name)
+        if not m or not m.group(3):
+            continue
+        kind = m.group(3)
+        verdict = classify_verdict(kind, artifacts.read_first_line(run_dir / "iterations" / name))
+        counts[kind][verdict] = counts[kind].get(verdict, 0) + 1
+    return counts
+
+
+def read_run(run_dir):
+    """Progress and comparison figures of one run directory."""
+    try:
+        state = json.loads((run_dir / "state.json").read_text())
+    except (OSError, ValueError):
+        state = {}
+    if not isinstance(state, dict):
+        state = {}
+    intervals = phase_intervals(run_dir / metrics.METRICS_FILE)
+    iteration_times = [union_seconds(spans) for number, spans in intervals.items() if number > 0]
+    counts = verdicts(run_dir)
+    return {
+        "name": run_dir.name,
+        "phase": str(state.get("phase", "?")),
+        "iteration": state.get("current_iteration", "?"),
+        "max_iterations": state.get("max_iterations", "?"),
+        "tasks_done": int(_number(state.get("tasks_completed"))),
+        "tasks_total": int(_number(state.get("tasks_total"))),
+        "active_seconds": union_seconds([span for spans in intervals.values() for span in spans]),
+        "iterations": len(iteration_times),
+        "iteration_seconds": sum(iteration_times),
+        "verify_pass": counts["verify"].get("PASS", 0),
+        "verify_total": counts["verify"].get("PASS", 0) + counts["verify"].get("FAIL", 0),
+        "dishonest": counts["honesty"].get("DISHONEST", 0),
+        "honesty_total": counts["honesty"].get("HONEST", 0) + counts["honesty"].get("DISHONEST", 0),
+    }
+
+
+def collect(dirs, pool):
+    """read_run for every directory, concurrently; {name: run}."""
+    return {run["name"]: run for run in pool.map(read_run, dirs)}
+
+
+def compare(runs, providers):
+    """Comparison rows, one per (spec, provider), summed over its runs."""
+    rows = {}
+    for run in runs:
+        key = split_name(run["name"], providers)
+        row = rows.setdefault(key, {"spec": key[0], "provider": key[1], "runs": 0})
+        row["runs"] += 1
+        for field in ("tasks_done", "active_seconds", "iterations", "iteration_seconds",
+                      "verify_pass", "verify_total", "dishonest", "honesty_total"):
+            row[field] = row.get(field, 0) + run[field]
+    for row in rows.values():
+        hours = row["active_seconds"] / 3600
+        row["tasks_per_hour"] = row["tasks_done"] / hours if hours else None
+        row["verify_rate"] = row["verify_pass"] / row["verify_total"] if row["verify_total"] else None
+        row["dishonest_rate"] = row["dishonest"] / row["honesty_total"] if row["honesty_total"] else None
+        row["mean_iteration"] = row["iteration_seconds"] / row["iterations"] if row["iterations"] else None
+    return [rows[key] for key in sorted(rows)]
+
+
+def _table(rows):
+    widths = [max(len(r[i]) for r in rows) for i in range(len(rows[0]))]
+    return "\n".join(" ".join(c.ljust(w) for c, w in zip(r, widths)).rstrip() for r in rows)
+
+
+def _rate(part, whole, value):
+    return "-" if value is None else f"{value:.0%} ({part}/{whole})"
+
+
+def _duration(seconds):
+    if seconds is None:
+        return "-"
+    minutes, seconds = divmod(round(seconds), 60)
+    return f"{minutes}m{seconds:02d}s" if minutes else f"{seconds}s"
+
+
+def format_runs(runs):
+    rows = [("Run", "Phase", "Iter", "Tasks")]
+    for run in runs:
+        rows.append((run["name"], run["phase"], f"{run['iteration']}/{run['max_iterations']}",
+                     f"{run['tasks_done']}/{run['tasks_total']}"))
+    return _table(rows)
+
+
+def format_comparison(rows):
+    table = [("Spec", "Provider", "Runs", "Tasks", "Tasks/h", "Verify pass", "Dishonest", "Mean iter")]
+    for row in rows:
+        table.append((row["spec"], row["provider"], str(row["runs"]), str(row["tasks_done"]),
+                      "-" if row["tasks_per_hour"] is None else f"{row['tasks_per_hour']:.1f}",
+                      _rate(row["verify_pass"], row["verify_total"], row["verify_rate"]),
+                      _rate(row["dishonest"], row["honesty_total"], row["dishonest_rate"]),
+                      _duration(row["mean_iteration"])))
+    return _table(table)
+
+
+def render(runs_root, runs, providers):
+    parts = []
+    schedule = scheduler.load(Path(runs_root) / SCHEDULE_DIR)
+    if schedule.get("jobs"):
+        parts.append(scheduler.format_status(schedule))
+    if runs:
+        ordered = [runs[name] for name in sorted(runs)]
+        parts.append(format_runs(ordered))
+        parts.append(format_comparison(compare(ordered, providers)))
+    elif not schedule.get("jobs"):
+        parts.append("  No active runs found.")
+    return "\n\n".join(parts)
+
+
+def watch(runs_root, providers, out=sys.stdout, interval=POLL_INTERVAL, rounds=None):
+    """Redraw the status whenever a run changes; until interrupted (or `rounds` polls)."""
+    signatures = {}
+    runs = {}
+    schedule_sig = None
+    with ThreadPoolExecutor(MAX_READERS) as pool:
+        while rounds is None or rounds > 0:
+            dirs = run_dirs(runs_root)
+            current = {d.name: signature(d) for d in dirs}
+            changed = [d for d in dirs if signatures.get(d.name) != current[d.name]]
+            try:
+                st = (Path(runs_root) / SCHEDULE_DIR / scheduler.SCHEDULE_FILE).stat()
+                sched = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                sched = None
+            if changed or current.keys() != signatures.keys() or sched != schedule_sig:
+                runs = {name: run for name, run in runs.items() if name in current}
+                runs.update(collect(changed, pool))
+                signatures, schedule_sig = current, sched
+                stamp = datetime.now().strftime("%H:%M:%S")
+                out.write(f"{CLEAR if out.isatty() else ''}{render(runs_root, runs, providers)}\n\n"
+                          f"Updated {stamp} · watching for changes (Ctrl+C to stop)\n")
+                out.flush()
+            if rounds is not None:
+                rounds -= 1
+                if not rounds:
+                    break
+            time.sleep(interval)
+
+
+def main(argv):
+    options = dict(zip(argv[2::2], argv[3::2]))
+    if len(argv) < 2 or argv[0] not in ("show", "watch") or len(argv[2:]) % 2 or set(options) - {"--config"}:
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+    runs_root = argv[1]
+    providers = provider_names(options["--config"]) if "--config" in options else []
+    if argv[0] == "watch":
+        try:
+            watch(runs_root, providers)
+        except KeyboardInterrupt:
+            pass
+        return 0
+    with ThreadPoolExecutor(MAX_READERS) as pool:
+        runs = collect(run_dirs(runs_root), pool)
+    print(render(runs_root, runs, providers))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""SQLite run store: an index of every run under .more-loop/. Uses only stdlib.
+
+Optional (more-loop --run-store). The markdown files in iterations/ stay the
+human-readable record; the store indexes them so that nothing has to glob
+iterations/ again and so that runs can be queried together. It lives in
+<runs-root>/runs.db, in WAL mode so the dashboard can read while the loop
+(and its parallel task workers) write. It holds:
+
+  runs         one row per run: provider, model, start time, index revision
+  files        N.md / N-verify.md / N-honesty.md with their PASS/FAIL and
+               HONEST/DISHONEST verdicts, stamped with the revision that last
+               changed them (the same entries as state_indexer's JSON index)
+  phases       every line of the run's metrics.jsonl: phase timings and tokens
+  task_events  tasks added, checked off, reopened or removed, per iteration
+
+and the view `iterations` (one row per run and iteration number).
+
+Once a run is registered, state_indexer.py, server.py, context_builder.py and
+more-loop's resume read its iterations from here. After each phase,
+more-loop's timed_phase calls `sync` with the phase's iteration. `sync` only
+stats that iteration's files. It also reads the lines appended to
+metrics.jsonl and diffs tasks.md.
+
+Usage:
+    run_store.py init <run-dir> [model] [provider]   register a run (imports it once)
+    run_store.py sync <run-dir> <iteration>...        index these iterations' files
+    run_store.py last-iteration <run-dir>             highest indexed iteration number
+    run_store.py query <runs-root> <sql>              read-only query, tab-separated
+
+`last-iteration` exits 1 if the run isn't in a store.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import artifacts
+import metrics
+from state_indexer import ITERATION_FILE_RE, classify_verdict, iteration_headers, read_first_line
+
+STORE_FILE = "runs.db"
+SCHEMA_VERSION = 1
+BUSY_TIMEOUT_MS = 10000
+TASK_LINE_RE = re.compile(r'^- \[([ x])\] (.+)$', re.MULTILINE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    name TEXT PRIMARY KEY,
+    provider TEXT NOT NULL DEFAULT '',
+    model TEXT NOT NULL DEFAULT '',
+    started_at TEXT NOT NULL DEFAULT '',
+    current_task_name TEXT NOT NULL DEFAULT '',
+    updated_at TEXT NOT NULL DEFAULT '',
+    rev INTEGER NOT NULL DEFAULT 0,
+    metrics_offset INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS files (
+    run TEXT NOT NULL REFERENCES runs(name) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    result TEXT NOT NULL DEFAULT '',
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    rev INTEGER NOT NULL,
+    indexed_at TEXT NOT NULL,
+    PRIMARY KEY (run, name)
+);
+CREATE TABLE IF NOT EXISTS phases (
+    id INTEGER PRIMARY KEY,
+    run TEXT NOT NULL REFERENCES runs(name) ON DELETE CASCADE,
+    iteration INTEGER,
+    phase TEXT NOT NULL,
+    exit_code INTEGER,
+    duration REAL,
+    finished_at TEXT,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    cache_read_input_tokens INTEGER,
+    cache_creation_input_tokens INTEGER,
+    cost_usd REAL,
+    claude_calls INTEGER
+);
+CREATE INDEX IF NOT EXISTS phases_run ON phases (run, phase);
+CREATE TABLE IF NOT EXISTS tasks (
+    run TEXT NOT NULL REFERENCES runs(name) ON DELETE CASCADE,
+    task TEXT NOT NULL,
+    done INTEGER NOT NULL,
+    PRIMARY KEY (run, task)
+);
+CREATE TABLE IF NOT EXISTS task_events (
+    id INTEGER PRIMARY KEY,
+    run TEXT NOT NULL REFERENCES runs(name) ON DELETE CASCADE,
+    task TEXT NOT NULL,
+    event TEXT NOT NULL,
+    iteration INTEGER,
+    at TEXT NOT NULL
+);
+CREATE VIEW IF NOT EXISTS iterations AS
+    SELECT run, number,
+           MAX(CASE WHEN kind = 'verify' THEN result ELSE '' END) AS verify_result,
+           MAX(CASE WHEN kind = 'honesty' THEN result ELSE '' END) AS honesty_result,
+           MAX(indexed_at) AS updated_at
+    FROM files GROUP BY run, number;
+"""
+
+
+def now_utc():
+    # SQLite's own datetime format, so datetime('now', '-7 days') compares
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def sqlite_time(iso):
+    """'2026-01-02T03:04:05Z' (metrics.jsonl) -> '2026-01-02 03:04:05'."""
+    return str(iso or "").replace("T", " ").rstrip("Z")
+
+
+def parse_tasks(text):
+    return {task: mark == "x" for mark, task in TASK_LINE_RE.findall(text)}
+
+
+class RunStore:
+    """The runs.db of one runs root. Every call opens its own connection, so a
+    RunStore can be shared between threads and processes."""
+
+    def __init__(self, runs_root):
+        self.runs_root = Path(runs_root)
+        self.path = self.runs_root / STORE_FILE
+
+    def connect(self, readonly=False):
+        if readonly:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True,
+                                   timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        else:
+            conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_MS / 1000,
+                                   isolation_level=None)
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def has_run(self, name):
+        if not self.path.exists():
+            return False
+        try:
+            conn = self.connect(readonly=True)
+        except sqlite3.Error:
+            return False
+        try:
+            return conn.execute("SELECT 1 FROM runs WHERE name = ?", (name,)).fetchone() is not None
+        except sqlite3.Error:
+            return False
+        finally:
+            conn.close()
+
+    def register(self, run_dir, model="", provider=""):
+        """Add a run (importing everything it has so far) or update its model/provider."""
+        run_dir = Path(run_dir)
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            new = conn.execute("SELECT 1 FROM runs WHERE name = ?", (run_dir.name,)).fetchone() is None
+            if new:
+                conn.execute("INSERT INTO runs (name, provider, model, updated_at) VALUES (?, ?, ?, ?)",
+                             (run_dir.name, provider, model, now_utc()))
+            else:
+                conn.execute("UPDATE runs SET model = COALESCE(NULLIF(?, ''), model), "
+                             "provider = COALESCE(NULLIF(?, ''), provider) WHERE name = ?",
+                             (model, provider, run_dir.name))
+            try:
+                names = {artifacts.plain_name(e.name) for e in os.scandir(run_dir / "iterations")} if new else []
+            except OSError:
+                names = []
+            self._sync(conn, run_dir, names, None)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def sync(self, run_dir, numbers):
+        """Index the files of the given iterations, new metrics and task changes."""
+        run_dir = Path(run_dir)
+        names = [f"{n}{suffix}.md" for n in numbers for suffix in ("", "-verify", "-honesty")]
+        iteration = max(numbers) if numbers else None
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM runs WHERE name = ?", (run_dir.name,)).fetchone():
+                self._sync(conn, run_dir, names, iteration)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _sync(self, conn, run_dir, names, iteration):
+        run = run_dir.name
+        rev = conn.execute("SELECT rev FROM runs WHERE name = ?", (run,)).fetchone()[0]
+        indexed_at = now_utc()
+        iter_dir = run_dir / "iterations"
+        for name in names:
+            m = ITERATION_FILE_RE.match(name)
+            if not m:
+                continue
+            cached = conn.execute("SELECT mtime_ns, size FROM files WHERE run = ? AND name = ?",
+                                  (run, name)).fetchone()
+            # Compressed files (N-verify.md.gz) are indexed under the plain name
+            path = artifacts.locate(iter_dir / name) or iter_dir / name
+            try:
+                st = path.stat()
+            except OSError:
+                if cached:
+                    conn.execute("DELETE FROM files WHERE run = ? AND name = ?", (run, name))
+                    rev += 1
+                continue
+            if cached and (cached["mtime_ns"], cached["size"]) == (st.st_mtime_ns, st.st_size):
+                continue
+            kind = m.group(3) or "summary"
+            result = "" if kind == "summary" else classify_verdict(kind, read_first_line(path))
+            rev += 1
+            conn.execute(
+                "INSERT OR REPLACE INTO files (run, name, number, kind, result, mtime_ns, size, rev, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run, name, int(m.group(1)), kind, result, st.st_mtime_ns, st.st_size, rev, indexed_at))
+        self._sync_metrics(conn, run_dir)
+        self._sync_tasks(conn, run_dir, iteration, indexed_at)
+        conn.execute("UPDATE runs SET rev = ?, updated_at = ? WHERE name = ?", (rev, indexed_at, run))
+
+    def _sync_metrics(self, conn, run_dir):
+        """Copy the lines metrics.py appended since the last sync into phases."""
+        run = run_dir.name
+        offset = conn.execute("SELECT metrics_offset FROM runs WHERE name = ?", (run,)).fetchone()[0]
+        path = run_dir / metrics.METRICS_FILE
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return
+        if size < offset:
+            # metrics.jsonl was replaced: import it again from the start
+            conn.execute("DELETE FROM phases WHERE run = ?", (run,))
+            offset = 0
+        if size == offset:
+            return
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(size - offset)
+        # A line still being written is picked up by a later sync
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            conn.execute(
+                "INSERT INTO phases (run, iteration, phase, exit_code, duration, finished_at, "
+                "input_tokens, output_tokens, cache_read_input_tokens, cache_creation_input_tokens, "
+                "cost_usd, claude_calls) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run, record.get("iteration"), str(record.get("phase", "unknown")),
+                 record.get("exit_code"), record.get("duration"), sqlite_time(record.get("time")),
+                 *(record.get(field, 0) for field in metrics.TOKEN_FIELDS),
+                 record.get("cost_usd", 0), record.get("claude_calls", 0)))
+        conn.execute("UPDATE runs SET metrics_offset = ? WHERE name = ?", (offset + len(complete), run))
+
+    def _sync_tasks(self, conn, run_dir, iteration, at):
+        """Record tasks.md changes since the last sync as task_events."""
+        run = run_dir.name
+        try:
+            current = parse_tasks((run_dir / "tasks.md").read_text())
+        except (OSError, UnicodeDecodeError):
+            return
+        known = {row["task"]: bool(row["done"])
+                 for row in conn.execute("SELECT task, done FROM tasks WHERE run = ?", (run,))}
+        events = []
+        for task, done in current.items():
+            if task not in known:
+                events.append((task, "added"))
+                if done:
+                    events.append((task, "done"))
+            elif known[task] != done:
+                events.append((task, "done" if done else "reopened"))
+        events += [(task, "removed") for task in known if task not in current]
+        if not events:
+            return
+        conn.executemany("INSERT INTO task_events (run, task, event, iteration, at) VALUES (?, ?, ?, ?, ?)",
+                         [(run, task, event, iteration, at) for task, event in events])
+        conn.execute("DELETE FROM tasks WHERE run = ?", (run,))
+        conn.executemany("INSERT INTO tasks (run, task, done) VALUES (?, ?, ?)",
+                         [(run, task, int(done)) for task, done in current.items()])
+
+    def files(self, run):
+        """(rev, {file name: entry}) in the shape of state_indexer's JSON index."""
+        conn = self.connect(readonly=True)
+        try:
+            row = conn.execute("SELECT rev FROM runs WHERE name = ?", (run,)).fetchone()
+            files = {r["name"]: {"number": r["number"], "kind": r["kind"], "result": r["result"],
+                                 "rev": r["rev"]}
+                     for r in conn.execute("SELECT name, number, kind, result, rev FROM files WHERE run = ?",
+                                           (run,))}
+        finally:
+            conn.close()
+        return (row["rev"] if row else 0), files
+
+    def meta(self, run):
+        conn = self.connect(readonly=True)
+        try:
+            row = conn.execute("SELECT started_at, current_task_name FROM runs WHERE name = ?",
+                               (run,)).fetchone()
+        finally:
+            conn.close()
+        return {k: row[k] for k in row.keys() if row[k]} if row else {}
+
+    def set_meta(self, run, values):
+        conn = self.connect()
+        try:
+            for key in ("started_at", "current_task_name"):
+                if key in values:
+                    conn.execute(f"UPDATE runs SET {key} = ? WHERE name = ?", (values[key], run))
+        finally:
+            conn.close()
+
+    def last_iteration(self, run):
+        conn = self.connect(readonly=True)
+        try:
+            return conn.execute("SELECT COALESCE(MAX(number), 0) FROM files WHERE run = ? AND kind = 'summary'",
+                                (run,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def verify_files(self, run):
+        conn = self.connect(readonly=True)
+        try:
+            return [r[0] for r in conn.execute(
+                "SELECT name FROM files WHERE run = ? AND kind = 'verify' ORDER BY number", (run,))]
+        finally:
+            conn.close()
+
+
+def store_for(run_dir):
+    """The RunStore that has this run registered, or None."""
+    run_dir = Path(run_dir).resolve()
+    store = RunStore(run_dir.parent)
+    return store if store.has_run(run_dir.name) else None
+
+
+class StoreIndexer:
+    """Drop-in for state_indexer.StateIndexer backed by the run store.
+
+    refresh() only stats the files of the iterations it is given; the rest
+    were indexed by more-loop's timed_phase as their phases finished.
+    """
+
+    def __init__(self, run_dir, store):
+        self.run_dir = Path(run_dir)
+        self.name = self.run_dir.resolve().name
+        self.store = store
+        self.meta = store.meta(self.name)
+        self.changed_meta = {}
+        self.files = {}
+        self.rev = 0
+
+    def set_meta(self, key, value):
+        if self.meta.get(key) != value:
+            self.meta[key] = value
+            self.changed_meta[key] = value
+
+    def refresh(self, numbers=()):
+        self.store.sync(self.run_dir.resolve(), [n for n in numbers if n is not None])
+        self.rev, self.files = self.store.files(self.name)
+        return self.headers()
+
+    def headers(self):
+        return iteration_headers(self.files)
+
+    def save(self):
+        if self.changed_meta:
+            self.store.set_meta(self.name, self.changed_meta)
+            self.changed_meta = {}
+
+
+def open_indexer(run_dir):
+    store = store_for(run_dir)
+    return StoreIndexer(run_dir, store) if store else None
+
+
+def query(runs_root, sql, out=None):
+    out = out or sys.stdout
+    conn = RunStore(runs_root).connect(readonly=True)
+    try:
+        cursor = conn.execute(sql)
+        out.write("\t".join(d[0] for d in cursor.description or ()) + "\n")
+        for row in cursor:
+            out.write("\t".join("" if v is None else str(v) for v in row) + "\n")
+    finally:
+        conn.close()
+
+
+def main(argv):
+    command, args = (argv[0], argv[1:]) if argv else (None, [])
+    try:
+        if command == "init" and 1 <= len(args) <= 3:
+            run_dir = Path(args[0]).resolve()
+            RunStore(run_dir.parent).register(run_dir, *args[1:])
+            return 0
+        if command == "sync" and len(args) >= 2:
+            store = store_for(args[0])
+            if store is not None:
+                store.sync(Path(args[0]).resolve(), [int(n) for n in args[1:]])
+            return 0
+        if command == "last-iteration" and len(args) == 1:
+            store = store_for(args[0])
+            if store is None:
+                return 1
+            print(store.last_iteration(Path(args[0]).resolve().name))
+            return 0
+        if command == "query" and len(args) == 2:
+            query(args[0], args[1])
+            return 0
+    except (sqlite3.Error, OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""Run a batch of multi-loop jobs under concurrency limits. Uses only stdlib.
+
+`multi-loop --schedule` queues one job per (spec, provider) pair instead of
+starting every provider at once. At most --max-parallel jobs run at a time,
+and at most `max_parallel` per provider (providers.json, default 1), so runs
+sharing an API key don't trip each other's rate limits.
+
+A job that fails on a rate limit is not lost. more-loop exits with
+RATE_LIMIT_EXIT as soon as a call is rate limited (see stop_if_rate_limited);
+other CLIs are caught by a 429/overloaded error at the end of their log. The
+provider then cools down with exponential backoff and the job is requeued:
+more-loop jobs continue with `--resume <run-dir> -n <iterations left>`,
+other CLIs start over.
+
+Layout (.more-loop/.schedule, hidden from the dashboard's run list):
+    jobs.json             every job's state, rewritten atomically
+    jobs/<id>/start.sh    the provider command, written by multi-loop
+    jobs/<id>/resume.sh   the same with --resume (more-loop providers only)
+    logs/<id>.log         the job's output, across attempts
+
+Usage (called by multi-loop):
+    scheduler.py add <schedule-dir> <id> <provider> <spec> [iterations]
+    scheduler.py run <schedule-dir> [--max-parallel N] [--config providers.json]
+    scheduler.py status <schedule-dir>
+"""
+
+import json
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+SCHEDULE_FILE = "jobs.json"
+# EX_TEMPFAIL: more-loop's exit code when it stops on a rate limit
+RATE_LIMIT_EXIT = 75
+RATE_LIMIT_RE = re.compile(
+    r"(?<!\d)(?:429|529)(?!\d)|rate[ _-]?limit|overloaded|too many requests", re.I)
+LOG_TAIL_BYTES = 16 * 1024
+RUN_DIR_RE = re.compile(r"Run directory: (\S+)")
+ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+
+DEFAULT_MAX_PARALLEL = 2
+DEFAULT_PROVIDER_LIMIT = 1
+BACKOFF_BASE = 60.0
+BACKOFF_MAX = 900.0
+# Rate limits one job may hit before it is given up on
+MAX_RATE_LIMITS = 8
+POLL_INTERVAL = 1.0
+
+# Jobs in these states still need the scheduler
+ACTIVE = ("queued", "running", "waiting")
+
+
+def load(sched_dir):
+    try:
+        with open(Path(sched_dir) / SCHEDULE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"jobs": [], "cooldowns": {}}
+
+
+def save(sched_dir, data):
+    path = Path(sched_dir) / SCHEDULE_FILE
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def add_job(sched_dir, job_id, provider, spec, iterations=None):
+    Path(sched_dir, "logs").mkdir(parents=True, exist_ok=True)
+    data = load(sched_dir)
+    data["jobs"] = [j for j in data["jobs"] if j["id"] != job_id]
+    data["jobs"].append({
+        "id": job_id, "provider": provider, "spec": spec, "iterations": iterations,
+        "state": "queued", "attempts": 0, "rate_limits": 0, "run_dir": "",
+        "exit_code": None, "not_before": 0, "log_offset": 0, "note": "",
+    })
+    save(sched_dir, data)
+
+
+def provider_limits(config_file):
+    """Per-provider `max_parallel` from providers.json."""
+    try:
+        with open(config_file) as f:
+            providers = json.load(f).get("providers", {})
+    except (OSError, ValueError):
+        return {}
+    return {name: int(cfg["max_parallel"]) for name, cfg in providers.items()
+            if isinstance(cfg, dict) and str(cfg.get("max_parallel", "")).isdigit()}
+
+
+def backoff(strikes, base=BACKOFF_BASE):
+    """Cooldown after a provider's Nth rate limit in a row, with jitter."""
+    delay = min(BACKOFF_MAX, base * 2 ** (strikes - 1))
+    return delay * random.uniform(0.75, 1.0)
+
+
+def read_log(path, offset=0, limit=LOG_TAIL_BYTES, tail=True):
+    """Up to `limit` bytes of a job log after `offset`, from its end (tail) or start."""
+    try:
+        with open(path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            start = max(offset, size - limit) if tail else offset
+            f.seek(min(start, size))
+            return ANSI_RE.sub("", f.read(limit).decode(errors="replace"))
+    except OSError:
+        return ""
+
+
+def is_rate_limited(exit_code, log_text):
+    if exit_code == RATE_LIMIT_EXIT:
+        return True
+    return exit_code != 0 and bool(RATE_LIMIT_RE.search(log_text))
+
+
+def last_iteration(run_dir):
+    numbers = [int(p.stem) for p in Path(run_dir, "iterations").glob("*.md") if p.stem.isdigit()]
+    return max(numbers, default=0)
+
+
+def run_progress(run_dir):
+    """Phase, last iteration and task counts of a more-loop run directory."""
+    if not run_dir or not Path(run_dir).is_dir():
+        return {}
+    progress = {"iteration": last_iteration(run_dir), "phase": ""}
+    try:
+        with open(Path(run_dir) / "state.json") as f:
+            progress["phase"] = json.load(f).get("phase", "")
+    except (OSError, ValueError):
+        pass
+    try:
+        tasks = Path(run_dir, "tasks.md").read_text(errors="replace")
+    except OSError:
+        return progress
+    progress["tasks_total"] = len(re.findall(r"^\s*- \[[ xX]\]", tasks, re.M))
+    progress["tasks_done"] = len(re.findall(r"^\s*- \[[xX]\]", tasks, re.M))
+    return progress
+
+
+class Scheduler:
+    """Starts, reaps and requeues the jobs of one schedule directory."""
+
+    def __init__(self, sched_dir, max_parallel=DEFAULT_MAX_PARALLEL, limits=None,
+                 backoff_base=BACKOFF_BASE, poll=POLL_INTERVAL, log=print):
+        self.dir = Path(sched_dir)
+        self.data = load(self.dir)
+        self.data.setdefault("cooldowns", {})
+        self.max_parallel = max(1, max_parallel)
+        self.limits = limits or {}
+        self.backoff_base = backoff_base
+        self.poll = poll
+        self.log = log
+        self.procs = {}
+        self.stopping = False
+
+    def jobs(self, *states):
+        return [j for j in self.data["jobs"] if j["state"] in states]
+
+    def limit(self, provider):
+        return self.limits.get(provider, DEFAULT_PROVIDER_LIMIT)
+
+    def runnable(self, now):
+        """Jobs to start now, in queue order, within every limit."""
+        running = {}
+        for job in self.jobs("running"):
+            running[job["provider"]] = running.get(job["provider"], 0) + 1
+        slots = self.max_parallel - sum(running.values())
+        picked = []
+        for job in self.jobs("queued", "waiting"):
+            if slots <= 0:
+                break
+            provider = job["provider"]
+            cooldown = self.data["cooldowns"].get(provider, {})
+            if job["not_before"] > now or cooldown.get("until", 0) > now:
+                continue
+            if running.get(provider, 0) >= self.limit(provider):
+                continue
+            running[provider] = running.get(provider, 0) + 1
+            slots -= 1
+            picked.append(job)
+        return picked
+
+    def start(self, job, now):
+        job_dir = self.dir / "jobs" / job["id"]
+        log_path = self.dir / "logs" / f"{job['id']}.log"
+        env = dict(os.environ, MORE_LOOP_EXIT_ON_RATE_LIMIT="1")
+        script = job_dir / "start.sh"
+        run_dir = job["run_dir"]
+        if run_dir and (job_dir / "resume.sh").exists() and Path(run_dir, "tasks.md").exists():
+            # Requeued more-loop run: pick up where it stopped
+            left = job["iterations"] - last_iteration(run_dir) if job["iterations"] else 1
+            if left <= 0:
+                self.finish(job, "done", 0, "no iterations left")
+                return
+            script = job_dir / "resume.sh"
+            env.update(MULTI_LOOP_RUN_DIR=run_dir, MULTI_LOOP_ITERATIONS=str(left))
+        with open(log_path, "ab") as log_file:
+            job["log_offset"] = log_file.tell()
+            log_file.write(f"\n━━━ {job['id']} attempt {job['attempts'] + 1} · "
+                           f"{datetime.now().strftime('%H:%M:%S')} ━━━\n".encode())
+            log_file.flush()
+            # Own process group, so a stop reaches the whole job
+            proc = subprocess.Popen(["bash", str(script)], stdout=log_file, stderr=subprocess.STDOUT,
+                                    stdin=subprocess.DEVNULL, env=env, start_new_session=True)
+        self.procs[job["id"]] = proc
+        job.update(state="running", attempts=job["attempts"] + 1, started_at=now,
+                   note="resumed" if script.name == "resume.sh" else "")
+        self.log(f"{job['id']}: started ({job['provider']}, attempt {job['attempts']})")
+
+    def finish(self, job, state, exit_code, note=""):
+        job.update(state=state, exit_code=exit_code, note=note, finished_at=time.time())
+        self.log(f"{job['id']}: {state}" + (f" ({note})" if note else ""))
+
+    def reap(self, now):
+        for job_id, proc in list(self.procs.items()):
+            code = proc.poll()
+            if code is None:
+                continue
+            del self.procs[job_id]
+            job = next(j for j in self.data["jobs"] if j["id"] == job_id)
+            log_path = self.dir / "logs" / f"{job_id}.log"
+            head = read_log(log_path, job["log_offset"], tail=False)
+            found = RUN_DIR_RE.findall(head)
+            if found:
+                job["run_dir"] = found[-1]
+            cooldown = self.data["cooldowns"].setdefault(job["provider"], {"until": 0, "strikes": 0})
+            if self.stopping:
+                self.finish(job, "stopped", code)
+            elif code == 0:
+                cooldown["strikes"] = 0
+                self.finish(job, "done", 0)
+            elif is_rate_limited(code, read_log(log_path, job["log_offset"])):
+                job["rate_limits"] += 1
+                if job["rate_limits"] > MAX_RATE_LIMITS:
+                    self.finish(job, "failed", code, f"rate limited {job['rate_limits']} times")
+                    continue
+                # One cooldown per provider: its other jobs would hit the same limit
+                cooldown["strikes"] += 1
+                delay = backoff(cooldown["strikes"], self.backoff_base)
+                cooldown["until"] = max(cooldown["until"], now + delay)
+                job.update(state="waiting", exit_code=code, not_before=cooldown["until"],
+                           note=f"rate limited, retry in {delay:.0f}s")
+                self.log(f"{job_id}: rate limited, {job['provider']} cools down for {delay:.0f}s")
+            else:
+                self.finish(job, "failed", code, f"exit {code}")
+
+    def stop(self, *_):
+        self.stopping = True
+        for proc in self.procs.values():
+            try:
+                os.killpg(proc.pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    def run(self):
+        # An interrupted schedule continues with the jobs it was running
+        for job in self.jobs("running", "stopped"):
+            job["state"] = "queued"
+        for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+            signal.signal(sig, self.stop)
+        while True:
+            now = time.time()
+            self.reap(now)
+            if not self.stopping:
+                for job in self.runnable(now):
+                    self.start(job, now)
+            save(self.dir, self.data)
+            if not self.procs and (self.stopping or not self.jobs(*ACTIVE)):
+                break
+            time.sleep(self.poll)
+        done = len(self.jobs("done"))
+        self.log(f"Schedule finished: {done}/{len(self.data['jobs'])} jobs done")
+        return 0 if done == len(self.data["jobs"]) else 1
+
+
+def format_status(data, now=None):
+    now = now or time.time()
+    rows = [("Job", "Provider", "State", "Tries", "Phase", "Iter", "Tasks", "Note")]
+    for job in data.get("jobs", []):
+        progress = run_progress(job.get("run_dir"))
+        note = job.get("note", "")
+        if job["state"] == "waiting":
+            note = f"rate limited ×{job['rate_limits']}, retry in {max(0, job['not_before'] - now):.0f}s"
+        iteration = str(progress.get("iteration", "-"))
+        if progress and job.get("iterations"):
+            iteration += f"/{job['iterations']}"
+        tasks = f"{progress['tasks_done']}/{progress['tasks_total']}" if "tasks_total" in progress else "-"
+        rows.append((job["id"], job["provider"], job["state"], str(job["attempts"]),
+                     progress.get("phase") or "-", iteration, tasks, note))
+    widths = [max(len(r[i]) for r in rows) for i in range(len(rows[0]) - 1)]
+    return "\n".join(" ".join(c.ljust(w) for c, w in zip(r, widths)) + " " + r[-1] for r in rows)
+
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == "status":
+        data = load(argv[1])
+        if not data["jobs"]:
+            print("No scheduled jobs.")
+            return 1
+        print(format_status(data))
+        return 0
+    if len(argv) in (5, 6) and argv[0] == "add":
+        iterations = int(argv[5]) if len(argv) == 6 and argv[5].isdigit() else None
+        add_job(argv[1], argv[2], argv[3], argv[4], iterations)
+        return 0
+    if len(argv) >= 2 and argv[0] == "run":
+        options = dict(zip(argv[2::2], argv[3::2]))
+        if len(argv[2:]) % 2 or set(options) - {"--max-parallel", "--config"}:
+            print(__doc__.strip(), file=sys.stderr)
+            return 2
+        limits = provider_limits(options["--config"]) if "--config" in options else {}
+        max_parallel = int(options.get("--max-parallel", DEFAULT_MAX_PARALLEL))
+
+        def log(message):
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}", flush=True)
+
+        return Scheduler(argv[1], max_parallel, limits, log=log).run()
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,174 +1,1307 @@
 #!/usr/bin/env python3
-"""Simple HTTP server for more-loop web dashboard. Uses only stdlib."""
+"""Simple HTTP server for more-loop web dashboard. Uses only stdlib.
 
+Usage:
+    server.py <run-dir> [port]                  serve a single run at /
+    server.py --shared <runs-root> [port]       serve every run under runs-root
+                                                at /runs/<name>/
+    server.py --attach <run-dir> <pid> [port]   register a run (owned by pid)
+                                                with the shared server for its
+                                                runs root, starting it if needed;
+                                                prints the run's dashboard URL
+"""
+
+import ctypes
+import ctypes.util
+import email.utils
+import fcntl
+import gzip
+import html
 import json
 import os
+import re
+import select
 import signal
+import stat
+import struct
+import subprocess
 import sys
-import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from pathlib import Path
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+from urllib.request import Request, urlopen
+
+import artifacts
+import claude_stream
+import metrics
+import review_store
+import state_indexer
+from state_indexer import atomic_write
 
-RUN_DIR = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(".")
-PORT = int(sys.argv[2]) if len(sys.argv) > 2 else 0
-SIGNAL_APPROVE = RUN_DIR / ".signal-approve"
-SIGNAL_STOP = RUN_DIR / ".signal-stop"
-SIGNAL_REQUEST_CHANGES = RUN_DIR / ".signal-request-changes"
-REVIEWS_FILE = RUN_DIR / "reviews.json"
-TEST_GUIDE_FILE = RUN_DIR / "test-guide.md"
+try:
+    import run_store
+except ImportError:
+    # Python built without sqlite3: runs are read from their JSON index
+    run_store = None
+
+MODES = ("--shared", "--attach")
+MODE = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] in MODES else None
+ARGS = sys.argv[2:] if MODE else sys.argv[1:]
+RUN_DIR = Path(ARGS[0]) if ARGS else Path(".")
+PORT = int(ARGS[1]) if len(ARGS) > 1 and MODE != "--attach" else 0
 DATA_DIR = Path.home() / ".local" / "share" / "more-loop"
+# Set in shared mode: runs are the subdirectories of this directory
+RUNS_ROOT = None
 
+# Files whose changes are pushed to /events subscribers, and their event names
+WATCHED_FILES = {"state.json": "state", "reviews.json": "reviews", "reviews.journal": "reviews",
+                 "test-guide.md": "test-guide"}
+SSE_KEEPALIVE = 15.0
+POLL_INTERVAL = 0.5
+# Bodies smaller than this are not worth a gzip copy
+GZIP_MIN_SIZE = 1024
+# Worker pool: connections beyond MAX_WORKERS wait (up to MAX_QUEUED), then get 503
+MAX_WORKERS = 32
+MAX_QUEUED = 64
+# Event streams pin a worker each, so they get a smaller cap of their own
+MAX_EVENT_STREAMS = 16
+# /iterations/<n>/stream: most bytes per response (clients continue from
+# X-Stream-Offset), and how long a followed log may stay quiet before the
+# response ends
+STREAM_CHUNK = 1 << 20
+# /iterations/<n>/<kind>: bodies are copied in blocks, never read whole
+ARTIFACT_BLOCK = 64 * 1024
+ARTIFACT_TYPES = {"checks": "application/json"}
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+STREAM_IDLE_TIMEOUT = 60.0
+# Request bodies are read BODY_BLOCK bytes at a time, up to a per-route limit
+MAX_BODY = 1 << 20
+MAX_REVIEW_BODY = 64 * 1024
+BODY_BLOCK = 64 * 1024
+# Idle keep-alive connections (and stalled reads) give their worker back after this
+KEEPALIVE_TIMEOUT = 15
+# Shared server: how often owners are checked, and how long to wait for the first
+ATTACH_CHECK_INTERVAL = 2.0
+ATTACH_GRACE = 30.0
+# How long --attach waits for a freshly started shared server to report its URL
+STARTUP_TIMEOUT = 10.0
 
-def atomic_write(path, content):
-    """Write content to path atomically via temp file + rename.
 
-    Prevents readers from seeing partial/truncated content during writes.
-    os.rename() is atomic on the same filesystem (POSIX guarantee).
-    """
-    fd, tmp = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
-    closed = False
+# inotify(7) constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _inotify_libc():
+    """Return libc with inotify symbols, or None on platforms without it."""
     try:
-        os.write(fd, content.encode() if isinstance(content, str) else content)
-        os.close(fd)
-        closed = True
-        os.rename(tmp, str(path))
-    except BaseException:
-        if not closed:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class RunWatcher:
+    """Watch a run directory and wake /events clients when watched files change.
+
+    Uses inotify on Linux and falls back to mtime polling elsewhere. Either way
+    a file only counts as changed when its (inode, mtime, size) signature
+    differs from the last one seen, so spurious events never reach clients.
+    """
+
+    def __init__(self, run_dir, names=WATCHED_FILES):
+        self.run_dir = Path(run_dir)
+        self.names = tuple(names)
+        self.cond = threading.Condition()
+        self.seq = 0
+        self.versions = {name: 0 for name in self.names}
+        self.signatures = {name: self._signature(name) for name in self.names}
+        self.mode = None
+
+    def _signature(self, name):
+        try:
+            st = (self.run_dir / name).stat()
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _check(self, name):
+        sig = self._signature(name)
+        with self.cond:
+            if sig == self.signatures[name]:
+                return
+            self.signatures[name] = sig
+            self.seq += 1
+            self.versions[name] = self.seq
+            self.cond.notify_all()
+
+    def start(self):
+        fd = self._init_inotify()
+        if fd is not None:
+            self.mode = "inotify"
+            target, args = self._inotify_loop, (fd,)
+        else:
+            self.mode = "poll"
+            target, args = self._poll_loop, ()
+        threading.Thread(target=target, args=args, daemon=True).start()
+        return self
+
+    def _init_inotify(self):
+        libc = _inotify_libc()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE
+        if libc.inotify_add_watch(fd, os.fsencode(self.run_dir), mask) < 0:
             os.close(fd)
+            return None
+        return fd
+
+    def _inotify_loop(self, fd):
+        while True:
+            try:
+                buf = os.read(fd, 64 * 1024)
+            except OSError:
+                return self._poll_loop()
+            offset = 0
+            while offset + IN_EVENT_HEADER.size <= len(buf):
+                _, _, _, length = IN_EVENT_HEADER.unpack_from(buf, offset)
+                offset += IN_EVENT_HEADER.size
+                name = buf[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                if name in self.versions:
+                    self._check(name)
+
+    def _poll_loop(self):
+        while True:
+            time.sleep(POLL_INTERVAL)
+            for name in self.names:
+                self._check(name)
+
+    def snapshot(self):
+        with self.cond:
+            return self.seq, dict(self.versions)
+
+    def wait_for_change(self, seq, timeout):
+        """Block until a change newer than seq (or timeout). Returns snapshot()."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq != seq, timeout)
+            return self.seq, dict(self.versions)
+
+
+class CachedFile:
+    """Bytes of a file as last served, plus validators and a gzipped copy."""
+
+    def __init__(self, signature, body, mtime):
+        self.signature = signature
+        self.body = body
+        self.gzip_body = gzip.compress(body, mtime=0) if len(body) >= GZIP_MIN_SIZE else None
+        self.etag = '"%x-%x-%x"' % signature
+        self.last_modified = email.utils.formatdate(mtime, usegmt=True)
+        self.mtime = int(mtime)
+        self.valid_json = None
+        self.parsed = None
+
+
+class ArtifactFile:
+    """Validators for an iteration artifact that is served without caching it."""
+
+    def __init__(self, st, size):
+        self.size = size
+        self.etag = '"%x-%x-%x"' % (st.st_ino, st.st_mtime_ns, size)
+        self.last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+        self.mtime = int(st.st_mtime)
+
+
+class FileCache:
+    """In-memory cache of served files keyed by (inode, mtime, size).
+
+    A request only costs a stat() while the file is unchanged; the file is
+    re-read (and re-gzipped) once per change, not once per request.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def get(self, path):
+        """Return the CachedFile for path, or None if it can't be read."""
+        key = str(path)
         try:
-            os.unlink(tmp)
+            st = os.stat(key)
         except OSError:
-            pass
-        raise
+            with self.lock:
+                self.entries.pop(key, None)
+            return None
+        signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.signature == signature:
+                return entry
+        try:
+            with open(key, "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        entry = CachedFile(signature, body, st.st_mtime)
+        with self.lock:
+            self.entries[key] = entry
+        return entry
+
+
+FILE_CACHE = FileCache()
+
+
+class Run:
+    """The files of one run directory that the dashboard reads and writes."""
+
+    def __init__(self, run_dir):
+        self.dir = Path(run_dir)
+        self.name = self.dir.name
+        self.signal_approve = self.dir / ".signal-approve"
+        self.signal_stop = self.dir / ".signal-stop"
+        self.signal_request_changes = self.dir / ".signal-request-changes"
+        self.reviews_file = self.dir / "reviews.json"
+        self.test_guide_file = self.dir / "test-guide.md"
+        self.control = self.dir / ".control"
+
+    def send_control(self, command):
+        """Wake the loop through its control FIFO. Returns True if delivered.
+
+        Best effort: the signal file written just before stays the fallback
+        when the loop has no channel open (no FIFO, or nobody reading it).
+        """
+        try:
+            if not stat.S_ISFIFO(os.stat(self.control).st_mode):
+                return False
+            fd = os.open(self.control, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError:
+            return False
+        try:
+            os.write(fd, f"{command}\n".encode())
+            return True
+        except OSError:
+            return False
+        finally:
+            os.close(fd)
+
+
+class RunRegistry:
+    """Runs attached to the shared server, with the pid of the more-loop owning each.
+
+    The shared server lives as long as any owner does: once every registered
+    owner has exited (or nobody registers within ATTACH_GRACE), it closes the
+    registry and shuts down. A closed registry refuses registrations, so a late
+    --attach starts a fresh server instead of joining one that is going away.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.owners = {}
+        self.attached = False
+        self.closed = False
+
+    def register(self, name, pid):
+        with self.lock:
+            if self.closed:
+                return False
+            self.owners[name] = pid
+            self.attached = True
+            return True
+
+    def is_active(self, name):
+        with self.lock:
+            pid = self.owners.get(name)
+        return pid is not None and pid_alive(pid)
+
+    def close_if_idle(self, grace_expired):
+        """Close the registry if no owner is alive. Returns True once closed."""
+        with self.lock:
+            if not self.closed:
+                self.owners = {n: p for n, p in self.owners.items() if pid_alive(p)}
+                if self.owners or not (self.attached or grace_expired):
+                    return False
+                self.closed = True
+            return True
+
+
+REGISTRY = RunRegistry()
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def default_state(run_name):
+    """State served before more-loop has written its first state.json."""
+    return {
+        "run_name": run_name,
+        "phase": "initializing",
+        "tasks_total": 0,
+        "tasks_completed": 0,
+        "iterations_total": 0,
+        "iterations_rev": 0,
+        "latest_iteration": None,
+    }
+
+
+def load_state(run_dir):
+    """Return a run's parsed state.json (parsed once per change), or None."""
+    entry = FILE_CACHE.get(Path(run_dir) / "state.json")
+    if entry is None:
+        return None
+    if entry.parsed is None:
+        try:
+            data = json.loads(entry.body)
+            entry.parsed = data if isinstance(data, dict) else {}
+        except ValueError:
+            entry.parsed = {}
+    return entry.parsed
+
+
+def run_dirs(runs_root):
+    """The run directories under runs_root, by name."""
+    try:
+        entries = sorted(os.scandir(runs_root), key=lambda e: e.name)
+    except OSError:
+        return []
+    return [e for e in entries if not e.name.startswith(".") and e.is_dir()]
+
+
+def run_summaries(runs_root):
+    """Progress of every run under runs_root, for the shared server's index."""
+    summaries = []
+    for entry in run_dirs(runs_root):
+        state = load_state(entry.path) or default_state(entry.name)
+        summaries.append({
+            "name": entry.name,
+            "url": f"/runs/{quote(entry.name)}/",
+            "active": REGISTRY.is_active(entry.name),
+            "phase": state.get("phase", ""),
+            "current_iteration": state.get("current_iteration", 0),
+            "max_iterations": state.get("max_iterations", 0),
+            "tasks_completed": state.get("tasks_completed", 0),
+            "tasks_total": state.get("tasks_total", 0),
+            "iterations_total": state.get("iterations_total", 0),
+            "updated_at": state.get("updated_at", ""),
+        })
+    return summaries
+
+
+def render_index(summaries):
+    """Minimal HTML page linking every run's dashboard (active runs marked)."""
+    rows = []
+    for summary in summaries:
+        e = {k: html.escape(str(v)) for k, v in summary.items()}
+        marker = " &#9679;" if summary["active"] else ""
+        rows.append(
+            f'<tr><td><a href="{e["url"]}">{e["name"]}</a>{marker}</td><td>{e["phase"]}</td>'
+            f'<td>{e["current_iteration"]}/{e["max_iterations"]}</td>'
+            f'<td>{e["tasks_completed"]}/{e["tasks_total"]}</td><td>{e["updated_at"]}</td></tr>'
+        )
+    body = "".join(rows) or '<tr><td colspan="5">No runs yet.</td></tr>'
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8">'
+        '<meta http-equiv="refresh" content="5">'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        "<title>more-loop runs</title></head><body><h1>more-loop runs</h1>"
+        "<table><tr><th>Run</th><th>Phase</th><th>Iteration</th><th>Tasks</th>"
+        f"<th>Updated</th></tr>{body}</table></body></html>"
+    )
+
+
+def load_index(run_dir):
+    """Return (rev, files) from the run's state index, parsed once per change.
+
+    Runs registered in the SQLite run store are read from there instead.
+    """
+    if run_store is not None:
+        store = run_store.store_for(run_dir)
+        if store is not None:
+            return store.files(Path(run_dir).resolve().name)
+    entry = FILE_CACHE.get(Path(run_dir) / state_indexer.INDEX_FILE)
+    if entry is None:
+        return 0, {}
+    if entry.parsed is None:
+        try:
+            data = json.loads(entry.body)
+            if data.get("version") != state_indexer.INDEX_VERSION:
+                raise ValueError("stale index version")
+            entry.parsed = (data.get("rev", 0), data.get("files", {}))
+        except (ValueError, AttributeError):
+            entry.parsed = (0, {})
+    return entry.parsed
+
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+_metrics_readers = {}
+_metrics_lock = threading.Lock()
+_event_streams = threading.BoundedSemaphore(MAX_EVENT_STREAMS)
+_write_locks = {}
+_write_locks_lock = threading.Lock()
+_review_stores = {}
+_review_stores_lock = threading.Lock()
+
+
+def write_lock(path):
+    """Per-file lock serializing multi-step writes (e.g. write + signal).
+
+    atomic_write alone keeps every single write whole; the lock keeps a
+    handler's sequence of writes from interleaving with another handler's.
+    """
+    key = str(Path(path).resolve())
+    with _write_locks_lock:
+        return _write_locks.setdefault(key, threading.Lock())
+
+
+def review_store_for(run_dir):
+    """The run's ReviewStore, kept so that single-review changes read only new journal lines."""
+    key = str(Path(run_dir).resolve())
+    with _review_stores_lock:
+        store = _review_stores.get(key)
+        if store is None:
+            store = _review_stores[key] = review_store.ReviewStore(run_dir)
+        return store
+
+
+def phase_metrics(run_dir):
+    """Per-phase totals of the run's metrics.jsonl, reading only new lines."""
+    key = str(Path(run_dir).resolve())
+    with _metrics_lock:
+        reader = _metrics_readers.get(key)
+        if reader is None:
+            reader = _metrics_readers[key] = metrics.MetricsReader(Path(run_dir) / metrics.METRICS_FILE)
+        return {phase: dict(totals) for phase, totals in reader.refresh().items()}
+
+
+def get_watcher(run_dir):
+    """Return the shared, already-started watcher for run_dir."""
+    key = str(Path(run_dir).resolve())
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = _watchers[key] = RunWatcher(run_dir).start()
+        return watcher
+
+
+class DashboardServer(HTTPServer):
+    """HTTP server that handles connections on a bounded worker pool.
+
+    Unlike ThreadingHTTPServer it never spawns more than max_workers threads;
+    a flood of connections queues up to max_queued and is then refused with
+    503, so one runaway client can't starve /approve and /stop.
+    """
+
+    def __init__(self, server_address, handler_class, max_workers=MAX_WORKERS,
+                 max_queued=MAX_QUEUED):
+        super().__init__(server_address, handler_class)
+        self.pool = ThreadPoolExecutor(max_workers, thread_name_prefix="dashboard")
+        self.slots = threading.BoundedSemaphore(max_workers + max_queued)
+
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            try:
+                request.sendall(b"HTTP/1.1 503 Service Unavailable\r\n"
+                                b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        self.pool.submit(self.process_request_worker, request, client_address)
+
+    def process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
 
 
 class DashboardHandler(BaseHTTPRequestHandler):
+    # Persistent connections: every response carries a Content-Length
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_TIMEOUT
+
     def log_message(self, format, *args):
         pass
 
     def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
         self.send_response(status)
         self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
         self.send_header("Access-Control-Allow-Origin", "*")
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
 
-    def read_json_body(self):
-        """Read and parse JSON from request body. Returns (data, error_msg)."""
-        content_length = int(self.headers.get("Content-Length", 0))
-        if content_length == 0:
-            return None, "Empty request body"
+    def read_body(self, limit):
+        """Read the request body in blocks. Returns (body, error, status)."""
+        self.body_consumed = True
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            return self.read_chunked_body(limit)
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            return None, "Invalid Content-Length", 400
+        if content_length > limit:
+            # Left unread: end_headers closes the connection instead
+            self.body_consumed = False
+            return None, "Request body too large", 413
+        chunks = []
+        remaining = content_length
         try:
-            body = self.rfile.read(content_length)
-            return json.loads(body), None
-        except (json.JSONDecodeError, ValueError):
-            return None, "Invalid JSON"
+            while remaining > 0:
+                data = self.rfile.read(min(remaining, BODY_BLOCK))
+                if not data:
+                    break
+                chunks.append(data)
+                remaining -= len(data)
+        except OSError:
+            pass
+        if remaining > 0:
+            self.close_connection = True
+            return None, "Incomplete request body", 400
+        return b"".join(chunks), None, 200
 
-    def do_GET(self):
-        if self.path == "/":
-            dashboard = DATA_DIR / "dashboard.html"
-            if dashboard.exists():
+    def read_chunked_body(self, limit):
+        chunks = []
+        size = 0
+        try:
+            while True:
+                line = self.rfile.readline(BODY_BLOCK)
+                chunk_size = int(line.split(b";", 1)[0].strip(), 16)
+                if chunk_size == 0:
+                    # Trailers, up to the blank line that ends the body
+                    while self.rfile.readline(BODY_BLOCK) not in (b"\r\n", b"\n", b""):
+                        pass
+                    return b"".join(chunks), None, 200
+                size += chunk_size
+                if size > limit:
+                    self.body_consumed = False
+                    return None, "Request body too large", 413
+                while chunk_size > 0:
+                    data = self.rfile.read(min(chunk_size, BODY_BLOCK))
+                    if not data:
+                        raise EOFError
+                    chunks.append(data)
+                    chunk_size -= len(data)
+                self.rfile.readline(BODY_BLOCK)
+        except (OSError, ValueError, EOFError):
+            self.body_consumed = False
+            return None, "Incomplete request body", 400
+
+    def read_json_body(self, limit=MAX_BODY):
+        """Read and parse JSON from request body. Returns (data, error_msg, status)."""
+        body, err, status = self.read_body(limit)
+        if err:
+            return None, err, status
+        if not body:
+            return None, "Empty request body", 400
+        try:
+            return json.loads(body), None, 200
+        except ValueError:
+            return None, "Invalid JSON", 400
+
+    def json_request(self, field=None, limit=MAX_BODY):
+        """Parse a JSON object body with field, or send the error and return None."""
+        data, err, status = self.read_json_body(limit)
+        if err:
+            self.send_json({"error": err}, status)
+            return None
+        if not isinstance(data, dict) or (field is not None and field not in data):
+            self.send_json({"error": f"Missing '{field}' field" if field else "Expected a JSON object"}, 400)
+            return None
+        return data
+
+    def not_modified(self, entry):
+        """True if the request's validators match the cached entry."""
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [t.strip() for t in if_none_match.split(",")]
+            return "*" in tags or entry.etag in tags or entry.etag[:-1] + '-gz"' in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return entry.mtime <= since
+        return False
+
+    def send_cached(self, entry, content_type):
+        """Send a cached file as-is, honoring conditional GET and gzip."""
+        body, etag = entry.body, entry.etag
+        use_gzip = entry.gzip_body is not None and "gzip" in self.headers.get("Accept-Encoding", "")
+        if use_gzip:
+            body, etag = entry.gzip_body, entry.etag[:-1] + '-gz"'
+        not_modified = self.not_modified(entry)
+        self.send_response(304 if not_modified else 200)
+        if not not_modified:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if use_gzip:
+                self.send_header("Content-Encoding", "gzip")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", entry.last_modified)
+        self.send_header("Cache-Control", "no-cache")
+        if entry.gzip_body is not None:
+            self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        if not not_modified:
+            self.wfile.write(body)
+
+    def event_payload(self, name):
+        """Return the SSE data for a watched file (same body as its GET route)."""
+        if WATCHED_FILES[name] == "reviews":
+            store = review_store.ReviewStore(self.run.dir)
+            if not (store.base_file.exists() or store.journal_file.exists()):
+                return None
+            return json.dumps({"reviews": store.load()})
+        entry = FILE_CACHE.get(self.run.dir / name)
+        try:
+            content = entry.body.decode() if entry else None
+        except UnicodeDecodeError:
+            content = None
+        if content is None:
+            if name == "state.json":
+                return json.dumps(default_state(self.run.name))
+            return None
+        if name == "test-guide.md":
+            return json.dumps({"content": content})
+        return content
+
+    def stream_events(self):
+        """Server-Sent Events: push watched files to the client as they change."""
+        if not _event_streams.acquire(blocking=False):
+            # Too many open streams: the dashboard falls back to polling
+            self.send_json({"error": "Too many event streams"}, 503)
+            return
+        try:
+            self.stream_events_locked()
+        finally:
+            _event_streams.release()
+
+    def stream_events_locked(self):
+        watcher = get_watcher(self.run.dir)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.close_connection = True
+        # The stream is idle between events by design; keepalives bound it instead
+        self.connection.settimeout(None)
+
+        seq, versions = watcher.snapshot()
+        pending = ["state.json"]
+        try:
+            self.wfile.write(b"retry: 2000\n\n")
+            while True:
+                # reviews.json and its journal make up one event
+                pending = list({WATCHED_FILES[n]: n for n in pending}.values())
+                for name in pending:
+                    data = self.event_payload(name)
+                    if data is None:
+                        continue
+                    lines = "".join(f"data: {line}\n" for line in data.splitlines() or [""])
+                    self.wfile.write(f"event: {WATCHED_FILES[name]}\n{lines}\n".encode())
+                if not pending:
+                    self.wfile.write(b": keepalive\n\n")
+                self.wfile.flush()
+                new_seq, new_versions = watcher.wait_for_change(seq, SSE_KEEPALIVE)
+                pending = [n for n in watcher.names if new_versions[n] != versions[n]]
+                seq, versions = new_seq, new_versions
+        except OSError:
+            pass
+
+    def send_iteration_headers(self):
+        """GET /iterations?since=R — headers of iterations changed after revision R."""
+        query = parse_qs(urlsplit(self.route).query)
+        try:
+            since = int(query.get("since", ["0"])[0])
+        except ValueError:
+            self.send_json({"error": "Invalid 'since' revision"}, 400)
+            return
+        rev, files = load_index(self.run.dir)
+        if since > rev:
+            # Index was rebuilt since the client's last sync: send everything
+            since = 0
+        self.send_json({
+            "rev": rev,
+            "since": since,
+            "iterations": state_indexer.iteration_headers(files, since),
+        })
+
+    def send_iteration_detail(self, number):
+        """GET /iterations/<n> — summary, verify and honesty output (the last
+        state_indexer.DETAIL_LIMIT bytes of each; all of it is at /iterations/<n>/<kind>)."""
+        if not number.isdigit():
+            self.send_error(404)
+            return
+        detail = state_indexer.iteration_detail(self.run.dir, int(number))
+        if detail is None:
+            self.send_json({"error": f"Iteration {number} not found"}, 404)
+        else:
+            self.send_json(detail)
+
+    def send_iteration_stream(self, number):
+        """GET /iterations/<n>/stream?offset=K[&follow=1] — claude's live output log.
+
+        Without follow, returns the bytes after offset K (up to STREAM_CHUNK);
+        X-Stream-Offset is where the next request should continue. With
+        follow, the response stays open and sends the log as it grows.
+        """
+        if not number.isdigit():
+            self.send_error(404)
+            return
+        query = parse_qs(urlsplit(self.route).query)
+        try:
+            offset = int(query.get("offset", ["0"])[0])
+        except ValueError:
+            self.send_json({"error": "Invalid 'offset'"}, 400)
+            return
+        path = artifacts.locate(claude_stream.stream_log_path(self.run.dir, int(number)))
+        try:
+            size = artifacts.size(path)
+        except (OSError, TypeError):
+            self.send_json({"error": f"No output for iteration {number}"}, 404)
+            return
+        if not 0 <= offset <= size:
+            # The log was replaced since the client's last read: start over
+            offset = 0
+        if query.get("follow", ["0"])[0] not in ("", "0"):
+            if not _event_streams.acquire(blocking=False):
+                self.send_json({"error": "Too many event streams"}, 503)
+                return
+            try:
+                self.follow_stream(path, offset)
+            finally:
+                _event_streams.release()
+            return
+        with artifacts.open_artifact(path) as f:
+            body = artifacts.read_range(f, offset, min(size - offset, STREAM_CHUNK))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Stream-Offset", str(offset + len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def follow_stream(self, path, offset):
+        """Send a growing log as chunks until it stays quiet for STREAM_IDLE_TIMEOUT."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("X-Stream-Offset", str(offset))
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.close_connection = True
+        idle_since = time.monotonic()
+        try:
+            with artifacts.open_artifact(path) as f:
+                f.seek(offset)
+                while time.monotonic() - idle_since < STREAM_IDLE_TIMEOUT:
+                    data = f.read(STREAM_CHUNK)
+                    if data:
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                        self.wfile.flush()
+                        idle_since = time.monotonic()
+                    else:
+                        time.sleep(POLL_INTERVAL)
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass
+
+    def send_iteration_artifact(self, number, kind):
+        """GET /iterations/<n>/<kind>[?tail=N] — one iteration file, read in pieces.
+
+        kind is one of artifacts.ARTIFACTS (summary, verify, honesty, checks,
+        log). A single `Range: bytes=...` gets a 206 of at most STREAM_CHUNK
+        bytes; `?tail=N` returns the last N lines (within STREAM_CHUNK), with
+        X-Tail-Offset/X-Stream-Offset giving where they start and end. A
+        compressed file is decompressed as it is read, or sent as stored when
+        the client takes gzip and wants all of it.
+        """
+        if not number.isdigit() or kind not in artifacts.ARTIFACTS:
+            self.send_error(404)
+            return
+        query = parse_qs(urlsplit(self.route).query)
+        lines = None
+        if "tail" in query:
+            try:
+                lines = int(query["tail"][0])
+            except ValueError:
+                lines = 0
+            if lines <= 0:
+                self.send_json({"error": "Invalid 'tail'"}, 400)
+                return
+        path = artifacts.locate(self.run.dir / "iterations" / artifacts.ARTIFACTS[kind].format(n=number))
+        try:
+            st = os.stat(path)
+            size = artifacts.size(path)
+        except (OSError, TypeError):
+            self.send_json({"error": f"No {kind} for iteration {number}"}, 404)
+            return
+        # Validators of the uncompressed content, whichever way it is stored
+        entry = ArtifactFile(st, size)
+        compressed = artifacts.is_compressed(path)
+        byte_range = None if lines else self.requested_range(entry)
+        as_stored = (compressed and lines is None and byte_range is None
+                     and "gzip" in self.headers.get("Accept-Encoding", ""))
+        etag = entry.etag[:-1] + '-gz"' if as_stored else entry.etag
+
+        if self.not_modified(entry):
+            self.send_response(304)
+            self.send_artifact_headers(etag, entry, compressed)
+            self.end_headers()
+            return
+        if byte_range == "unsatisfiable":
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.send_artifact_headers(etag, entry, compressed)
+            self.end_headers()
+            return
+
+        content_type = ARTIFACT_TYPES.get(kind, "text/plain; charset=utf-8")
+        if as_stored:
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(st.st_size))
+            self.send_artifact_headers(etag, entry, compressed)
+            self.end_headers()
+            with open(path, "rb") as f:
+                self.copy_body(f, st.st_size)
+            return
+        with artifacts.open_artifact(path) as f:
+            if lines:
+                start, body = artifacts.tail(f, size, lines, STREAM_CHUNK)
                 self.send_response(200)
-                self.send_header("Content-Type", "text/html")
+                self.send_header("X-Tail-Offset", str(start))
+                self.send_header("X-Stream-Offset", str(start + len(body)))
+            elif byte_range:
+                start, end = byte_range
+                body = artifacts.read_range(f, start, end - start)
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{start + len(body) - 1}/{size}")
+            else:
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(size))
+                self.send_artifact_headers(etag, entry, compressed)
                 self.end_headers()
-                self.wfile.write(dashboard.read_bytes())
+                f.seek(0)
+                self.copy_body(f, size)
+                return
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_artifact_headers(etag, entry, compressed)
+            self.end_headers()
+            self.wfile.write(body)
+
+    def requested_range(self, entry):
+        """(start, end) of a satisfiable single byte range, capped at
+        STREAM_CHUNK; "unsatisfiable"; or None to send the whole file.
+
+        Multiple ranges, malformed ones and a stale If-Range are ignored,
+        which RFC 9110 allows.
+        """
+        header = self.headers.get("Range")
+        if not header:
+            return None
+        if_range = self.headers.get("If-Range")
+        if if_range and if_range.strip() != entry.etag:
+            return None
+        m = RANGE_RE.match(header.strip())
+        if not m or m.groups() == ("", ""):
+            return None
+        first, last = m.groups()
+        if not first:
+            # Suffix range: the last N bytes
+            start, end = max(0, entry.size - int(last)), entry.size
+        elif last and int(last) < int(first):
+            return None
+        else:
+            start = int(first)
+            end = min(int(last) + 1, entry.size) if last else entry.size
+        if start >= end:
+            return "unsatisfiable"
+        return start, min(end, start + STREAM_CHUNK)
+
+    def send_artifact_headers(self, etag, entry, compressed):
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", entry.last_modified)
+        self.send_header("Cache-Control", "no-cache")
+        if compressed:
+            self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Access-Control-Allow-Origin", "*")
+
+    def copy_body(self, f, length):
+        """Write length bytes of f to the client, ARTIFACT_BLOCK at a time."""
+        while length > 0:
+            data = f.read(min(length, ARTIFACT_BLOCK))
+            if not data:
+                break
+            self.wfile.write(data)
+            length -= len(data)
+
+    def bind_run(self):
+        """Point self.run/self.route at the run this request is for.
+
+        A single-run server serves its run at /; the shared server serves each
+        run under /runs/<name>/. Returns False if the request was answered here.
+        """
+        if RUNS_ROOT is None:
+            self.run, self.route = Run(RUN_DIR), self.path
+            return True
+        name, sep, rest = self.path[len("/runs/"):].partition("/")
+        name = unquote(name.split("?", 1)[0])
+        run_dir = RUNS_ROOT / name
+        if not name or name.startswith(".") or "/" in name or not run_dir.is_dir():
+            self.send_json({"error": f"Run '{name}' not found"}, 404)
+            return False
+        if not sep:
+            # The dashboard uses relative URLs, so its page must end in a slash
+            self.send_response(301)
+            self.send_header("Location", f"/runs/{quote(name)}/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return False
+        self.run, self.route = Run(run_dir), "/" + rest
+        return True
+
+    def send_metrics(self, runs):
+        """Prometheus text format for [(run name, run dir), ...]."""
+        body = metrics.render_prometheus([(name, phase_metrics(d)) for name, d in runs]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_html(self, content):
+        body = content.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if RUNS_ROOT is not None:
+            path = urlsplit(self.path).path
+            if path == "/":
+                self.send_html(render_index(run_summaries(RUNS_ROOT)))
+                return
+            if path in ("/runs", "/runs/"):
+                self.send_json({"runs": run_summaries(RUNS_ROOT)})
+                return
+            if path == "/metrics":
+                self.send_metrics([(e.name, e.path) for e in run_dirs(RUNS_ROOT)])
+                return
+            if not path.startswith("/runs/"):
+                self.send_error(404)
+                return
+        if self.bind_run():
+            self.route_get()
+
+    def route_get(self):
+        route = self.route
+        if route == "/":
+            entry = FILE_CACHE.get(DATA_DIR / "dashboard.html")
+            if entry is not None:
+                self.send_cached(entry, "text/html")
             else:
                 self.send_error(404, "dashboard.html not found")
-        elif self.path == "/state.json":
-            state_file = RUN_DIR / "state.json"
-            if state_file.exists():
-                try:
-                    data = json.loads(state_file.read_text())
-                    self.send_json(data)
-                except (json.JSONDecodeError, IOError):
-                    self.send_json({"error": "Failed to read state"}, 500)
-            else:
-                self.send_json({
-                    "run_name": RUN_DIR.name,
-                    "phase": "initializing",
-                    "tasks_total": 0,
-                    "tasks_completed": 0,
-                    "iterations": []
-                })
-        elif self.path == "/reviews":
-            if REVIEWS_FILE.exists():
+        elif route == "/state.json":
+            entry = FILE_CACHE.get(self.run.dir / "state.json")
+            if entry is None:
+                self.send_json(default_state(self.run.name))
+                return
+            # Validate once per file version; the bytes are then served as-is
+            if entry.valid_json is None:
                 try:
-                    data = json.loads(REVIEWS_FILE.read_text())
-                    self.send_json(data)
-                except (json.JSONDecodeError, IOError):
-                    self.send_json({"reviews": []})
+                    json.loads(entry.body)
+                    entry.valid_json = True
+                except ValueError:
+                    entry.valid_json = False
+            if entry.valid_json:
+                self.send_cached(entry, "application/json")
             else:
-                self.send_json({"reviews": []})
-        elif self.path == "/test-guide":
-            if TEST_GUIDE_FILE.exists():
+                self.send_json({"error": "Failed to read state"}, 500)
+        elif route == "/reviews":
+            self.send_json({"reviews": review_store.ReviewStore(self.run.dir).load()})
+        elif route == "/test-guide":
+            if self.run.test_guide_file.exists():
                 try:
-                    content = TEST_GUIDE_FILE.read_text()
+                    content = self.run.test_guide_file.read_text()
                     self.send_json({"content": content})
                 except IOError:
                     self.send_json({"content": "", "error": "Failed to read test guide"}, 500)
             else:
                 self.send_json({"content": ""})
+        elif route == "/events":
+            self.stream_events()
+        elif route == "/iterations" or route.startswith("/iterations?"):
+            self.send_iteration_headers()
+        elif route.startswith("/iterations/"):
+            number, _, kind = urlsplit(route).path[len("/iterations/"):].partition("/")
+            if not kind:
+                self.send_iteration_detail(number)
+            elif kind == "stream":
+                self.send_iteration_stream(number)
+            else:
+                self.send_iteration_artifact(number, kind)
+        elif route == "/metrics":
+            self.send_metrics([(self.run.name, self.run.dir)])
         else:
             self.send_error(404)
 
+    def end_headers(self):
+        if (self.command == "POST" and not self.body_consumed
+                and (self.headers.get("Content-Length", "0") not in ("", "0")
+                     or "Transfer-Encoding" in self.headers)):
+            # Unread body would be parsed as the next request on this connection
+            self.send_header("Connection", "close")
+        super().end_headers()
+
     def do_POST(self):
-        if self.path == "/approve":
+        self.body_consumed = False
+        if RUNS_ROOT is not None and not self.path.startswith("/runs/"):
+            self.send_error(404)
+        elif self.bind_run():
+            self.route_post()
+
+    def register_run(self):
+        """POST /runs/<name>/register — attach a more-loop (by pid) to the shared server."""
+        data = self.json_request("pid")
+        if data is None:
+            return
+        pid = data["pid"]
+        if not isinstance(pid, int) or pid <= 0:
+            self.send_json({"error": "Missing 'pid' field"}, 400)
+            return
+        if not REGISTRY.register(self.run.name, pid):
+            self.send_json({"error": "Server is shutting down"}, 503)
+            return
+        self.send_json({"status": "registered", "url": f"/runs/{quote(self.run.name)}/"})
+
+    def change_review(self, action):
+        """POST /reviews/{add,edit,delete} — change one review, appended to the journal."""
+        data = self.json_request("review" if action == "add" else "id", limit=MAX_REVIEW_BODY)
+        if data is None:
+            return
+        if action == "add" and not isinstance(data["review"], dict):
+            self.send_json({"error": "'review' must be an object"}, 400)
+            return
+        store = review_store_for(self.run.dir)
+        try:
+            with write_lock(self.run.reviews_file):
+                if action == "add":
+                    result = {"status": "saved", "review": store.add(data["review"])}
+                elif action == "edit":
+                    fields = {k: v for k, v in data.items() if k != "id"}
+                    result = {"status": "saved", "review": store.edit(data["id"], fields)}
+                else:
+                    store.delete(data["id"])
+                    result = {"status": "deleted"}
+        except review_store.UnknownReview as e:
+            self.send_json({"error": str(e)}, 404)
+        except review_store.ReviewError as e:
+            self.send_json({"error": str(e)}, 409)
+        except IOError as e:
+            self.send_json({"error": str(e)}, 500)
+        else:
+            self.send_json(result)
+
+    def route_post(self):
+        route = self.route
+        if route == "/register" and RUNS_ROOT is not None:
+            self.register_run()
+        elif route == "/approve":
             try:
-                SIGNAL_APPROVE.touch()
+                self.run.signal_approve.touch()
+                self.run.send_control("approve")
                 self.send_json({"status": "approved"})
             except IOError as e:
                 self.send_json({"error": str(e)}, 500)
-        elif self.path == "/stop":
+        elif route == "/stop":
             try:
-                SIGNAL_STOP.touch()
+                self.run.signal_stop.touch()
+                self.run.send_control("stop")
                 self.send_json({"status": "stopped"})
             except IOError as e:
                 self.send_json({"error": str(e)}, 500)
-        elif self.path == "/reviews":
-            data, err = self.read_json_body()
-            if err:
-                self.send_json({"error": err}, 400)
-                return
-            if not isinstance(data, dict) or "reviews" not in data:
-                self.send_json({"error": "Missing 'reviews' field"}, 400)
+        elif route == "/reviews":
+            data = self.json_request("reviews")
+            if data is None:
                 return
             try:
-                atomic_write(REVIEWS_FILE, json.dumps(data, indent=2))
+                with write_lock(self.run.reviews_file):
+                    review_store_for(self.run.dir).replace(data)
                 self.send_json({"status": "saved"})
             except IOError as e:
                 self.send_json({"error": str(e)}, 500)
-        elif self.path == "/request-changes":
-            data, err = self.read_json_body()
-            if err:
-                self.send_json({"error": err}, 400)
-                return
-            if not isinstance(data, dict) or "reviews" not in data:
-                self.send_json({"error": "Missing 'reviews' field"}, 400)
+        elif route in ("/reviews/add", "/reviews/edit", "/reviews/delete"):
+            self.change_review(route.rpartition("/")[2])
+        elif route == "/request-changes":
+            data = self.json_request("reviews")
+            if data is None:
                 return
             try:
-                atomic_write(REVIEWS_FILE, json.dumps(data, indent=2))
-                SIGNAL_REQUEST_CHANGES.touch()
+                with write_lock(self.run.reviews_file):
+                    review_store_for(self.run.dir).replace(data)
+                    self.run.signal_request_changes.touch()
+                self.run.send_control("request-changes")
                 self.send_json({"status": "requested"})
             except IOError as e:
                 self.send_json({"error": str(e)}, 500)
-        elif self.path == "/test-guide":
-            data, err = self.read_json_body()
-            if err:
-                self.send_json({"error": err}, 400)
-                return
-            if not isinstance(data, dict) or "content" not in data:
-                self.send_json({"error": "Missing 'content' field"}, 400)
+        elif route == "/test-guide":
+            data = self.json_request("content")
+            if data is None:
                 return
             try:
-                atomic_write(TEST_GUIDE_FILE, data["content"])
+                with write_lock(self.run.test_guide_file):
+                    atomic_write(self.run.test_guide_file, data["content"])
                 self.send_json({"status": "saved"})
             except IOError as e:
                 self.send_json({"error": str(e)}, 500)
         else:
             self.send_error(404)
 
+def register_with(base_url, name, pid):
+    """Register run `name` with the server at base_url.
+
+    Returns the run's dashboard path, or None if no shared server answered.
+    """
+    req = Request(f"{base_url}/runs/{quote(name)}/register", method="POST",
+                  data=json.dumps({"pid": pid}).encode(),
+                  headers={"Content-Type": "application/json"})
+    try:
+        with urlopen(req, timeout=2) as resp:
+            return json.loads(resp.read())["url"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def start_shared_server(runs_root, port=0):
+    """Start a detached shared server for runs_root and return its URL."""
+    log_path = runs_root / ".server.log"
+    with open(log_path, "wb") as log:
+        proc = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "--shared", str(runs_root), str(port)],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=log,
+            start_new_session=True,
+        )
+    # The server prints its URL once it is listening, so there is no file to poll
+    ready, _, _ = select.select([proc.stdout], [], [], STARTUP_TIMEOUT)
+    url = proc.stdout.readline().decode().strip() if ready else ""
+    proc.stdout.close()
+    if not url:
+        if proc.poll() is None:
+            proc.kill()
+        raise RuntimeError(f"shared server failed to start (see {log_path})")
+    return url
+
+
+def attach(run_dir, owner_pid, port=0):
+    """Register run_dir with the shared server for its runs root, starting one if needed.
+
+    Returns the run's dashboard URL. The lock keeps concurrent more-loop
+    launches from starting two servers for the same runs root.
+    """
+    run_dir = Path(run_dir).resolve()
+    run_dir.mkdir(parents=True, exist_ok=True)
+    runs_root = run_dir.parent
+    with open(runs_root / ".server.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            base_url = (runs_root / ".server.url").read_text().strip()
+        except OSError:
+            base_url = ""
+        path = register_with(base_url, run_dir.name, owner_pid) if base_url else None
+        if path is None:
+            base_url = start_shared_server(runs_root, port)
+            path = register_with(base_url, run_dir.name, owner_pid)
+        if path is None:
+            raise RuntimeError(f"shared server at {base_url} refused registration")
+    return base_url + path
+
+
+def attach_main(args):
+    if len(args) not in (2, 3):
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+    try:
+        url = attach(args[0], int(args[1]), int(args[2]) if len(args) > 2 else 0)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(url)
+    return 0
+
+
+def watch_owners(server):
+    """Shut the shared server down once every attached more-loop has exited."""
+    started = time.monotonic()
+    while True:
+        time.sleep(ATTACH_CHECK_INTERVAL)
+        if REGISTRY.close_if_idle(time.monotonic() - started > ATTACH_GRACE):
+            server.shutdown()
+            return
+
+
+def release_shared_files(runs_root):
+    """Remove .server.url/.server.pid unless a newer server has replaced them."""
+    with open(runs_root / ".server.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if (runs_root / ".server.pid").read_text().strip() != str(os.getpid()):
+                return
+        except OSError:
+            return
+        for name in (".server.url", ".server.pid"):
+            (runs_root / name).unlink(missing_ok=True)
+
+
 def main():
+    global RUNS_ROOT
+    if MODE == "--attach":
+        sys.exit(attach_main(ARGS))
+
     RUN_DIR.mkdir(parents=True, exist_ok=True)
+    if MODE == "--shared":
+        RUNS_ROOT = RUN_DIR.resolve()
 
     def signal_handler(*_):
         sys.exit(0)
@@ -176,12 +1309,21 @@ def main():
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
 
-    server = HTTPServer(("", PORT), DashboardHandler)
+    # Pooled: /events subscribers and keep-alive connections each hold a worker
+    server = DashboardServer(("", PORT), DashboardHandler)
     port = server.server_address[1]
     url = f"http://127.0.0.1:{port}"
     print(url, file=sys.stderr)
     sys.stderr.flush()
     atomic_write(RUN_DIR / ".server.url", url)
+    if RUNS_ROOT is not None:
+        atomic_write(RUNS_ROOT / ".server.pid", str(os.getpid()))
+        threading.Thread(target=watch_owners, args=(server,), daemon=True).start()
+        # Tell --attach we are listening, then let go of its pipe
+        print(url, flush=True)
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        os.close(devnull)
 
     try:
         server.serve_forever()
@@ -189,6 +1331,8 @@ def main():
         pass
     finally:
         server.server_close()
+        if RUNS_ROOT is not None:
+            release_shared_files(RUNS_ROOT)
 
 if __name__ == "__main__":
     main()
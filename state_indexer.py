@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""Incremental state.json builder for more-loop runs. Uses only stdlib.
+
+Replaces the full rescan of iterations/ on every phase change. A per-file
+cache (.state-index.json in the run directory) is keyed by file name, mtime
+and size, so each update only re-parses the N.md, N-verify.md and
+N-honesty.md files that actually changed since the previous write. Runs
+registered in the SQLite run store (run_store.py) use that as their index
+instead, and no longer rescan iterations/ at all.
+
+state.json itself is a fixed-size summary. Per-iteration headers live in the
+index, where every change bumps a revision counter so the dashboard server
+can answer "what changed since revision R"; full iteration details are read
+from the iteration files on demand (see iteration_detail()). Files compressed
+by artifacts.py (N-verify.md.gz) are indexed under their plain name.
+
+Usage (called once per update by more-loop's write_state_json):
+    state_indexer.py <run-dir> <phase> <current-task> <model> \
+        <max-iterations> <current-iteration> <approve-timeout>
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import artifacts
+from artifacts import read_first_line
+
+INDEX_FILE = ".state-index.json"
+INDEX_VERSION = 2
+# iteration_detail() keeps the end of longer outputs; the rest is served
+# in pieces at /iterations/<n>/<kind>
+DETAIL_LIMIT = 64 * 1024
+ITERATION_FILE_RE = re.compile(r'^(\d+)(-(verify|honesty))?\.md$')
+
+
+def atomic_write(path, content):
+    """Write content to path atomically via temp file + rename.
+
+    Prevents readers from seeing partial/truncated content during writes.
+    os.rename() is atomic on the same filesystem (POSIX guarantee).
+    """
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+    closed = False
+    try:
+        os.write(fd, content.encode() if isinstance(content, str) else content)
+        os.close(fd)
+        closed = True
+        os.rename(tmp, str(path))
+    except BaseException:
+        if not closed:
+            os.close(fd)
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def classify_verdict(kind, content):
+    """Return the PASS/FAIL or HONEST/DISHONEST verdict from a file's first line."""
+    first_line = content.split('\n', 1)[0].strip().upper()
+    if kind == 'honesty':
+        if first_line.startswith('HONEST'):
+            return 'HONEST'
+        if first_line.startswith('DISHONEST'):
+            return 'DISHONEST'
+        return 'SKIP'
+    if first_line.startswith('PASS'):
+        return 'PASS'
+    if first_line.startswith('FAIL'):
+        return 'FAIL'
+    return 'SKIP'
+
+
+def count_tasks(tasks_content):
+    """Return (total, completed) checkbox counts for a tasks.md body."""
+    total = len(re.findall(r'^- \[.\]', tasks_content, re.MULTILINE))
+    completed = len(re.findall(r'^- \[x\]', tasks_content, re.MULTILINE))
+    return total, completed
+
+
+def read_text(path):
+    try:
+        return path.read_text()
+    except (OSError, UnicodeDecodeError):
+        return ''
+
+
+class StateIndexer:
+    """Per-run cache of parsed iteration files.
+
+    Each cached entry records the mtime_ns and size it was parsed at; refresh()
+    stats every file in iterations/ but only re-reads the ones whose stat
+    changed, and drops entries for files that were removed. Every change bumps
+    the index revision, which is stamped on the changed entry.
+    """
+
+    def __init__(self, run_dir):
+        self.run_dir = Path(run_dir)
+        self.index_path = self.run_dir / INDEX_FILE
+        self.files = {}
+        self.meta = {}
+        self.rev = 0
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            data = json.loads(self.index_path.read_text())
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get('version') != INDEX_VERSION:
+            return
+        self.files = data.get('files', {})
+        self.meta = data.get('meta', {})
+        self.rev = data.get('rev', 0)
+
+    def save(self):
+        if not self.dirty:
+            return
+        data = {'version': INDEX_VERSION, 'rev': self.rev, 'meta': self.meta, 'files': self.files}
+        atomic_write(self.index_path, json.dumps(data, ensure_ascii=False))
+        self.dirty = False
+
+    def set_meta(self, key, value):
+        if self.meta.get(key) != value:
+            self.meta[key] = value
+            self.dirty = True
+
+    def bump(self):
+        self.rev += 1
+        self.dirty = True
+        return self.rev
+
+    def refresh(self, numbers=()):
+        """Bring the cache in line with iterations/ and return the iteration headers.
+
+        `numbers` (the iterations known to have changed) is only a hint for
+        run_store.StoreIndexer; this index always rescans.
+        """
+        iter_dir = self.run_dir / 'iterations'
+        seen = set()
+        try:
+            entries = list(os.scandir(iter_dir))
+        except OSError:
+            entries = []
+        present = {entry.name for entry in entries}
+        for entry in entries:
+            name = artifacts.plain_name(entry.name)
+            m = ITERATION_FILE_RE.match(name)
+            if not m or not entry.is_file():
+                continue
+            if name != entry.name and name in present:
+                # Mid-compression: the plain file is still there
+                continue
+            seen.add(name)
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            cached = self.files.get(name)
+            if cached and cached['mtime_ns'] == st.st_mtime_ns and cached['size'] == st.st_size:
+                continue
+            kind = m.group(3) or 'summary'
+            result = ''
+            if kind != 'summary':
+                result = classify_verdict(kind, read_first_line(Path(entry.path)))
+            self.files[name] = {
+                'mtime_ns': st.st_mtime_ns,
+                'size': st.st_size,
+                'number': int(m.group(1)),
+                'kind': kind,
+                'result': result,
+                'rev': self.bump(),
+            }
+        for name in [n for n in self.files if n not in seen]:
+            del self.files[name]
+            self.bump()
+        return self.headers()
+
+    def headers(self):
+        return iteration_headers(self.files)
+
+
+def iteration_headers(files, since=0):
+    """Group cached file entries into per-iteration headers, sorted by number.
+
+    Only iterations with a file changed after revision `since` are returned.
+    """
+    by_number = {}
+    for cached in files.values():
+        num = cached['number']
+        entry = by_number.get(num)
+        if entry is None:
+            entry = {'number': num, 'verify_result': '', 'honesty_result': '', 'rev': 0}
+            by_number[num] = entry
+        kind = cached['kind']
+        if kind != 'summary':
+            entry[f'{kind}_result'] = cached['result']
+        entry['rev'] = max(entry['rev'], cached.get('rev', 0))
+    return [by_number[n] for n in sorted(by_number) if by_number[n]['rev'] > since]
+
+
+def open_indexer(run_dir):
+    """The run's index: the SQLite run store if the run is registered there
+    (more-loop --run-store), else .state-index.json."""
+    try:
+        import run_store
+    except ImportError:
+        # Python built without sqlite3
+        return StateIndexer(run_dir)
+    return run_store.open_indexer(run_dir) or StateIndexer(run_dir)
+
+
+def iteration_detail(run_dir, number, limit=DETAIL_LIMIT):
+    """Return the record for one iteration, or None if it has no files.
+
+    Each text is cut to its last `limit` bytes; `<kind>_size` is its full
+    size and `<kind>_truncated` says whether it was cut.
+    """
+    iter_dir = Path(run_dir) / 'iterations'
+    detail = {'number': number}
+    found = False
+    for kind in ('summary', 'verify', 'honesty'):
+        path = artifacts.locate(iter_dir / artifacts.ARTIFACTS[kind].format(n=number))
+        content, size, truncated = '', 0, False
+        if path is not None:
+            found = True
+            content, size, truncated = read_tail(path, limit)
+        if kind == 'summary':
+            detail['summary'] = content
+        else:
+            detail[f'{kind}_result'] = classify_verdict(kind, read_first_line(path)) if size else ''
+            detail[f'{kind}_detail'] = content
+        detail[f'{kind}_size'] = size
+        detail[f'{kind}_truncated'] = truncated
+    detail['verify_checks'] = verify_checks(iter_dir / f'{number}-verify.json')
+    return detail if found else None
+
+
+def read_tail(path, limit):
+    """(text, size, truncated): at most the last `limit` bytes of an artifact."""
+    try:
+        with artifacts.open_artifact(path) as f:
+            size = artifacts.size(path)
+            if size <= limit:
+                return f.read().decode(errors='replace'), size, False
+            _, data = artifacts.tail(f, size, size, limit)
+            return data.decode(errors='replace'), size, True
+    except (OSError, EOFError):
+        return '', 0, False
+
+
+def verify_checks(path):
+    """Per-check results written by verify_runner.py, or [] for other verify types."""
+    try:
+        checks = json.loads(path.read_text()).get('checks', [])
+    except (OSError, ValueError, AttributeError):
+        return []
+    return checks if isinstance(checks, list) else []
+
+
+def previous_state_meta(run_dir):
+    """Read started_at and current_task_name from an existing state.json.
+
+    Only needed the first time a run is indexed (e.g. runs created before the
+    index existed); afterwards both values live in the index itself.
+    """
+    try:
+        data = json.loads((Path(run_dir) / 'state.json').read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {
+        'started_at': data.get('started_at', ''),
+        'current_task_name': data.get('current_task_name', ''),
+    }
+
+
+def build_state(indexer, phase, current_task, model, max_iterations,
+                current_iteration, approve_timeout):
+    """Build the state.json dict for a run, refreshing the index first."""
+    run_dir = indexer.run_dir
+    if not indexer.meta:
+        for key, value in previous_state_meta(run_dir).items():
+            indexer.set_meta(key, value)
+
+    updated_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    if not indexer.meta.get('started_at'):
+        indexer.set_meta('started_at', updated_at)
+    # An empty current_task keeps the previous one (e.g. during verify)
+    if current_task:
+        indexer.set_meta('current_task_name', current_task)
+
+    tasks_content = read_text(run_dir / 'tasks.md')
+    acceptance_content = read_text(run_dir / 'acceptance.md')
+    tasks_total, tasks_completed = count_tasks(tasks_content)
+
+    headers = indexer.refresh([current_iteration])
+    return {
+        'run_name': run_dir.name,
+        'model': model,
+        'max_iterations': max_iterations,
+        'current_iteration': current_iteration,
+        'phase': phase,
+        'tasks_total': tasks_total,
+        'tasks_completed': tasks_completed,
+        'tasks': tasks_content,
+        'acceptance': acceptance_content,
+        'iterations_total': len(headers),
+        'iterations_rev': indexer.rev,
+        'latest_iteration': headers[-1] if headers else None,
+        'current_task_name': indexer.meta.get('current_task_name', ''),
+        'started_at': indexer.meta['started_at'],
+        'updated_at': updated_at,
+        'approve_timeout': approve_timeout,
+    }
+
+
+def write_state(run_dir, phase, current_task='', model='', max_iterations=0,
+                current_iteration=0, approve_timeout=0):
+    """Refresh the index and atomically write <run_dir>/state.json."""
+    indexer = open_indexer(run_dir)
+    state = build_state(indexer, phase, current_task, model, max_iterations,
+                        current_iteration, approve_timeout)
+    # Index first: a client reacting to the new state.json must find the
+    # iteration headers it announces
+    indexer.save()
+    atomic_write(indexer.run_dir / 'state.json',
+                 json.dumps(state, indent=2, ensure_ascii=False))
+    return state
+
+
+def main(argv):
+    if len(argv) != 7:
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+    run_dir, phase, current_task, model, max_iterations, current_iteration, approve_timeout = argv
+    write_state(run_dir, phase, current_task, model, int(max_iterations),
+                int(current_iteration), int(approve_timeout))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
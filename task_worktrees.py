@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Git worktrees for running several tasks in parallel (-j N). Uses only stdlib.
+
+A parallel batch takes up to N unchecked tasks from tasks.md whose file hints
+(`backticked` names and path-like words such as src/app.py) don't overlap.
+A task without hints may build on any earlier one, so it runs by itself.
+Every task gets its own worktree, checked out from a snapshot of the current
+working tree. The snapshot includes uncommitted and untracked files, so a
+task sees exactly the code the serial loop would have seen.
+
+Once the tasks are done, each worktree's changes are merged back into the main
+working tree in task order, as a patch against the snapshot. `git apply`
+either applies a whole patch or none of it. A task whose patch no longer
+applies (it touched the same lines as an earlier task in the batch) is left
+unchecked so that a later iteration retries it.
+
+Usage (called by more-loop's run_parallel_batch):
+    task_worktrees.py select <tasks.md> <limit>
+    task_worktrees.py base <runs-root>
+    task_worktrees.py add <worktree> <base>
+    task_worktrees.py merge <worktree> <base>
+    task_worktrees.py remove <worktree>...
+    task_worktrees.py mark-done <tasks.md> <task>
+
+`base` exits 1 outside a git work tree. `merge` exits 1 when the patch
+conflicts and leaves the main working tree untouched.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+from state_indexer import atomic_write
+from verify_cache import git, tree_hash
+
+UNCHECKED = "- [ ] "
+DONE = "- [x] "
+# `anything`, or a word containing a slash or ending in a file extension
+BACKTICK_RE = re.compile(r'`([^`]+)`')
+PATH_RE = re.compile(r'(?<![\w/.-])((?:[\w.-]+/)+[\w.-]*|[\w-]+\.[A-Za-z0-9]{1,8})(?![\w/-])')
+# Identity for the throwaway snapshot commit, which never lands on a branch
+SNAPSHOT_ENV = {
+    "GIT_AUTHOR_NAME": "more-loop", "GIT_AUTHOR_EMAIL": "more-loop@localhost",
+    "GIT_COMMITTER_NAME": "more-loop", "GIT_COMMITTER_EMAIL": "more-loop@localhost",
+}
+
+
+def task_hints(task):
+    """Files or paths a task names; tasks sharing one are not run together."""
+    hints = {h.strip().rstrip("/") for h in BACKTICK_RE.findall(task)}
+    hints.update(m.rstrip("/") for m in PATH_RE.findall(BACKTICK_RE.sub(" ", task)))
+    return {h for h in hints if h}
+
+
+def select_tasks(tasks_text, limit):
+    """Up to `limit` unchecked tasks, in order, with no file hints in common.
+
+    tasks.md is in dependency order and nothing shows what a task without hints
+    touches, so such a task ends the batch, or is the whole batch if it comes first.
+    """
+    selected = []
+    claimed = set()
+    for line in tasks_text.splitlines():
+        if not line.startswith(UNCHECKED):
+            continue
+        task = line[len(UNCHECKED):]
+        hints = task_hints(task)
+        if not hints:
+            if not selected:
+                selected.append(task)
+            break
+        if hints & claimed or task in selected:
+            continue
+        selected.append(task)
+        claimed |= hints
+        if len(selected) >= limit:
+            break
+    return selected
+
+
+def snapshot(runs_root):
+    """Commit the current working tree (minus the runs root) without touching
+    HEAD, the index or any branch. Returns the commit id, or None outside git."""
+    tree = tree_hash(runs_root)
+    if tree is None:
+        return None
+    try:
+        parents = ["-p", git("rev-parse", "--verify", "-q", "HEAD")]
+    except subprocess.CalledProcessError:
+        parents = []
+    env = dict(os.environ, **SNAPSHOT_ENV)
+    return git("commit-tree", tree, *parents, "-m", "more-loop parallel batch base", env=env)
+
+
+def add_worktree(path, base):
+    path = Path(path)
+    if path.exists():
+        remove_worktrees([path])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    git("worktree", "add", "--detach", "--force", str(path), base)
+
+
+def worktree_patch(path, base):
+    """Everything the task changed in its worktree, as a binary patch.
+
+    Staged through the worktree's own index, so commits made by the task and
+    uncommitted or untracked files are all included.
+    """
+    git("add", "-A", cwd=path)
+    return subprocess.run(["git", "diff", "--cached", "--binary", base], cwd=path,
+                          capture_output=True, check=True).stdout
+
+
+def merge_worktree(path, base):
+    """Apply a worktree's changes to the main working tree. False on conflict."""
+    patch = worktree_patch(path, base)
+    if not patch.strip():
+        return True
+    top = git("rev-parse", "--show-toplevel")
+    proc = subprocess.run(["git", "apply", "--whitespace=nowarn", "-"], cwd=top,
+                          input=patch, capture_output=True)
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr.decode(errors="replace"))
+        return False
+    return True
+
+
+def remove_worktrees(paths):
+    for path in paths:
+        try:
+            git("worktree", "remove", "--force", str(path))
+        except (OSError, subprocess.CalledProcessError):
+            pass
+        shutil.rmtree(path, ignore_errors=True)
+    try:
+        git("worktree", "prune")
+    except (OSError, subprocess.CalledProcessError):
+        pass
+
+
+def mark_done(tasks_path, task):
+    """Check off the first unchecked line for `task`. False if there is none."""
+    tasks_path = Path(tasks_path)
+    lines = tasks_path.read_text().split("\n")
+    for i, line in enumerate(lines):
+        if line == UNCHECKED + task:
+            lines[i] = DONE + task
+            atomic_write(tasks_path, "\n".join(lines))
+            return True
+    return False
+
+
+def main(argv):
+    command, args = (argv[0], argv[1:]) if argv else (None, [])
+    try:
+        if command == "select" and len(args) == 2:
+            for task in select_tasks(Path(args[0]).read_text(), int(args[1])):
+                print(task)
+            return 0
+        if command == "base" and len(args) == 1:
+            base = snapshot(args[0])
+            if base is None:
+                return 1
+            print(base)
+            return 0
+        if command == "add" and len(args) == 2:
+            add_worktree(*args)
+            return 0
+        if command == "merge" and len(args) == 2:
+            return 0 if merge_worktree(*args) else 1
+        if command == "remove" and args:
+            remove_worktrees(args)
+            return 0
+        if command == "mark-done" and len(args) == 2:
+            return 0 if mark_done(*args) else 1
+    except subprocess.CalledProcessError as e:
+        print(f"Error: git {' '.join(e.cmd[1:2])} failed: {(e.stderr or '').strip()}", file=sys.stderr)
+        return 2
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
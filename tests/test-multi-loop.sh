@@ -71,8 +71,10 @@ help_output="$("$MULTI_LOOP" --help 2>&1)"
 assert_contains "shows usage" "Usage:" "$help_output"
 assert_contains "shows --providers" "--providers" "$help_output"
 assert_contains "shows --status" "--status" "$help_output"
+assert_contains "shows --watch" "--watch" "$help_output"
 assert_contains "shows --config" "--config" "$help_output"
 assert_contains "shows --init" "--init" "$help_output"
+assert_contains "shows --schedule" "--schedule" "$help_output"
 
 echo "=== Test: --dry-run with default config ==="
 tmp_dir="$(mktemp -d)"
@@ -142,6 +144,8 @@ assert_contains "status shows glm" "myapp-glm" "$status_output"
 assert_contains "status shows claude" "myapp-claude" "$status_output"
 assert_contains "status shows task phase" "task" "$status_output"
 assert_contains "status shows done phase" "done" "$status_output"
+assert_contains "status compares providers" "Tasks/h" "$status_output"
+assert_contains "status splits spec and provider" "myapp glm " "$status_output"
 
 rm -rf "$tmp_dir"
 
@@ -180,6 +184,37 @@ assert_eq "claude prompt copy exists" "0" "$(test -f "$tmp_dir/test-prompt-claud
 
 rm -rf "$tmp_dir"
 
+echo "=== Test: --schedule --dry-run lists jobs ==="
+tmp_dir="$(mktemp -d)"
+echo "Build a hello world app" > "$tmp_dir/app.md"
+echo "Build a todo app" > "$tmp_dir/todo.md"
+cp "$SCRIPT_DIR/providers.json" "$tmp_dir/providers.json"
+cat > "$tmp_dir/jobs.txt" <<'JOBS'
+# spec provider [verify]
+app.md glm
+todo.md claude
+JOBS
+
+sched_output="$(cd "$tmp_dir" && "$MULTI_LOOP" --schedule --dry-run --jobs jobs.txt --max-parallel 3 -n 4 2>&1)"
+assert_contains "schedule shows first job" "Job: app-glm (provider: glm)" "$sched_output"
+assert_contains "schedule shows second job" "Job: todo-claude (provider: claude)" "$sched_output"
+assert_contains "schedule passes -n" "-n 4" "$sched_output"
+assert_contains "schedule runs the scheduler" "--max-parallel 3" "$sched_output"
+assert_eq "dry run writes no schedule" "1" "$(test -d "$tmp_dir/.more-loop/.schedule" && echo 0 || echo 1)"
+
+sched_output="$(cd "$tmp_dir" && "$MULTI_LOOP" --schedule --dry-run --providers glm,kimi app.md 2>&1)"
+assert_contains "prompt-file schedule has glm" "Job: app-glm" "$sched_output"
+assert_contains "prompt-file schedule has kimi" "Job: app-kimi" "$sched_output"
+
+echo "=== Test: --status shows the schedule ==="
+mkdir -p "$tmp_dir/.more-loop/.schedule"
+python3 "$SCRIPT_DIR/scheduler.py" add "$tmp_dir/.more-loop/.schedule" app-glm glm app.md 4
+status_output="$(cd "$tmp_dir" && "$MULTI_LOOP" --status 2>&1)"
+assert_contains "status lists scheduled job" "app-glm" "$status_output"
+assert_contains "status shows job state" "queued" "$status_output"
+
+rm -rf "$tmp_dir"
+
 echo "=== Test: --init creates providers.json ==="
 tmp_dir="$(mktemp -d)"
 (cd "$tmp_dir" && "$MULTI_LOOP" --init <<< "y" 2>/dev/null)
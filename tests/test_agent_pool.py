@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Tests for warm agent processes. Uses only stdlib."""
+
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import agent_pool
+
+TOOL = str(Path(__file__).resolve().parent.parent / "agent_pool.py")
+# Started warm it reads its prompt from stdin; run cold it gets it as an argument
+AGENT = ["sh", "-c", 'if [ -n "$1" ]; then echo "cold: $1"; else echo "warm: $(cat)"; fi; echo oops >&2; exit 3',
+         "agent"]
+
+
+class AgentPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.run_dir = Path(tempfile.mkdtemp(prefix="test_agent_pool_"))
+        self.agent_dir = self.run_dir / agent_pool.AGENT_DIR
+
+    def tearDown(self):
+        agent_pool.discard(self.run_dir)
+        shutil.rmtree(self.run_dir, ignore_errors=True)
+
+    def spawn(self, cmd, owner=None, cwd=None):
+        subprocess.run([sys.executable, TOOL, "spawn", str(self.run_dir), str(owner or os.getpid())] + cmd,
+                       check=True, timeout=10, cwd=cwd)
+
+    def attach(self, cmd, prompt="hello", cwd=None):
+        return subprocess.run([sys.executable, TOOL, "attach", str(self.run_dir), prompt] + cmd,
+                              capture_output=True, text=True, timeout=10, cwd=cwd)
+
+    def wait_until(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return condition()
+
+
+class TestAttach(AgentPoolTestCase):
+
+    def test_warm_agent_takes_the_prompt(self):
+        self.spawn(AGENT)
+        self.assertTrue((self.agent_dir / "pid").exists())
+        result = self.attach(AGENT, "line one\nline two")
+        self.assertEqual(result.stdout, "warm: line one\nline two\n")
+        self.assertEqual(result.stderr, "oops\n")
+        self.assertEqual(result.returncode, 3)
+        self.assertEqual(list(self.run_dir.iterdir()), [])
+
+    def test_other_command_runs_cold(self):
+        self.spawn(AGENT)
+        result = self.attach(AGENT[:-1] + ["other"])
+        self.assertEqual((result.stdout, result.returncode), ("cold: hello\n", 3))
+        # The warm agent is left for a matching call
+        self.assertTrue(self.agent_dir.exists())
+        self.assertEqual(self.attach(AGENT).stdout, "warm: hello\n")
+
+    def test_warm_agent_runs_in_the_callers_directory(self):
+        project = Path(tempfile.mkdtemp(prefix="test_agent_pool_project_")).resolve()
+        self.addCleanup(shutil.rmtree, project, True)
+        cmd = ["sh", "-c", 'cat >/dev/null; pwd; echo edit > file.txt', "agent"]
+        self.spawn(cmd, cwd=project)
+        result = self.attach(cmd, cwd=project)
+        self.assertEqual(result.stdout, f"{project}\n")
+        self.assertTrue((project / "file.txt").exists())
+
+    def test_no_agent_runs_cold(self):
+        self.assertEqual(self.attach(AGENT).stdout, "cold: hello\n")
+
+    def test_agent_that_exited_early_runs_cold(self):
+        cmd = ["sh", "-c", '[ -n "$1" ] && echo "cold: $1"', "agent"]
+        self.spawn(cmd)
+        self.assertTrue(self.wait_until(lambda: not self.agent_dir.exists()))
+        self.assertEqual(self.attach(cmd).stdout, "cold: hello\n")
+
+
+class TestLifetime(AgentPoolTestCase):
+
+    def test_agent_stops_when_its_owner_exits(self):
+        owner = subprocess.Popen(["sleep", "0.3"])
+        self.spawn(["sleep", "30"], owner=owner.pid)
+        pid = agent_pool.read_pid(self.agent_dir)
+        owner.wait()
+        self.assertTrue(self.wait_until(lambda: not self.agent_dir.exists()))
+        self.assertTrue(self.wait_until(lambda: not agent_pool.pid_alive(pid)))
+
+    def test_discard_and_respawn(self):
+        self.spawn(["sleep", "30"])
+        first = agent_pool.read_pid(self.agent_dir)
+        self.spawn(AGENT)
+        self.assertNotEqual(agent_pool.read_pid(self.agent_dir), first)
+        agent_pool.discard(self.run_dir)
+        self.assertFalse(self.agent_dir.exists())
+
+    def test_usage(self):
+        with mock.patch("sys.stderr", io.StringIO()):
+            self.assertEqual(agent_pool.main([]), 2)
+            self.assertEqual(agent_pool.main(["spawn", str(self.run_dir), "x", "true"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Tests for compressed iteration artifacts and ranged reads. Uses only stdlib."""
+
+import gzip
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import artifacts
+
+
+class ArtifactTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_artifacts_"))
+        self.iter_dir = self.tmpdir / "iterations"
+        self.iter_dir.mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def write(self, name, content):
+        path = self.iter_dir / name
+        path.write_bytes(content.encode() if isinstance(content, str) else content)
+        return path
+
+
+class TestCompress(ArtifactTestCase):
+
+    def test_compress_keeps_content_and_mtime(self):
+        body = "".join(f"line {i}\n" for i in range(5000))
+        path = self.write("3-verify.md", body)
+        os.utime(path, ns=(1_000_000_000, 2_000_000_000))
+        target = artifacts.compress(path)
+        self.assertEqual(target.name, "3-verify.md.gz")
+        self.assertFalse(path.exists())
+        self.assertEqual(target.stat().st_mtime_ns, 2_000_000_000)
+        self.assertEqual(gzip.decompress(target.read_bytes()).decode(), body)
+        self.assertEqual(artifacts.size(target), len(body))
+        self.assertEqual(list(self.iter_dir.glob("*.tmp")), [])
+
+    def test_compress_old_skips_recent_small_and_other_files(self):
+        big = "x" * artifacts.COMPRESS_MIN_SIZE
+        for name in ("1-verify.md", "1.log", "1.md", "1-honesty.md", "2-verify.md", "3.log", "4.log"):
+            self.write(name, big)
+        self.write("2.log", "small")
+        done = artifacts.compress_old(self.tmpdir, 4)
+        self.assertEqual([p.name for p in done], ["1-verify.md.gz", "1.log.gz", "2-verify.md.gz"])
+        self.assertEqual(sorted(p.name for p in self.iter_dir.iterdir()), [
+            "1-honesty.md", "1-verify.md.gz", "1.log.gz", "1.md",
+            "2-verify.md.gz", "2.log", "3.log", "4.log",
+        ])
+
+    def test_main(self):
+        self.write("1.log", "y" * artifacts.COMPRESS_MIN_SIZE)
+        with mock.patch("sys.stdout", io.StringIO()) as out:
+            self.assertEqual(artifacts.main(["compress", str(self.tmpdir), "5"]), 0)
+        self.assertEqual(out.getvalue(), "1.log.gz\n")
+        with mock.patch("sys.stderr", io.StringIO()):
+            self.assertEqual(artifacts.main(["compress", str(self.tmpdir)]), 2)
+            self.assertEqual(artifacts.main([]), 2)
+
+
+class TestRead(ArtifactTestCase):
+
+    def test_locate_and_read_either_form(self):
+        plain = self.write("1-verify.md", "PASS\nall good\n")
+        compressed = artifacts.compress(self.write("2-verify.md", "FAIL\nbroken\n"))
+        self.assertEqual(artifacts.locate(plain), plain)
+        self.assertEqual(artifacts.locate(self.iter_dir / "2-verify.md"), compressed)
+        self.assertIsNone(artifacts.locate(self.iter_dir / "3-verify.md"))
+        self.assertEqual(artifacts.read_text(self.iter_dir / "2-verify.md"), "FAIL\nbroken\n")
+        self.assertEqual(artifacts.read_first_line(self.iter_dir / "2-verify.md"), "FAIL\n")
+        self.assertEqual(artifacts.read_text(self.iter_dir / "3-verify.md"), "")
+        self.assertEqual(artifacts.plain_name("2-verify.md.gz"), "2-verify.md")
+
+    def test_range_of_compressed_file(self):
+        body = bytes(range(256)) * 1000
+        path = artifacts.compress(self.write("5.log", body))
+        with artifacts.open_artifact(path) as f:
+            self.assertEqual(artifacts.read_range(f, 100_000, 10), body[100_000:100_010])
+            self.assertEqual(artifacts.read_range(f, 5, 3), body[5:8])
+
+
+class TestTail(ArtifactTestCase):
+
+    def tail(self, body, lines, limit=1000):
+        path = self.write("1.log", body)
+        with artifacts.open_artifact(path) as f:
+            return artifacts.tail(f, len(body), lines, limit)
+
+    def test_last_lines(self):
+        self.assertEqual(self.tail(b"a\nb\nc\n", 2), (2, b"b\nc\n"))
+        self.assertEqual(self.tail(b"a\nb\nc", 2), (2, b"b\nc"))
+        self.assertEqual(self.tail(b"a\nb\n", 5), (0, b"a\nb\n"))
+
+    def test_window_drops_partial_first_line(self):
+        body = b"x" * 50 + b"\n" + b"one\ntwo\n"
+        self.assertEqual(self.tail(body, 10, limit=12), (51, b"one\ntwo\n"))
+        # A single line longer than the window is cut rather than dropped
+        self.assertEqual(self.tail(b"y" * 50, 3, limit=10), (40, b"y" * 10))
+
+    def test_compressed_tail(self):
+        body = "".join(f"{i}\n" for i in range(10000)).encode()
+        path = artifacts.compress(self.write("2.log", body))
+        with artifacts.open_artifact(path) as f:
+            offset, data = artifacts.tail(f, artifacts.size(path), 2, 100)
+        self.assertEqual(data, b"9998\n9999\n")
+        self.assertEqual(body[offset:], data)
+
+
+if __name__ == "__main__":
+    unittest.main()
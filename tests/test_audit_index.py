@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Tests for the incremental audit index. Uses only stdlib."""
+
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import audit_index
+
+FULL_AUDIT = """## Audit Summary
+Mostly solid, parsing is fragile.
+
+## Task Ratings
+
+| Task | Rating | Issues |
+|------|--------|--------|
+| Add the parser | WEAK | no error for empty input |
+| Add the `cli` | SOLID | — |
+
+## File Ratings
+
+| File | Rating | Tasks | Issues |
+|------|--------|-------|--------|
+| `parser.py:12` | **WEAK** | Add the parser | empty input crashes |
+| cli.py | SOLID | Add the cli; Add the parser | — |
+
+## Priority Fixes
+1. parser.py:12 — empty input raises IndexError
+2. cli.py — usage text lists a removed flag
+"""
+
+UPDATE = """## Audit Summary
+The parser is fixed; the new export works.
+
+## Task Ratings
+
+| Task | Rating | Issues |
+|------|--------|--------|
+| Add the parser | SOLID | — |
+| Add CSV export | WEAK | no header row \\| quoting |
+
+## File Ratings
+
+| File | Rating | Tasks | Issues |
+|------|--------|-------|--------|
+| parser.py | SOLID | Add the parser | — |
+| export.py | WEAK | Add CSV export | no header row |
+
+## Priority Fixes
+1. export.py:3 — write a header row
+"""
+
+
+def git(repo, *args):
+    return subprocess.run(["git", *args], cwd=repo, capture_output=True, text=True,
+                          check=True).stdout.strip()
+
+
+class AuditIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_audit_index_"))
+        self.repo = self.tmpdir / "repo"
+        self.repo.mkdir()
+        git(self.repo, "init", "-q")
+        (self.repo / "parser.py").write_text("def parse(s): return s[0]\n")
+        (self.repo / "cli.py").write_text("import parser\n")
+        (self.repo / "README").write_text("docs\n")
+        git(self.repo, "add", ".")
+        git(self.repo, "-c", "user.email=t@example.com", "-c", "user.name=t", "commit", "-qm", "init")
+        self.run_dir = self.repo / ".more-loop" / "app"
+        (self.run_dir / "iterations").mkdir(parents=True)
+        self.write_tasks("- [x] Add the parser\n- [x] Add the `cli`\n")
+        cwd = os.getcwd()
+        os.chdir(self.repo)
+        self.addCleanup(os.chdir, cwd)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def write_tasks(self, text):
+        (self.run_dir / "tasks.md").write_text(text)
+
+    def full_audit(self, iteration=3):
+        (self.run_dir / "audit.md").write_text(FULL_AUDIT)
+        return audit_index.record(self.run_dir, iteration)
+
+
+class TestParse(unittest.TestCase):
+
+    def test_report(self):
+        report = audit_index.parse_report(FULL_AUDIT)
+        self.assertEqual(report["summary"], "Mostly solid, parsing is fragile.")
+        self.assertEqual([(t["task"], t["rating"]) for t in report["tasks"]],
+                         [("Add the parser", "WEAK"), ("Add the `cli`", "SOLID")])
+        self.assertEqual(report["files"][0], {"path": "parser.py", "rating": "WEAK",
+                                              "tasks": ["Add the parser"], "issues": "empty input crashes"})
+        self.assertEqual(report["files"][1]["tasks"], ["Add the cli", "Add the parser"])
+        self.assertEqual(len(report["fixes"]), 2)
+        self.assertEqual(audit_index.parse_report(UPDATE)["tasks"][1]["issues"], "no header row | quoting")
+
+    def test_missing_sections(self):
+        report = audit_index.parse_report("All good, nothing to add.")
+        self.assertEqual((report["tasks"], report["files"], report["fixes"]), ([], [], []))
+
+    def test_same_task(self):
+        self.assertTrue(audit_index.same_task("Add the `cli`", "add the cli."))
+        self.assertTrue(audit_index.same_task("Add the parser for dates", "Add the parser"))
+        self.assertFalse(audit_index.same_task("Add the parser", "Add CSV export"))
+        self.assertFalse(audit_index.same_task("", "Add CSV export"))
+
+
+class TestRecordAndPlan(AuditIndexTestCase):
+
+    def test_record_keys_files_by_blob(self):
+        index = self.full_audit()
+        self.assertEqual(index["files"]["parser.py"]["blob"], git(self.repo, "hash-object", "parser.py"))
+        self.assertEqual(set(index["tree"]), {"parser.py", "cli.py", "README"})
+        self.assertEqual(index["tasks"], ["Add the parser", "Add the `cli`"])
+        self.assertEqual(json.loads((self.run_dir / "audit.json").read_text())["iteration"], 3)
+
+    def test_nothing_due_without_new_tasks(self):
+        self.assertIsNone(audit_index.plan(self.run_dir))
+        self.assertFalse(audit_index.pending(self.run_dir))
+        self.full_audit()
+        (self.repo / "parser.py").write_text("changed\n")
+        # Changed files alone (e.g. improve iterations) don't call for an audit
+        self.assertFalse(audit_index.pending(self.run_dir))
+        self.assertIsNone(audit_index.plan(self.run_dir))
+
+    def test_plan_lists_changed_files_and_affected_tasks(self):
+        self.full_audit()
+        (self.repo / "parser.py").write_text("def parse(s): return s[:1]\n")
+        (self.repo / "export.py").write_text("import csv\n")
+        (self.repo / "README").unlink()
+        self.write_tasks("- [x] Add the parser\n- [x] Add the `cli`\n- [x] Add CSV export\n")
+        self.assertTrue(audit_index.pending(self.run_dir))
+        due = audit_index.plan(self.run_dir)
+        self.assertEqual(due["changed"], [("export.py", "added"), ("parser.py", "modified"),
+                                          ("README", "deleted")])
+        self.assertEqual(due["tasks"], [("Add CSV export", "done since the last audit"),
+                                        ("Add the parser", "its files changed: parser.py")])
+        self.assertEqual([r["task"] for r in due["ratings"]], ["Add the parser"])
+        text = audit_index.format_plan(due)
+        self.assertIn("- Add CSV export (done since the last audit)", text)
+        self.assertIn("- parser.py (modified)", text)
+        self.assertIn("- parser.py: WEAK — empty input crashes", text)
+        self.assertNotIn("cli.py", text)
+
+
+class TestMerge(AuditIndexTestCase):
+
+    def test_merge_keeps_what_was_not_reaudited(self):
+        self.full_audit()
+        (self.repo / "parser.py").write_text("def parse(s): return s[:1]\n")
+        (self.repo / "export.py").write_text("import csv\n")
+        self.write_tasks("- [x] Add the parser\n- [x] Add the `cli`\n- [x] Add CSV export\n")
+        update = self.run_dir / "iterations" / "7-audit.md"
+        update.write_text(UPDATE)
+        index = audit_index.merge(self.run_dir, 7, update)
+
+        self.assertEqual([(r["task"], r["rating"], r["iteration"]) for r in index["task_ratings"]],
+                         [("Add the parser", "SOLID", 7), ("Add the `cli`", "SOLID", 3),
+                          ("Add CSV export", "WEAK", 7)])
+        self.assertEqual(index["files"]["cli.py"]["iteration"], 3)
+        self.assertEqual(index["files"]["parser.py"]["blob"], git(self.repo, "hash-object", "parser.py"))
+        # The old parser fix is superseded; the cli one still stands
+        self.assertEqual(index["fixes"], ["export.py:3 — write a header row",
+                                          "cli.py — usage text lists a removed flag"])
+        self.assertFalse(audit_index.pending(self.run_dir))
+
+        report = (self.run_dir / "audit.md").read_text()
+        self.assertTrue(report.startswith("## Audit Summary\nThe parser is fixed"))
+        self.assertIn("_Audits: iteration 3 (full), iteration 7 (incremental: 2 tasks, 2 files re-examined)._",
+                      report)
+        self.assertIn("| export.py | WEAK | Add CSV export | no header row |", report)
+        self.assertIn("2. cli.py — usage text lists a removed flag", report)
+        # The rendered report parses back to the same ratings
+        reparsed = audit_index.parse_report(report)
+        self.assertEqual(reparsed["tasks"][2]["issues"], "no header row | quoting")
+        self.assertEqual(len(reparsed["files"]), 3)
+
+    def test_merge_without_index(self):
+        update = self.run_dir / "update.md"
+        update.write_text(UPDATE)
+        with self.assertRaises(ValueError):
+            audit_index.merge(self.run_dir, 7, update)
+
+
+class TestOutsideGit(unittest.TestCase):
+
+    def test_tasks_only(self):
+        tmpdir = Path(tempfile.mkdtemp(prefix="test_audit_index_"))
+        self.addCleanup(shutil.rmtree, tmpdir, True)
+        run_dir = tmpdir / ".more-loop" / "app"
+        run_dir.mkdir(parents=True)
+        (run_dir / "tasks.md").write_text("- [x] Add the parser\n")
+        (run_dir / "audit.md").write_text(FULL_AUDIT)
+        cwd = os.getcwd()
+        os.chdir(tmpdir)
+        self.addCleanup(os.chdir, cwd)
+        with mock.patch.dict(os.environ, {"GIT_CEILING_DIRECTORIES": str(tmpdir.parent)}):
+            self.assertIsNone(audit_index.record(run_dir, 2)["tree"])
+            (run_dir / "tasks.md").write_text("- [x] Add the parser\n- [x] Add CSV export\n")
+            due = audit_index.plan(run_dir)
+        self.assertEqual((due["changed"], due["tasks"]), ([], [("Add CSV export", "done since the last audit")]))
+
+
+class TestMain(AuditIndexTestCase):
+
+    def test_cli(self):
+        with mock.patch("sys.stdout", io.StringIO()) as out:
+            self.assertEqual(audit_index.main(["pending", str(self.run_dir)]), 1)
+            self.assertEqual(audit_index.main(["plan", str(self.run_dir)]), 1)
+            (self.run_dir / "audit.md").write_text(FULL_AUDIT)
+            self.assertEqual(audit_index.main(["record", str(self.run_dir), "3"]), 0)
+            self.write_tasks("- [x] Add the parser\n- [x] Add the `cli`\n- [x] Add CSV export\n")
+            self.assertEqual(audit_index.main(["pending", str(self.run_dir)]), 0)
+            self.assertEqual(audit_index.main(["plan", str(self.run_dir)]), 0)
+        self.assertIn("2 tasks, 2 files\n", out.getvalue())
+        self.assertIn("## Tasks to audit:", out.getvalue())
+        with mock.patch("sys.stderr", io.StringIO()):
+            self.assertEqual(audit_index.main(["merge", str(self.run_dir), "4", "missing.md"]), 1)
+            self.assertEqual(audit_index.main(["record", str(self.run_dir)]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
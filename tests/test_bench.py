@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Tests for the benchmark suite, run at a tiny scale. Uses only stdlib."""
+
+import io
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+import bench
+
+
+class TestGenerateRun(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_bench_"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_layout_and_determinism(self):
+        run_dir = bench.generate_run(self.tmpdir, 20)
+        names = sorted(p.name for p in (run_dir / "iterations").iterdir())
+        self.assertEqual(len(names), 60)
+        verify = (run_dir / "iterations" / "1-verify.md").read_text()
+        self.assertIn(verify.split("\n", 1)[0][:4], ("PASS", "FAIL"))
+        self.assertGreaterEqual(len(verify), 1024)
+        again = bench.generate_run(self.tmpdir / "again", 20)
+        self.assertEqual(verify, (again / "iterations" / "1-verify.md").read_text())
+
+
+class TestRunBenchmarks(unittest.TestCase):
+
+    def test_results_shape(self):
+        results = bench.run_benchmarks([3, 5], repeat=1, pollers=2, posters=1, duration=0.3)
+        self.assertEqual(results["version"], bench.RESULTS_VERSION)
+        self.assertEqual([s["iterations"] for s in results["state"]], [3, 5])
+        for entry in results["state"]:
+            for key in ("cold_ms", "warm_ms", "incremental_ms", "cli_ms"):
+                self.assertGreater(entry[key], 0)
+            self.assertGreater(entry["state_json_bytes"], 0)
+        server = results["server"]
+        self.assertEqual(server["errors"], 0)
+        self.assertGreater(server["requests"], 0)
+        self.assertIn("GET /state.json", server["endpoints"])
+        self.assertLessEqual(server["p50_ms"], server["p99_ms"])
+        json.dumps(results)
+
+    def test_skip_server(self):
+        results = bench.run_benchmarks([2], repeat=1, duration=0)
+        self.assertIsNone(results["server"])
+
+
+class TestCompare(unittest.TestCase):
+
+    BASELINE = {
+        "state": [{"iterations": 100, "cold_ms": 10.0, "state_json_bytes": 5000}],
+        "server": {"p50_ms": 2.0, "p99_ms": 8.0, "throughput_rps": 1000.0,
+                   "endpoints": {"GET /state.json": {"p50_ms": 1.0, "p99_ms": 4.0,
+                                                     "throughput_rps": 600.0}}},
+    }
+
+    def test_flatten(self):
+        flat = bench.flatten(self.BASELINE)
+        self.assertEqual(flat["state.100.cold_ms"], 10.0)
+        self.assertEqual(flat["server.GET /state.json.p99_ms"], 4.0)
+        self.assertNotIn("state.100.iterations", flat)
+
+    def test_regressions(self):
+        current = json.loads(json.dumps(self.BASELINE))
+        current["state"][0]["cold_ms"] = 11.0
+        current["server"]["throughput_rps"] = 500.0
+        current["server"]["endpoints"]["GET /state.json"]["p99_ms"] = 2.0
+        _, regressions = bench.compare(self.BASELINE, current, 0.25)
+        self.assertEqual(regressions, ["server.throughput_rps"])
+
+    def test_compare_cli(self):
+        tmpdir = Path(tempfile.mkdtemp(prefix="test_bench_"))
+        self.addCleanup(shutil.rmtree, tmpdir, True)
+        (tmpdir / "a.json").write_text(json.dumps(self.BASELINE))
+        slower = json.loads(json.dumps(self.BASELINE))
+        slower["state"][0]["cold_ms"] = 20.0
+        (tmpdir / "b.json").write_text(json.dumps(slower))
+        with mock.patch("sys.stdout", io.StringIO()) as out:
+            self.assertEqual(bench.main(["compare", str(tmpdir / "a.json"), str(tmpdir / "a.json")]), 0)
+            self.assertEqual(bench.main(["compare", str(tmpdir / "a.json"), str(tmpdir / "b.json")]), 1)
+        self.assertIn("REGRESSED", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Tests for streaming claude output into iteration logs. Uses only stdlib."""
+
+import io
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import claude_stream
+
+
+def event(**data):
+    return json.dumps(data) + "\n"
+
+
+STREAM = [
+    event(type="system", subtype="init", session_id="abc"),
+    event(type="assistant", message={"content": [
+        {"type": "text", "text": "Reading the parser\n"},
+        {"type": "tool_use", "name": "Read", "input": {"file_path": "src/parser.py"}},
+    ]}),
+    event(type="user", message={"content": [
+        {"type": "tool_result", "content": [{"type": "text", "text": "line 1\nline 2\nline 3"}]},
+    ]}),
+    event(type="assistant", message={"content": [
+        {"type": "tool_use", "name": "Bash", "input": {"command": "pytest   -q\n  tests/"}},
+    ]}),
+    event(type="user", message={"content": [
+        {"type": "tool_result", "content": "1 failed", "is_error": True},
+    ]}),
+    event(type="assistant", message={"content": [{"type": "text", "text": "Fixed the parser"}]}),
+    event(type="result", subtype="success", result="Fixed the parser", total_cost_usd=0.5,
+          usage={"input_tokens": 10, "output_tokens": 200}),
+]
+
+
+class TestFormatEvent(unittest.TestCase):
+
+    def test_assistant_text_and_tools(self):
+        self.assertEqual(claude_stream.format_event(json.loads(STREAM[1])),
+                         "Reading the parser\n→ Read: src/parser.py\n")
+        self.assertEqual(claude_stream.format_event(json.loads(STREAM[3])), "→ Bash: pytest -q tests/\n")
+
+    def test_tool_results(self):
+        self.assertEqual(claude_stream.format_event(json.loads(STREAM[2])), "← ok (3 lines)\n")
+        self.assertEqual(claude_stream.format_event(json.loads(STREAM[4])), "← error (1 line)\n")
+
+    def test_long_tool_input_is_cut(self):
+        block = {"type": "tool_use", "name": "Bash", "input": {"command": "x" * 500}}
+        line = claude_stream.tool_summary(block)
+        self.assertLess(len(line), claude_stream.TOOL_SUMMARY_CHARS + 20)
+        self.assertTrue(line.endswith("...\n"))
+
+    def test_unlogged_events(self):
+        self.assertEqual(claude_stream.format_event({"type": "system"}), "")
+        self.assertEqual(claude_stream.format_event({"type": "assistant", "message": "bad"}), "")
+
+
+class TestRelay(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_claude_stream_"))
+        self.log_path = claude_stream.stream_log_path(self.tmpdir, 4)
+        self.usage = self.tmpdir / ".usage.1"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def relay(self, lines, phase="task"):
+        log = claude_stream.StreamLog(self.log_path)
+        try:
+            return claude_stream.relay(iter(lines), log, phase, self.usage, now=iter([0.0, 2.5]).__next__)
+        finally:
+            log.close()
+
+    def test_stream_json(self):
+        self.assertEqual(self.relay(STREAM), "Fixed the parser")
+        log = self.log_path.read_text().splitlines()
+        self.assertTrue(log[0].startswith("━━━ task · "))
+        self.assertEqual(log[1:], [
+            "Reading the parser", "→ Read: src/parser.py", "← ok (3 lines)",
+            "→ Bash: pytest -q tests/", "← error (1 line)", "Fixed the parser",
+            "━━━ task done in 2.5s · 200 output tokens ━━━",
+        ])
+        usage = json.loads(self.usage.read_text())
+        self.assertEqual(usage["output_tokens"], 200)
+
+    def test_log_is_written_as_events_arrive(self):
+        def lines():
+            yield STREAM[1]
+            self.assertIn("→ Read: src/parser.py", self.log_path.read_text())
+            yield STREAM[-1]
+        self.relay(lines())
+
+    def test_phases_append_to_one_log(self):
+        self.relay(STREAM, "task")
+        self.relay(["PASS\n", "looks good"], "verify")
+        text = self.log_path.read_text()
+        self.assertIn("━━━ task done", text)
+        self.assertTrue(text.endswith("PASS\nlooks good\n"))
+        self.assertEqual(text.count("━━━ verify · "), 1)
+
+    def test_json_output_format(self):
+        line = json.dumps({"type": "result", "result": "PASS\nok", "usage": {"output_tokens": 3}})
+        self.assertEqual(self.relay([line]), "PASS\nok")
+        self.assertIn("PASS\nok\n━━━ task done", self.log_path.read_text())
+
+    def test_pretty_printed_json(self):
+        lines = json.dumps({"type": "result", "result": "done", "usage": {}}, indent=2).splitlines(True)
+        self.assertEqual(self.relay(lines), "done")
+        self.assertTrue(self.usage.exists())
+
+    def test_plain_text_passes_through(self):
+        self.assertEqual(self.relay(["FAIL\n", '{"not": "an event"}\n']), 'FAIL\n{"not": "an event"}\n')
+        self.assertFalse(self.usage.exists())
+
+    def test_no_result_returns_nothing(self):
+        # Interrupted mid-call: the log keeps what arrived
+        self.assertEqual(self.relay(STREAM[:2]), "")
+        self.assertIn("Reading the parser", self.log_path.read_text())
+
+
+class TestMain(unittest.TestCase):
+
+    def test_usage(self):
+        self.assertEqual(claude_stream.main([]), 2)
+        self.assertEqual(claude_stream.main(["relay", "log"]), 2)
+
+    def test_relay_without_log(self):
+        stdout = io.StringIO()
+        with mock.patch("sys.stdin", io.TextIOWrapper(io.BytesIO("".join(STREAM).encode()))), \
+                mock.patch("sys.stdout", stdout):
+            self.assertEqual(claude_stream.main(["relay", "", "task", ""]), 0)
+        self.assertEqual(stdout.getvalue(), "Fixed the parser")
+
+
+if __name__ == "__main__":
+    unittest.main()
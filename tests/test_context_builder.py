@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Tests for the token-budgeted prompt context builder. Uses only stdlib."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import artifacts
+import context_builder
+
+
+class TestCompactLog(unittest.TestCase):
+
+    def test_under_budget_unchanged(self):
+        text = "PASS\nall good"
+        self.assertEqual(context_builder.compact_log(text, 100), text)
+
+    def test_repeated_lines_collapsed(self):
+        text = "FAIL\n" + "retrying...\n" * 500 + "done"
+        result = context_builder.compact_log(text, 100)
+        self.assertIn("[previous line repeated 499 more times]", result)
+        self.assertIn("done", result)
+
+    def test_keeps_head_tail_and_failures(self):
+        lines = ["FAIL (exit code 1)"] + [f"ok test_{i}" for i in range(2000)]
+        lines[1000] = "Traceback (most recent call last):"
+        lines[1001] = "AssertionError: expected 3, got 4"
+        lines.append("1 failed, 1999 passed")
+        result = context_builder.compact_log("\n".join(lines), 500)
+        self.assertLessEqual(context_builder.tokens(result), 600)
+        self.assertTrue(result.startswith("FAIL (exit code 1)"))
+        self.assertIn("AssertionError: expected 3, got 4", result)
+        self.assertTrue(result.endswith("1 failed, 1999 passed"))
+        self.assertIn("lines omitted ...]", result)
+
+    def test_long_lines_truncated(self):
+        result = context_builder.compact_log("FAIL\n" + "x" * 10000, 200)
+        self.assertIn("[...]", result)
+        self.assertLess(len(result), 1000)
+
+
+class TestCompactTasks(unittest.TestCase):
+
+    def test_drops_oldest_done_tasks_first(self):
+        lines = ["# Tasks"] + [f"- [x] done task {i} " + "y" * 80 for i in range(100)]
+        lines += ["- [ ] open task A", "- [ ] open task B"]
+        result = context_builder.compact_tasks("\n".join(lines), 500)
+        self.assertLessEqual(context_builder.tokens(result), 520)
+        self.assertIn("# Tasks", result)
+        self.assertIn("- [ ] open task A", result)
+        self.assertIn("- [ ] open task B", result)
+        self.assertIn("done task 99", result)
+        self.assertNotIn("done task 0 ", result)
+        self.assertIn("earlier completed tasks omitted]", result)
+
+    def test_open_tasks_never_dropped(self):
+        lines = [f"- [ ] open {i} " + "z" * 80 for i in range(100)]
+        result = context_builder.compact_tasks("\n".join(lines), 100)
+        self.assertEqual(result.count("- [ ]"), 100)
+
+
+class TestSections(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_context_"))
+        self.iter_dir = self.tmpdir / "iterations"
+        self.iter_dir.mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_unknown_budget(self):
+        with self.assertRaises(ValueError):
+            context_builder.budget_for("task", "nope")
+        self.assertEqual(context_builder.main(["section", "task", "nope", str(self.tmpdir), "x"]), 2)
+
+    def test_digest_cached_until_file_changes(self):
+        path = self.iter_dir / "1-verify.md"
+        path.write_text("FAIL\n" + "\n".join(f"line {i}" for i in range(5000)))
+        first = context_builder.section("fix", "verify", self.tmpdir, path)
+        cache = json.loads((self.tmpdir / context_builder.CACHE_FILE).read_text())
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(next(iter(cache.values()))["digest"], first)
+
+        # A cached digest is served without re-reading the file
+        key = next(iter(cache))
+        cache[key]["digest"] = "from cache"
+        (self.tmpdir / context_builder.CACHE_FILE).write_text(json.dumps(cache))
+        self.assertEqual(context_builder.section("fix", "verify", self.tmpdir, path), "from cache")
+
+        path.write_text("PASS\n")
+        os.utime(path, ns=(1, 1))
+        self.assertEqual(context_builder.section("fix", "verify", self.tmpdir, path), "PASS")
+
+    def test_missing_file_is_empty(self):
+        self.assertEqual(context_builder.section("task", "summary", self.tmpdir, self.iter_dir / "9.md"), "")
+
+    def test_corrupt_cache_ignored(self):
+        (self.tmpdir / context_builder.CACHE_FILE).write_text("{not json")
+        path = self.iter_dir / "1.md"
+        path.write_text("summary")
+        self.assertEqual(context_builder.section("task", "summary", self.tmpdir, path), "summary")
+
+    def test_concurrent_caches_merge_on_save(self):
+        one, two = self.iter_dir / "1.md", self.iter_dir / "2.md"
+        one.write_text("first")
+        two.write_text("second")
+        a = context_builder.DigestCache(self.tmpdir)
+        b = context_builder.DigestCache(self.tmpdir)
+        a.digest(one, "summary", 100)
+        b.digest(two, "summary", 100)
+        a.save()
+        b.save()
+        cache = json.loads((self.tmpdir / context_builder.CACHE_FILE).read_text())
+        self.assertEqual(sorted(cache), ["1.md:summary:100", "2.md:summary:100"])
+
+
+class TestVerifyHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_context_"))
+        self.iter_dir = self.tmpdir / "iterations"
+        self.iter_dir.mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_chronological_and_deduplicated(self):
+        (self.iter_dir / "2-verify.md").write_text("FAIL\nboom\n")
+        (self.iter_dir / "10-verify.md").write_text("PASS\n")
+        (self.iter_dir / "3-verify.md").write_text("FAIL [cached]\nboom\n")
+        (self.iter_dir / "3.md").write_text("not a verify file")
+        result = context_builder.verify_history("audit", self.tmpdir)
+        self.assertLess(result.index("2-verify.md"), result.index("3-verify.md"))
+        self.assertLess(result.index("3-verify.md"), result.index("10-verify.md"))
+        self.assertIn("(identical to 2-verify.md)", result)
+        self.assertEqual(result.count("boom"), 1)
+        self.assertNotIn("not a verify file", result)
+
+    def test_fits_budget_dropping_oldest(self):
+        for i in range(1, 201):
+            body = "\n".join(f"iteration {i} check {j} Error: broken" for j in range(200))
+            (self.iter_dir / f"{i}-verify.md").write_text(f"FAIL {i}\n{body}\n")
+        budget = context_builder.BUDGETS["audit"]["verify-history"]
+        result = context_builder.verify_history("audit", self.tmpdir)
+        self.assertLessEqual(context_builder.tokens(result), budget * 1.05)
+        self.assertIn("earlier verify outputs omitted]", result)
+        self.assertIn("--- 200-verify.md ---", result)
+        self.assertNotIn("--- 1-verify.md ---", result)
+
+    def test_unchanged_outputs_not_reread(self):
+        (self.iter_dir / "1-verify.md").write_text("FAIL\nboom\n")
+        (self.iter_dir / "2-verify.md").write_text("FAIL [cached]\nboom\n")
+        first = context_builder.verify_history("audit", self.tmpdir)
+        with mock.patch.object(artifacts, "open_artifact", side_effect=AssertionError("re-read")):
+            self.assertEqual(context_builder.verify_history("audit", self.tmpdir), first)
+
+    def test_trim_reinlines_dropped_original(self):
+        body = "\n".join(f"check {j} Error: broken" for j in range(400))
+        for i in range(1, 4):
+            (self.iter_dir / f"{i}-verify.md").write_text(f"FAIL\n{body}\n")
+        (self.iter_dir / "4-verify.md").write_text(f"FAIL 4\n{body}\n")
+        budget = context_builder.BUDGETS["audit"]["verify-history"]
+        with mock.patch.object(context_builder, "tokens",
+                               side_effect=lambda text: budget + 1 if "1-verify.md" in text else 0):
+            result = context_builder.verify_history("audit", self.tmpdir)
+        self.assertNotIn("1-verify.md", result)
+        self.assertIn("--- 2-verify.md ---\nFAIL\n", result)
+        self.assertIn("--- 3-verify.md ---\n(identical to 2-verify.md)", result)
+        self.assertIn("[1 earlier verify outputs omitted]", result)
+
+    def test_empty(self):
+        self.assertEqual(context_builder.verify_history("audit", self.tmpdir), "")
+
+    def test_reads_compressed_outputs(self):
+        (self.iter_dir / "1-verify.md").write_text("FAIL\nold failure\n")
+        artifacts.compress(self.iter_dir / "1-verify.md")
+        (self.iter_dir / "2-verify.md").write_text("PASS\n")
+        self.assertEqual([p.name for p in context_builder.verify_files(self.tmpdir)],
+                         ["1-verify.md", "2-verify.md"])
+        result = context_builder.verify_history("audit", self.tmpdir)
+        self.assertIn("--- 1-verify.md ---\nFAIL\nold failure", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Tests for per-phase metrics recording and Prometheus rendering. Uses only stdlib."""
+
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import metrics
+
+CLAUDE_JSON = json.dumps({
+    "type": "result", "subtype": "success", "is_error": False,
+    "result": "Implemented the parser\n", "total_cost_usd": 0.042,
+    "usage": {"input_tokens": 12, "output_tokens": 340, "cache_read_input_tokens": 9000,
+              "cache_creation_input_tokens": 150, "service_tier": "standard"},
+})
+
+
+class TestClaudeOutput(unittest.TestCase):
+
+    def test_result_and_usage(self):
+        text, usage = metrics.parse_claude_output(CLAUDE_JSON)
+        self.assertEqual(text, "Implemented the parser\n")
+        self.assertEqual(usage["output_tokens"], 340)
+        self.assertEqual(usage["cache_read_input_tokens"], 9000)
+        self.assertAlmostEqual(usage["cost_usd"], 0.042)
+
+    def test_message_list(self):
+        messages = [{"type": "system"}, {"type": "assistant"}, json.loads(CLAUDE_JSON)]
+        text, usage = metrics.parse_claude_output(json.dumps(messages))
+        self.assertEqual(text, "Implemented the parser\n")
+        self.assertEqual(usage["input_tokens"], 12)
+
+    def test_plain_text_passes_through(self):
+        for raw in ("PASS\nall good", "", '"just a string"', "[1, 2]"):
+            self.assertEqual(metrics.parse_claude_output(raw), (raw, None))
+
+    def test_error_result_without_text(self):
+        text, usage = metrics.parse_claude_output('{"type":"result","is_error":true,"usage":{}}')
+        self.assertEqual(text, "")
+        self.assertEqual(usage["input_tokens"], 0)
+
+
+class TestRecord(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_metrics_"))
+        self.usage = self.tmpdir / ".usage.1"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def records(self):
+        return [json.loads(line) for line in (self.tmpdir / metrics.METRICS_FILE).read_text().splitlines()]
+
+    def test_record_sums_usage_of_the_phase(self):
+        metrics.append_line(self.usage, metrics.parse_claude_output(CLAUDE_JSON)[1])
+        metrics.append_line(self.usage, metrics.parse_claude_output(CLAUDE_JSON)[1])
+        record = metrics.record_phase(self.tmpdir, "task", "3", "1", "100,5", self.usage, now=112.0)
+        self.assertEqual(record["duration"], 11.5)
+        self.assertEqual(record["exit_code"], 1)
+        self.assertEqual(record["iteration"], 3)
+        self.assertEqual(record["claude_calls"], 2)
+        self.assertEqual(record["output_tokens"], 680)
+        self.assertAlmostEqual(record["cost_usd"], 0.084)
+        self.assertEqual(self.records(), [record])
+
+    def test_record_without_claude_calls(self):
+        metrics.record_phase(self.tmpdir, "verify", 1, 0, "100.0", str(self.tmpdir / "missing"), now=101.0)
+        metrics.record_phase(self.tmpdir, "verify", 2, 0, "100.0", now=102.0)
+        records = self.records()
+        self.assertEqual([r["iteration"] for r in records], [1, 2])
+        self.assertEqual(records[0]["claude_calls"], 0)
+
+    def test_overlap_records_time_saved(self):
+        metrics.record_phase(self.tmpdir, "honesty", 2, 0, "100.0", now=104.0)
+        metrics.record_phase(self.tmpdir, "verify", 1, 0, "90.0", now=99.0)
+        metrics.record_phase(self.tmpdir, "verify", 2, 1, "100.0", now=103.0)
+        record = metrics.record_overlap(self.tmpdir, "2", "100.0", ["honesty", "verify"], now=104.5)
+        self.assertEqual((record["phase"], record["iteration"], record["duration"]), ("pipeline", 2, 4.5))
+        self.assertEqual(record["saved_seconds"], 2.5)
+        self.assertEqual(self.records()[-1], record)
+        reader = metrics.MetricsReader(self.tmpdir / metrics.METRICS_FILE)
+        text = metrics.render_prometheus([("run", reader.refresh())])
+        self.assertIn('more_loop_overlap_saved_seconds_total{run="run",phase="pipeline"} 2.5', text)
+
+    def test_overlap_cli(self):
+        self.assertEqual(metrics.main(["overlap", str(self.tmpdir), "1", "100.0", "honesty", "verify"]), 0)
+        self.assertEqual(self.records()[0]["saved_seconds"], 0.0)
+        self.assertEqual(metrics.main(["overlap", str(self.tmpdir), "x", "1.0", "verify"]), 1)
+
+    def test_judgment_tiers(self):
+        metrics.append_line(self.usage, metrics.parse_claude_output(CLAUDE_JSON)[1])
+        self.assertEqual(metrics.main(["tier", str(self.usage), "haiku", "100.0", "contested"]), 0)
+        metrics.append_line(self.usage, metrics.parse_claude_output(CLAUDE_JSON)[1])
+        metrics.record_tier(self.usage, "opus", "200,5", "accepted", now=210.0)
+        record = metrics.record_phase(self.tmpdir, "honesty", 2, 0, "100.0", self.usage, now=210.0)
+        self.assertEqual(record["claude_calls"], 2)
+        self.assertTrue(record["escalated"])
+        self.assertEqual([(t["model"], t["outcome"]) for t in record["tiers"]],
+                         [("haiku", "contested"), ("opus", "accepted")])
+        self.assertEqual(record["tiers"][1]["duration"], 9.5)
+        # Phases without tiers keep their old shape
+        plain = metrics.record_phase(self.tmpdir, "task", 2, 0, "100.0", now=101.0)
+        self.assertNotIn("tiers", plain)
+
+        self.usage.unlink()
+        metrics.record_tier(self.usage, "haiku", "300.0", "accepted", now=302.0)
+        metrics.record_phase(self.tmpdir, "honesty", 3, 0, "300.0", self.usage, now=302.0)
+        reader = metrics.MetricsReader(self.tmpdir / metrics.METRICS_FILE)
+        honesty = reader.refresh()["honesty"]
+        self.assertEqual((honesty["judgments"], honesty["escalations"]), (2, 1))
+        self.assertEqual(honesty["models"]["haiku"]["count"], 2)
+        text = metrics.render_prometheus([("run", reader.phases)])
+        self.assertIn('more_loop_escalations_total{run="run",phase="honesty"} 1', text)
+        self.assertIn('more_loop_judgment_duration_seconds_sum{run="run",phase="honesty",model="opus"} 9.5', text)
+        self.assertIn('more_loop_judgment_duration_seconds_count{run="run",phase="honesty",model="haiku"} 2',
+                      text)
+
+    def test_retries(self):
+        budget = self.tmpdir / ".retry-budget"
+        self.assertEqual(metrics.main(["retry", str(self.usage), str(budget), "2", "transient", "100.0", "4"]), 0)
+        metrics.record_retry(self.usage, "rate-limit", "200,5", 6, now=203.0)
+        metrics.append_line(self.usage, metrics.parse_claude_output(CLAUDE_JSON)[1])
+        record = metrics.record_phase(self.tmpdir, "task", 2, 0, "100.0", self.usage, now=210.0)
+        self.assertEqual(record["claude_calls"], 1)
+        self.assertEqual(record["retries"], 2)
+        self.assertGreater(record["retry_seconds"], 12.5)
+        # Phases without retries keep their old shape
+        self.assertNotIn("retries", metrics.record_phase(self.tmpdir, "verify", 2, 0, "100.0", now=101.0))
+
+        # The budget is shared by the run: once it is used up nothing is recorded
+        self.assertTrue(metrics.take_retry(budget, 2))
+        self.assertFalse(metrics.take_retry(budget, 2))
+        self.assertEqual(metrics.main(["retry", str(self.usage), str(budget), "2", "transient", "100.0", "4"]),
+                         metrics.BUDGET_SPENT)
+        self.assertEqual(len(self.usage.read_text().splitlines()), 3)
+        self.assertEqual(budget.read_text(), "2")
+
+        reader = metrics.MetricsReader(self.tmpdir / metrics.METRICS_FILE)
+        text = metrics.render_prometheus([("run", reader.refresh())])
+        self.assertIn('more_loop_retries_total{run="run",phase="task"} 2', text)
+        self.assertIn('more_loop_retries_total{run="run",phase="verify"} 0', text)
+        self.assertIn('more_loop_retry_seconds_total{run="run",phase="task"} ', text)
+
+    def test_recent_records_skip_the_cut_line(self):
+        for i in range(50):
+            metrics.record_phase(self.tmpdir, "task", i, 0, "100.0", now=101.0)
+        records = metrics.recent_records(self.tmpdir / metrics.METRICS_FILE, limit=500)
+        self.assertTrue(0 < len(records) < 50)
+        self.assertEqual(records[-1]["iteration"], 49)
+
+    def test_record_cli_errors(self):
+        self.assertEqual(metrics.main(["record", str(self.tmpdir), "task", "x", "0", "1.0"]), 1)
+        self.assertEqual(metrics.main(["record"]), 2)
+
+
+class TestMetricsReader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_metrics_"))
+        self.path = self.tmpdir / metrics.METRICS_FILE
+        self.reader = metrics.MetricsReader(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def append(self, text):
+        with open(self.path, "a") as f:
+            f.write(text)
+
+    def test_missing_file(self):
+        self.assertEqual(self.reader.refresh(), {})
+
+    def test_incremental_and_partial_lines(self):
+        self.append('{"phase":"task","duration":2,"exit_code":0,"output_tokens":5}\n{"phase":"ta')
+        phases = self.reader.refresh()
+        self.assertEqual(phases["task"]["count"], 1)
+        self.append('sk","duration":3,"exit_code":2,"output_tokens":7}\nnot json\n')
+        phases = self.reader.refresh()
+        self.assertEqual(phases["task"]["count"], 2)
+        self.assertEqual(phases["task"]["duration"], 5.0)
+        self.assertEqual(phases["task"]["last_duration"], 3.0)
+        self.assertEqual(phases["task"]["failures"], 1)
+        self.assertEqual(phases["task"]["output_tokens"], 12)
+
+    def test_truncated_file_is_reread(self):
+        self.append('{"phase":"task","duration":2}\n{"phase":"task","duration":2}\n')
+        self.reader.refresh()
+        self.path.write_text('{"phase":"audit","duration":1}\n')
+        self.assertEqual(list(self.reader.refresh()), ["audit"])
+
+
+class TestPrometheus(unittest.TestCase):
+
+    def test_render(self):
+        totals = metrics.new_totals()
+        totals.update(count=2, duration=7.5, failures=1, input_tokens=10, cost_usd=0.25)
+        text = metrics.render_prometheus([('my "run"', {"task": totals})])
+        self.assertIn('more_loop_phase_duration_seconds_sum{run="my \\"run\\"",phase="task"} 7.5', text)
+        self.assertIn('more_loop_phase_duration_seconds_count{run="my \\"run\\"",phase="task"} 2', text)
+        self.assertIn('more_loop_tokens_total{run="my \\"run\\"",phase="task",kind="input"} 10', text)
+        self.assertIn('more_loop_cost_usd_total{run="my \\"run\\"",phase="task"} 0.25', text)
+        # Every sample belongs to a declared family
+        families = {line.split()[2] for line in text.splitlines() if line.startswith("# TYPE")}
+        for line in text.splitlines():
+            if not line.startswith("#"):
+                name = line.split("{", 1)[0]
+                self.assertTrue(name in families or name.rsplit("_", 1)[0] in families, name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -119,6 +119,11 @@ source_functions() {
   [ "$status" -eq 0 ]
 }
 
+@test "rebootstrap cleans up the review journal too" {
+  run grep 'rm.*reviews.journal' "$MORE_LOOP"
+  [ "$status" -eq 0 ]
+}
+
 # ── State transitions ──
 
 @test "write_state_json creates state.json with correct phase" {
@@ -221,6 +226,140 @@ EOF
   [ "$output" = "Next task to do" ]
 }
 
+# ── Model tiers ──
+
+@test "phase_model puts judgment phases on the fast model" {
+  source_functions
+  [ "$(phase_model task)" = "opus" ]
+  [ "$(phase_model honesty)" = "haiku" ]
+  [ "$(phase_model verify)" = "haiku" ]
+  FAST_MODEL=""
+  [ "$(phase_model honesty)" = "opus" ]
+}
+
+@test "phase_model prefers --phase-model overrides" {
+  source_functions
+  PHASE_MODELS=("task=sonnet" "honesty=opus" "task=haiku")
+  [ "$(phase_model task)" = "haiku" ]
+  [ "$(phase_model honesty)" = "opus" ]
+  [ "$(phase_model audit)" = "opus" ]
+}
+
+@test "judgment_outcome classifies verdicts" {
+  source_functions
+  [ "$(judgment_outcome 0 $'PASS\nfine' '^PASS' '^FAIL')" = "accepted" ]
+  [ "$(judgment_outcome 0 $'FAIL\nbroken' '^PASS' '^FAIL')" = "contested" ]
+  [ "$(judgment_outcome 0 'It looks mostly right' '^PASS' '^FAIL')" = "ambiguous" ]
+  [ "$(judgment_outcome 1 'PASS' '^PASS' '^FAIL')" = "error" ]
+}
+
+# ── Retrying failed claude calls ──
+
+@test "claude_failure_kind tells transient failures from permanent ones" {
+  source_functions
+  [ "$(claude_failure_kind 1 'API Error: 529 {"type":"overloaded_error"}')" = "rate-limit" ]
+  [ "$(claude_failure_kind 1 'Error: socket hang up (ECONNRESET)')" = "transient" ]
+  [ "$(claude_failure_kind 1 'API Error: 503 Service Unavailable')" = "transient" ]
+  [ "$(claude_failure_kind 1 'Invalid API key · Please run /login')" = "permanent" ]
+  [ "$(claude_failure_kind 143 'API Error: 529')" = "stopped" ]
+  touch "${RUN_DIR}/.signal-stop"
+  [ "$(claude_failure_kind 1 'API Error: 529')" = "stopped" ]
+}
+
+@test "retry_delay backs off exponentially with jitter, capped" {
+  source_functions
+  RETRY_BASE_DELAY=4
+  RETRY_MAX_DELAY=20
+  local i d
+  for i in 1 2 3 4 5 6 7 8 9 10; do
+    d="$(retry_delay 1)"; [ "$d" -ge 2 ] && [ "$d" -le 4 ]
+    d="$(retry_delay 2)"; [ "$d" -ge 4 ] && [ "$d" -le 8 ]
+    d="$(retry_delay 9)"; [ "$d" -ge 10 ] && [ "$d" -le 20 ]
+  done
+}
+
+@test "a rate-limited iteration leaves no summary for --resume to count" {
+  source_functions
+  record_failed_iteration 3
+  [ "$(cat "${RUN_DIR}/iterations/3.md")" = "claude failed with error" ]
+  # Under the scheduler the stopped iteration is run again on resume
+  export MORE_LOOP_EXIT_ON_RATE_LIMIT=1
+  touch "${RUN_DIR}/.rate-limited"
+  record_failed_iteration 3
+  record_failed_iteration 4
+  [ ! -f "${RUN_DIR}/iterations/3.md" ]
+  [ ! -f "${RUN_DIR}/iterations/4.md" ]
+}
+
+@test "a rate-limited honesty check gives no verdict and uncounts the iteration" {
+  source_functions
+  run_judgment() { touch "${RUN_DIR}/.rate-limited"; return 1; }
+  echo "did task 3" > "${RUN_DIR}/iterations/3.md"
+  run check_task_honesty 3 "- [x] Task A"
+  [ "$status" -eq 1 ]
+  [ "$(head -1 "${RUN_DIR}/iterations/3-honesty.md")" = "DISHONEST — honesty check claude process failed" ]
+  [ -f "${RUN_DIR}/iterations/3.md" ]
+  export MORE_LOOP_EXIT_ON_RATE_LIMIT=1
+  run check_task_honesty 3 "- [x] Task A"
+  [ "$status" -eq 1 ]
+  [ ! -f "${RUN_DIR}/iterations/3.md" ]
+  [ ! -f "${RUN_DIR}/iterations/3-honesty.md" ]
+}
+
+@test "--retries must be a non-negative integer" {
+  run bash "$MORE_LOOP" --retries -1 prompt.md
+  [ "$status" -eq 1 ]
+  [[ "$output" == *"--retries and --retry-budget must be non-negative integers"* ]]
+}
+
+# ── --pipeline ──
+
+@test "pipelined honesty and verify don't interleave in the live log" {
+  source_functions
+  run_honesty_check() {
+    local i
+    for i in 1 2 3; do echo "honesty $i" >> "$CLAUDE_STREAM_LOG"; sleep 0.1; done
+  }
+  run_verify() {
+    local i
+    for i in 1 2 3; do echo "verify $i" >> "$CLAUDE_STREAM_LOG"; sleep 0.1; done
+  }
+  prepare_next_iteration() { :; }
+  run_pipelined_checks 2 "${RUN_DIR}/.tasks-snapshot.md"
+  [ "$(cat "${RUN_DIR}/iterations/2.log")" = "$(printf 'honesty %s\n' 1 2 3; printf 'verify %s\n' 1 2 3)" ]
+  [ ! -f "${RUN_DIR}/iterations/2-verify.log" ]
+}
+
+# ── Task prompt prepared during verify ──
+
+@test "prepared task prompt is reused while its inputs are unchanged" {
+  source_functions
+  printf -- '- [x] Task 1\n- [ ] Task 2\n' > "${RUN_DIR}/tasks.md"
+  echo "- [ ] Accept A" > "${RUN_DIR}/acceptance.md"
+  echo "did task 1" > "${RUN_DIR}/iterations/1.md"
+  prepare_task_prompt 2 1
+  # Written after the prompt was prepared: filled in when it is used
+  printf 'FAIL\nbroken\n' > "${RUN_DIR}/iterations/1-verify.md"
+  run take_prepared_prompt 2 1
+  [ "$status" -eq 0 ]
+  [ "$output" = "$(build_task_prompt 2 1 "")" ]
+  [[ "$output" == *"did task 1"* ]]
+  [[ "$output" == *"$VERIFY_INFO_MARK"* ]]
+  [ ! -f "${RUN_DIR}/.next-prompt" ]
+}
+
+@test "prepared task prompt is dropped when tasks.md changed" {
+  source_functions
+  printf -- '- [x] Task 1\n- [ ] Task 2\n' > "${RUN_DIR}/tasks.md"
+  echo "- [ ] Accept A" > "${RUN_DIR}/acceptance.md"
+  prepare_task_prompt 2 1
+  # e.g. the honesty check reverted the task
+  printf -- '- [ ] Task 1\n- [ ] Task 2\n' > "${RUN_DIR}/tasks.md"
+  run take_prepared_prompt 2 1
+  [ "$status" -ne 0 ]
+  [ ! -f "${RUN_DIR}/.next-prompt" ]
+}
+
 # ── enforce_single_task ──
 
 @test "enforce_single_task allows single task completion" {
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Tests for journaled review storage. Uses only stdlib."""
+
+import io
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import review_store
+
+
+class ReviewStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.run_dir = Path(tempfile.mkdtemp(prefix="test_review_store_"))
+        self.store = review_store.ReviewStore(self.run_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.run_dir, ignore_errors=True)
+
+    def journal(self):
+        return [json.loads(line) for line in self.store.journal_file.read_text().splitlines()]
+
+
+class TestChanges(ReviewStoreTestCase):
+
+    def test_changes_are_appended(self):
+        self.store.replace({"reviews": [{"id": "a", "comment": "one"}, {"text": "no id"}]})
+        base = self.store.base_file.read_text()
+        added = self.store.add({"comment": "two", "section": "tasks"})
+        self.assertTrue(added["id"].startswith("r-"))
+        edited = self.store.edit("a", {"comment": "one!", "id": "ignored"})
+        self.assertEqual(edited, {"id": "a", "comment": "one!"})
+        self.store.delete(added["id"])
+        # reviews.json is untouched; every change is one journal line
+        self.assertEqual(self.store.base_file.read_text(), base)
+        self.assertEqual([(op["seq"], op["op"]) for op in self.journal()],
+                         [(1, "add"), (2, "edit"), (3, "delete")])
+        self.assertEqual(self.store.load(), [{"id": "a", "comment": "one!"}, {"text": "no id"}])
+
+    def test_changes_that_dont_apply(self):
+        self.store.add({"id": "a"})
+        with self.assertRaises(review_store.ReviewError):
+            self.store.add({"id": "a"})
+        with self.assertRaises(review_store.UnknownReview):
+            self.store.edit("b", {"comment": "x"})
+        with self.assertRaises(review_store.UnknownReview):
+            self.store.delete("b")
+        self.assertEqual(len(self.journal()), 1)
+
+    def test_replace_drops_the_journal(self):
+        self.store.add({"id": "a"})
+        self.store.replace({"reviews": [{"id": "b"}]})
+        self.assertFalse(self.store.journal_file.exists())
+        self.assertEqual(json.loads(self.store.base_file.read_text()), {"reviews": [{"id": "b"}], "seq": 1})
+        self.store.add({"id": "c"})
+        self.assertEqual(self.journal()[0]["seq"], 2)
+        self.assertEqual([r["id"] for r in self.store.load()], ["b", "c"])
+
+
+class TestIndex(ReviewStoreTestCase):
+
+    def test_changes_read_only_new_journal_lines(self):
+        self.store.replace({"reviews": [{"id": str(i)} for i in range(100)]})
+        self.store.add({"id": "a"})
+        no_full_read = (mock.patch.object(review_store.ReviewStore, "_read_base", side_effect=AssertionError),
+                        mock.patch.object(review_store.ReviewStore, "_read_journal", side_effect=AssertionError))
+        with no_full_read[0], no_full_read[1]:
+            self.store.edit("a", {"comment": "x"})
+            self.store.delete("0")
+            with self.assertRaises(review_store.ReviewError):
+                self.store.add({"id": "a"})
+        # Another writer's change is picked up from the journal's tail
+        review_store.ReviewStore(self.run_dir).add({"id": "b"})
+        with no_full_read[0], no_full_read[1]:
+            self.assertEqual(self.store.edit("b", {"comment": "y"}), {"id": "b", "comment": "y"})
+        self.assertEqual([op["seq"] for op in self.journal()], [1, 2, 3, 4, 5])
+        self.assertEqual([r["id"] for r in self.store.load()][-2:], ["a", "b"])
+
+    def test_replaced_files_are_read_again(self):
+        self.store.add({"id": "a"})
+        review_store.ReviewStore(self.run_dir).replace({"reviews": [{"id": "b"}]})
+        with self.assertRaises(review_store.UnknownReview):
+            self.store.delete("a")
+        self.store.delete("b")
+        self.store.journal_file.unlink()
+        self.store.base_file.unlink()
+        self.store.add({"id": "b"})
+        self.assertEqual(self.store.load(), [{"id": "b"}])
+
+    def test_failed_append_drops_the_index(self):
+        self.store.add({"id": "a"})
+        with mock.patch.object(review_store.os, "write", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.store.add({"id": "b"})
+        self.store.add({"id": "b"})
+        self.assertEqual([r["id"] for r in self.store.load()], ["a", "b"])
+
+
+class TestCompaction(ReviewStoreTestCase):
+
+    def test_compacts_every_compact_ops_changes(self):
+        with mock.patch.object(review_store, "COMPACT_OPS", 4):
+            for i in range(5):
+                self.store.add({"id": str(i)})
+        self.assertEqual(json.loads(self.store.base_file.read_text())["seq"], 4)
+        self.assertEqual([op["seq"] for op in self.journal()], [5])
+        self.assertEqual([r["id"] for r in self.store.load()], ["0", "1", "2", "3", "4"])
+
+    def test_interrupted_compaction_applies_nothing_twice(self):
+        for i in range(3):
+            self.store.add({"id": str(i)})
+        journal = self.store.journal_file.read_bytes()
+        self.store.compact()
+        # Crashed before the journal was removed
+        self.store.journal_file.write_bytes(journal)
+        self.assertEqual([r["id"] for r in self.store.load()], ["0", "1", "2"])
+        self.store.delete("1")
+        self.assertEqual([r["id"] for r in self.store.load()], ["0", "2"])
+
+    def test_torn_line_is_skipped(self):
+        self.store.add({"id": "a"})
+        with open(self.store.journal_file, "a") as f:
+            f.write('{"seq": 2, "op": "add", "rev')
+        self.assertEqual([r["id"] for r in self.store.load()], ["a"])
+        self.store.add({"id": "b"})
+        self.assertEqual([r["id"] for r in self.store.load()], ["a", "b"])
+
+    def test_unreadable_base(self):
+        self.store.base_file.write_text("not json")
+        self.assertEqual(self.store.load(), [])
+        self.store.add({"id": "a"})
+        self.assertEqual(self.store.load(), [{"id": "a"}])
+
+
+class TestMain(ReviewStoreTestCase):
+
+    def test_export(self):
+        self.store.replace({"reviews": [{"id": "a"}]})
+        self.store.add({"id": "b"})
+        with mock.patch("sys.stdout", io.StringIO()) as out:
+            self.assertEqual(review_store.main(["export", str(self.run_dir)]), 0)
+        self.assertEqual(json.loads(out.getvalue()), {"reviews": [{"id": "a"}, {"id": "b"}]})
+        with mock.patch("sys.stderr", io.StringIO()):
+            self.assertEqual(review_store.main([]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Tests for the multi-loop status and provider comparison. Uses only stdlib."""
+
+import io
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import run_status
+import scheduler
+
+PROVIDERS = ["claude", "glm", "glm-fast"]
+
+
+def metrics_line(iteration, phase, end, duration):
+    hours, seconds = divmod(end, 3600)
+    return json.dumps({"time": f"2026-01-01T{hours:02d}:{seconds // 60:02d}:{seconds % 60:02d}Z",
+                       "iteration": iteration, "phase": phase, "duration": duration}) + "\n"
+
+
+class RunStatusTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp(prefix="test_run_status_"))
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def make_run(self, name, tasks_done=0, tasks_total=4, metrics="", files=None):
+        run_dir = self.root / name
+        (run_dir / "iterations").mkdir(parents=True)
+        (run_dir / "state.json").write_text(json.dumps({
+            "run_name": name, "phase": "task", "current_iteration": 2, "max_iterations": 5,
+            "tasks_completed": tasks_done, "tasks_total": tasks_total}))
+        if metrics:
+            (run_dir / "metrics.jsonl").write_text(metrics)
+        for file_name, content in (files or {}).items():
+            (run_dir / "iterations" / file_name).write_text(content)
+        return run_dir
+
+
+class TestHelpers(unittest.TestCase):
+
+    def test_split_name(self):
+        self.assertEqual(run_status.split_name("app-glm", PROVIDERS), ("app", "glm"))
+        self.assertEqual(run_status.split_name("app-glm-fast", PROVIDERS), ("app", "glm-fast"))
+        self.assertEqual(run_status.split_name("my-app-claude-1700000000", PROVIDERS), ("my-app", "claude"))
+        self.assertEqual(run_status.split_name("app", PROVIDERS), ("app", "-"))
+        self.assertEqual(run_status.split_name("app-glm", []), ("app-glm", "-"))
+
+    def test_union_seconds(self):
+        self.assertEqual(run_status.union_seconds([]), 0)
+        # Overlapping phases count once; the gap between runs doesn't count
+        self.assertEqual(run_status.union_seconds([(0, 10), (5, 20), (100, 110), (102, 104)]), 30)
+
+
+class TestReadRun(RunStatusTestCase):
+
+    def test_read_run(self):
+        metrics = (metrics_line(0, "bootstrap", 10, 10)
+                   + metrics_line(1, "task", 70, 60) + metrics_line(1, "verify", 90, 20)
+                   # --pipeline: iteration 2's task ran while iteration 1 was verified
+                   + metrics_line(2, "task", 100, 30)
+                   + "not json\n")
+        run_dir = self.make_run("app-glm", tasks_done=2, metrics=metrics, files={
+            "1.md": "did things", "1-verify.md": "PASS\n", "2-verify.md": "FAIL: tests",
+            "1-honesty.md": "HONEST", "2-honesty.md": "DISHONEST\nskipped a test",
+            "3-verify.md": "no verdict"})
+        run = run_status.read_run(run_dir)
+        self.assertEqual((run["phase"], run["iteration"], run["tasks_done"]), ("task", 2, 2))
+        self.assertEqual(run["active_seconds"], 100)
+        self.assertEqual((run["iterations"], run["iteration_seconds"]), (2, 110))
+        self.assertEqual((run["verify_pass"], run["verify_total"]), (1, 2))
+        self.assertEqual((run["dishonest"], run["honesty_total"]), (1, 2))
+
+    def test_unreadable_run(self):
+        run_dir = self.root / "broken"
+        run_dir.mkdir()
+        (run_dir / "state.json").write_text("[]")
+        run = run_status.read_run(run_dir)
+        self.assertEqual((run["phase"], run["tasks_done"], run["active_seconds"]), ("?", 0, 0))
+
+
+class TestCompare(RunStatusTestCase):
+
+    def test_comparison(self):
+        hour = metrics_line(1, "task", 3600, 3600)
+        self.make_run("app-glm", tasks_done=3, metrics=hour, files={"1-verify.md": "PASS"})
+        self.make_run("app-glm-1700000000", tasks_done=1, metrics=hour, files={"1-verify.md": "FAIL"})
+        self.make_run("app-claude", tasks_done=2, metrics=metrics_line(1, "task", 1800, 1800))
+        (self.root / ".schedule").mkdir()
+        runs = {d.name: run_status.read_run(d) for d in run_status.run_dirs(self.root)}
+        self.assertEqual(sorted(runs), ["app-claude", "app-glm", "app-glm-1700000000"])
+
+        rows = run_status.compare(runs.values(), PROVIDERS)
+        self.assertEqual([(r["spec"], r["provider"], r["runs"]) for r in rows],
+                         [("app", "claude", 1), ("app", "glm", 2)])
+        self.assertEqual((rows[0]["tasks_per_hour"], rows[1]["tasks_per_hour"]), (4, 2))
+        self.assertEqual((rows[0]["verify_rate"], rows[1]["verify_rate"]), (None, 0.5))
+        self.assertEqual(rows[1]["mean_iteration"], 3600)
+
+        text = run_status.format_comparison(rows)
+        self.assertIn("Tasks/h", text)
+        self.assertRegex(text, r"app\s+glm\s+2\s+4\s+2\.0\s+50% \(1/2\)\s+-\s+60m00s")
+        self.assertRegex(text, r"app\s+claude\s+1\s+2\s+4\.0\s+-\s+-\s+30m00s")
+
+    def test_render(self):
+        self.assertEqual(run_status.render(self.root, {}, PROVIDERS), "  No active runs found.")
+        scheduler.add_job(self.root / ".schedule", "app-glm", "glm", "app.md", 4)
+        text = run_status.render(self.root, {}, PROVIDERS)
+        self.assertIn("queued", text)
+        self.assertNotIn("No active runs", text)
+        self.make_run("app-glm")
+        runs = {"app-glm": run_status.read_run(self.root / "app-glm")}
+        self.assertRegex(run_status.render(self.root, runs, PROVIDERS), r"\napp-glm\s+task\s+2/5\s+0/4\n")
+
+
+class TestWatch(RunStatusTestCase):
+
+    def test_redraws_only_on_change(self):
+        run_dir = self.make_run("app-glm", tasks_done=1)
+        out = io.StringIO()
+        reads = []
+        real_read_run = run_status.read_run
+
+        def read_run(d):
+            reads.append(d.name)
+            return real_read_run(d)
+
+        def sleep(_):
+            if len(sleeps) == 1:
+                # A run advances, another one starts
+                state = json.loads((run_dir / "state.json").read_text())
+                (run_dir / "state.json").write_text(json.dumps(dict(state, tasks_completed=2, pad="x")))
+                self.make_run("app-claude")
+            sleeps.append(_)
+
+        sleeps = [None]
+        with mock.patch.object(run_status, "read_run", read_run), \
+                mock.patch.object(run_status.time, "sleep", sleep):
+            run_status.watch(self.root, PROVIDERS, out=out, interval=0, rounds=4)
+        frames = out.getvalue().split("Ctrl+C to stop)\n")[:-1]
+        self.assertEqual(len(frames), 2)
+        self.assertIn("1/4", frames[0])
+        self.assertIn("2/4", frames[1])
+        self.assertIn("app-claude", frames[1])
+        # The unchanged polls read nothing
+        self.assertEqual(reads, ["app-glm", "app-claude", "app-glm"])
+
+
+class TestMain(RunStatusTestCase):
+
+    def test_show(self):
+        self.make_run("app-glm", tasks_done=1)
+        config = self.root / "providers.json"
+        config.write_text(json.dumps({"providers": {"glm": {"command": "glm"}}}))
+        with mock.patch("sys.stdout", io.StringIO()) as out:
+            self.assertEqual(run_status.main(["show", str(self.root), "--config", str(config)]), 0)
+        self.assertRegex(out.getvalue(), r"\napp\s+glm\s+1\s+1\s")
+        self.assertEqual(run_status.provider_names(self.root / "missing.json"), [])
+
+    def test_usage(self):
+        with mock.patch("sys.stderr", io.StringIO()):
+            self.assertEqual(run_status.main([]), 2)
+            self.assertEqual(run_status.main(["list", str(self.root)]), 2)
+            self.assertEqual(run_status.main(["show", str(self.root), "--providers"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Tests for the SQLite run store. Uses only stdlib."""
+
+import io
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import context_builder
+import run_store
+import state_indexer
+
+
+class StoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_run_store_"))
+        self.runs_root = self.tmpdir / ".more-loop"
+        self.run_dir = self.runs_root / "calc"
+        (self.run_dir / "iterations").mkdir(parents=True)
+        self.store = run_store.RunStore(self.runs_root)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def write(self, name, content):
+        path = self.run_dir / "iterations" / name if name[0].isdigit() else self.run_dir / name
+        path.write_text(content)
+
+    def rows(self, sql, *params):
+        conn = sqlite3.connect(str(self.store.path))
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+
+class TestRegister(StoreTestCase):
+
+    def test_imports_existing_run(self):
+        self.write("1.md", "one")
+        self.write("1-verify.md", "FAIL\nbroken")
+        self.write("1-honesty.md", "HONEST\nok")
+        self.write("2.md", "two")
+        self.write("2-verify.md", "PASS")
+        self.write("notes.txt", "ignored")
+        self.write("tasks.md", "- [x] a\n- [ ] b\n")
+        self.write("metrics.jsonl", '{"phase":"task","iteration":1,"duration":2.5,"time":"2026-01-02T03:04:05Z"}\n')
+        self.store.register(self.run_dir, "opus", "glm")
+
+        self.assertEqual(self.rows("SELECT number, verify_result, honesty_result FROM iterations"),
+                         [(1, "FAIL", "HONEST"), (2, "PASS", "")])
+        self.assertEqual(self.rows("SELECT provider, model FROM runs"), [("glm", "opus")])
+        self.assertEqual(self.rows("SELECT phase, duration, finished_at FROM phases"),
+                         [("task", 2.5, "2026-01-02 03:04:05")])
+        self.assertEqual(self.rows("SELECT task, event FROM task_events ORDER BY id"),
+                         [("a", "added"), ("a", "done"), ("b", "added")])
+        self.assertEqual(self.rows("PRAGMA journal_mode"), [("wal",)])
+
+    def test_register_again_keeps_index(self):
+        self.write("1.md", "one")
+        self.store.register(self.run_dir, "opus")
+        rev, _ = self.store.files("calc")
+        self.store.register(self.run_dir, "", "kimi")
+        self.assertEqual(self.store.files("calc")[0], rev)
+        self.assertEqual(self.rows("SELECT provider, model FROM runs"), [("kimi", "opus")])
+
+    def test_store_for(self):
+        self.assertIsNone(run_store.store_for(self.run_dir))
+        self.store.register(self.run_dir)
+        self.assertIsNotNone(run_store.store_for(self.run_dir))
+        other = self.runs_root / "other"
+        other.mkdir()
+        self.assertIsNone(run_store.store_for(other))
+
+
+class TestSync(StoreTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.store.register(self.run_dir)
+
+    def test_only_named_iterations_are_read(self):
+        self.write("1.md", "one")
+        self.write("2.md", "two")
+        self.store.sync(self.run_dir, [2])
+        rev, files = self.store.files("calc")
+        self.assertEqual(list(files), ["2.md"])
+        self.store.sync(self.run_dir, [2])
+        self.assertEqual(self.store.files("calc")[0], rev)
+
+    def test_changes_and_removals_bump_rev(self):
+        self.write("3-verify.md", "FAIL")
+        self.store.sync(self.run_dir, [3])
+        rev, files = self.store.files("calc")
+        self.assertEqual(files["3-verify.md"]["result"], "FAIL")
+        self.write("3-verify.md", "PASS now")
+        self.store.sync(self.run_dir, [3])
+        new_rev, files = self.store.files("calc")
+        self.assertEqual(files["3-verify.md"]["result"], "PASS")
+        self.assertEqual(files["3-verify.md"]["rev"], new_rev)
+        self.assertGreater(new_rev, rev)
+        (self.run_dir / "iterations" / "3-verify.md").unlink()
+        self.store.sync(self.run_dir, [3])
+        self.assertEqual(self.store.files("calc")[1], {})
+
+    def test_metrics_are_read_incrementally(self):
+        metrics_file = self.run_dir / "metrics.jsonl"
+        metrics_file.write_text('{"phase":"task","iteration":1}\n{"phase":"ver')
+        self.store.sync(self.run_dir, [1])
+        self.assertEqual(self.rows("SELECT phase FROM phases"), [("task",)])
+        with open(metrics_file, "a") as f:
+            f.write('ify","iteration":1,"duration":1.5}\n')
+        self.store.sync(self.run_dir, [1])
+        self.assertEqual(self.rows("SELECT phase, duration FROM phases ORDER BY id"),
+                         [("task", None), ("verify", 1.5)])
+        metrics_file.write_text('{"phase":"audit"}\n')
+        self.store.sync(self.run_dir, [2])
+        self.assertEqual(self.rows("SELECT phase FROM phases"), [("audit",)])
+
+    def test_task_transitions(self):
+        self.write("tasks.md", "- [ ] a\n- [ ] b\n")
+        self.store.sync(self.run_dir, [0])
+        self.write("tasks.md", "- [x] a\n- [ ] c\n")
+        self.store.sync(self.run_dir, [1])
+        self.write("tasks.md", "- [ ] a\n- [ ] c\n")
+        self.store.sync(self.run_dir, [2])
+        self.assertEqual(self.rows("SELECT task, event, iteration FROM task_events ORDER BY id"), [
+            ("a", "added", 0), ("b", "added", 0),
+            ("a", "done", 1), ("c", "added", 1), ("b", "removed", 1),
+            ("a", "reopened", 2),
+        ])
+
+    def test_unregistered_run_is_ignored(self):
+        other = self.runs_root / "other"
+        (other / "iterations").mkdir(parents=True)
+        (other / "iterations" / "1.md").write_text("x")
+        self.store.sync(other, [1])
+        self.assertEqual(self.store.files("other"), (0, {}))
+
+
+class TestReaders(StoreTestCase):
+
+    def test_state_builder_reads_the_store(self):
+        self.write("1.md", "one")
+        self.store.register(self.run_dir)
+        self.write("2.md", "two")
+        self.write("2-verify.md", "PASS")
+        state = state_indexer.write_state(self.run_dir, "verify", "task b", "opus", 5, 2, 0)
+        self.assertEqual(state["iterations_total"], 2)
+        self.assertEqual(state["latest_iteration"]["verify_result"], "PASS")
+        self.assertEqual(state["iterations_rev"], self.store.files("calc")[0])
+        self.assertFalse((self.run_dir / state_indexer.INDEX_FILE).exists())
+        # Meta survives across processes through the runs table
+        self.assertEqual(self.store.meta("calc")["current_task_name"], "task b")
+        again = state_indexer.write_state(self.run_dir, "task", "", "opus", 5, 2, 0)
+        self.assertEqual(again["current_task_name"], "task b")
+        self.assertEqual(again["started_at"], state["started_at"])
+
+    def test_unregistered_run_uses_json_index(self):
+        self.write("1.md", "one")
+        state_indexer.write_state(self.run_dir, "task")
+        self.assertTrue((self.run_dir / state_indexer.INDEX_FILE).exists())
+        self.assertFalse(self.store.path.exists())
+
+    def test_last_iteration_and_verify_files(self):
+        for name in ("1.md", "1-verify.md", "2.md", "10.md", "10-verify.md", "11-verify.md"):
+            self.write(name, "PASS")
+        self.store.register(self.run_dir)
+        self.assertEqual(self.store.last_iteration("calc"), 10)
+        self.assertEqual([p.name for p in context_builder.verify_files(self.run_dir)],
+                         ["1-verify.md", "10-verify.md", "11-verify.md"])
+
+
+class TestMain(StoreTestCase):
+
+    def test_commands(self):
+        self.write("4.md", "four")
+        self.write("4-honesty.md", "DISHONEST\nskipped tests")
+        self.assertEqual(run_store.main(["last-iteration", str(self.run_dir)]), 1)
+        self.assertEqual(run_store.main(["init", str(self.run_dir), "opus", "glm"]), 0)
+        self.assertEqual(run_store.main(["sync", str(self.run_dir), "5"]), 0)
+        out = io.StringIO()
+        with mock.patch("sys.stdout", out):
+            self.assertEqual(run_store.main(["last-iteration", str(self.run_dir)]), 0)
+            self.assertEqual(run_store.main([
+                "query", str(self.runs_root),
+                "SELECT r.provider, i.run, i.number FROM iterations i JOIN runs r ON r.name = i.run "
+                "WHERE i.honesty_result = 'DISHONEST'"]), 0)
+        self.assertEqual(out.getvalue(), "4\nprovider\trun\tnumber\nglm\tcalc\t4\n")
+
+    def test_query_is_read_only(self):
+        self.store.register(self.run_dir)
+        with mock.patch("sys.stderr", io.StringIO()):
+            self.assertEqual(run_store.main(["query", str(self.runs_root), "DELETE FROM runs"]), 2)
+        self.assertEqual(len(self.rows("SELECT * FROM runs")), 1)
+
+    def test_usage(self):
+        with mock.patch("sys.stderr", io.StringIO()):
+            self.assertEqual(run_store.main([]), 2)
+            self.assertEqual(run_store.main(["sync", str(self.run_dir)]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Tests for multi-loop's job scheduler. Uses only stdlib."""
+
+import io
+import json
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import scheduler
+
+
+class ScheduleTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_scheduler_"))
+        self.sched = self.tmpdir / ".schedule"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def add(self, job_id, provider, start, resume=None, iterations=None):
+        job_dir = self.sched / "jobs" / job_id
+        job_dir.mkdir(parents=True)
+        (job_dir / "start.sh").write_text(start)
+        if resume is not None:
+            (job_dir / "resume.sh").write_text(resume)
+        scheduler.add_job(self.sched, job_id, provider, f"{job_id}.md", iterations)
+
+    def scheduler(self, **kwargs):
+        kwargs.setdefault("backoff_base", 0.05)
+        kwargs.setdefault("poll", 0.02)
+        return scheduler.Scheduler(self.sched, log=lambda message: None, **kwargs)
+
+    def job(self, job_id):
+        return next(j for j in scheduler.load(self.sched)["jobs"] if j["id"] == job_id)
+
+
+class TestRunnable(ScheduleTestCase):
+
+    def test_global_and_provider_limits(self):
+        for job_id, provider in (("a", "glm"), ("b", "glm"), ("c", "kimi"), ("d", "claude"), ("e", "kimi")):
+            self.add(job_id, provider, "true")
+        s = self.scheduler(max_parallel=3, limits={"kimi": 2})
+        self.assertEqual([j["id"] for j in s.runnable(0)], ["a", "c", "d"])
+        s.data["jobs"][0]["state"] = "running"
+        s.data["jobs"][2]["state"] = "running"
+        s.max_parallel = 4
+        # b waits for glm's only slot; kimi has room for a second run
+        self.assertEqual([j["id"] for j in s.runnable(0)], ["d", "e"])
+
+    def test_cooldown_holds_the_provider(self):
+        self.add("a", "glm", "true")
+        self.add("b", "kimi", "true")
+        s = self.scheduler(max_parallel=4)
+        s.data["cooldowns"]["glm"] = {"until": 100, "strikes": 1}
+        self.assertEqual([j["id"] for j in s.runnable(50)], ["b"])
+        self.assertEqual([j["id"] for j in s.runnable(150)], ["a", "b"])
+
+    def test_backoff_grows_and_caps(self):
+        with mock.patch("random.uniform", return_value=1.0):
+            self.assertEqual(scheduler.backoff(1, 10), 10)
+            self.assertEqual(scheduler.backoff(3, 10), 40)
+            self.assertEqual(scheduler.backoff(20, 10), scheduler.BACKOFF_MAX)
+
+
+class TestRateLimitDetection(unittest.TestCase):
+
+    def test_patterns(self):
+        self.assertTrue(scheduler.is_rate_limited(75, ""))
+        self.assertTrue(scheduler.is_rate_limited(1, "API Error: 429 Too Many Requests"))
+        self.assertTrue(scheduler.is_rate_limited(1, '{"type":"overloaded_error"}'))
+        self.assertTrue(scheduler.is_rate_limited(1, "Rate limit reached for requests"))
+        self.assertFalse(scheduler.is_rate_limited(1, "tests failed at line 14290"))
+        self.assertFalse(scheduler.is_rate_limited(0, "429"))
+
+
+class TestRun(ScheduleTestCase):
+
+    def test_jobs_run_within_the_limit(self):
+        script = 'echo start >> "{log}"; sleep 0.2; echo end >> "{log}"\n'
+        events = self.tmpdir / "events"
+        for job_id in ("a", "b", "c"):
+            self.add(job_id, "glm", script.format(log=events))
+        self.assertEqual(self.scheduler(max_parallel=3, limits={"glm": 1}).run(), 0)
+        # One at a time: every start is followed by its end
+        self.assertEqual(events.read_text().split(), ["start", "end"] * 3)
+        self.assertEqual({j["state"] for j in scheduler.load(self.sched)["jobs"]}, {"done"})
+
+    def test_rate_limited_run_is_resumed(self):
+        run_dir = self.tmpdir / ".more-loop" / "app-glm"
+        start = (f'mkdir -p "{run_dir}/iterations"; touch "{run_dir}/tasks.md" "{run_dir}/iterations/1.md"\n'
+                 f'echo "Run directory: {run_dir}"\n'
+                 'echo "MORE_LOOP_EXIT_ON_RATE_LIMIT=$MORE_LOOP_EXIT_ON_RATE_LIMIT"\n'
+                 'exit 75\n')
+        resume = 'echo "resume $MULTI_LOOP_RUN_DIR -n $MULTI_LOOP_ITERATIONS"\n'
+        self.add("app-glm", "glm", start, resume, iterations=4)
+        self.add("other-glm", "glm", "echo other\n")
+        self.assertEqual(self.scheduler(max_parallel=2, limits={"glm": 2}).run(), 0)
+
+        job = self.job("app-glm")
+        self.assertEqual((job["state"], job["attempts"], job["rate_limits"]), ("done", 2, 1))
+        self.assertEqual(job["run_dir"], str(run_dir))
+        log = (self.sched / "logs" / "app-glm.log").read_text()
+        self.assertIn("MORE_LOOP_EXIT_ON_RATE_LIMIT=1", log)
+        self.assertIn(f"resume {run_dir} -n 3", log)
+        self.assertIn("attempt 2", log)
+        # A success clears the provider's strikes
+        self.assertEqual(scheduler.load(self.sched)["cooldowns"]["glm"]["strikes"], 0)
+
+    def test_rate_limit_in_log_restarts_other_clis(self):
+        marker = self.tmpdir / "tried"
+        self.add("app-codex", "codex",
+                 f'if [ -f "{marker}" ]; then echo ok; else touch "{marker}"; '
+                 'echo "Error: 429 Too Many Requests"; exit 1; fi\n')
+        self.assertEqual(self.scheduler().run(), 0)
+        self.assertEqual(self.job("app-codex")["attempts"], 2)
+
+    def test_failures_and_give_up(self):
+        self.add("broken", "glm", "exit 3\n")
+        self.add("limited", "kimi", "exit 75\n")
+        with mock.patch.object(scheduler, "MAX_RATE_LIMITS", 2):
+            self.assertEqual(self.scheduler(backoff_base=0.01).run(), 1)
+        self.assertEqual((self.job("broken")["state"], self.job("broken")["note"]), ("failed", "exit 3"))
+        limited = self.job("limited")
+        self.assertEqual((limited["state"], limited["attempts"]), ("failed", 3))
+
+    def test_finished_run_is_not_resumed(self):
+        run_dir = self.tmpdir / "run"
+        (run_dir / "iterations").mkdir(parents=True)
+        (run_dir / "tasks.md").write_text("- [x] a\n")
+        (run_dir / "iterations" / "2.md").write_text("")
+        self.add("app-glm", "glm", "exit 1\n", "exit 1\n", iterations=2)
+        data = scheduler.load(self.sched)
+        data["jobs"][0].update(state="waiting", run_dir=str(run_dir))
+        scheduler.save(self.sched, data)
+        self.assertEqual(self.scheduler().run(), 0)
+        self.assertEqual(self.job("app-glm")["attempts"], 0)
+
+    def test_stop_ends_running_jobs(self):
+        self.add("slow", "glm", "sleep 30\n")
+        self.add("queued", "glm", "true\n")
+        s = self.scheduler()
+        started = time.monotonic()
+        with mock.patch("time.sleep", side_effect=lambda _: s.stop() if s.procs else None):
+            self.assertEqual(s.run(), 1)
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(self.job("slow")["state"], "stopped")
+        self.assertEqual(self.job("queued")["state"], "queued")
+
+
+class TestStatus(ScheduleTestCase):
+
+    def test_status_joins_run_progress(self):
+        run_dir = self.tmpdir / "run"
+        (run_dir / "iterations").mkdir(parents=True)
+        (run_dir / "tasks.md").write_text("- [x] a\n- [ ] b\n  - [X] c\n")
+        (run_dir / "iterations" / "3.md").write_text("")
+        (run_dir / "iterations" / "3-verify.md").write_text("")
+        (run_dir / "state.json").write_text(json.dumps({"phase": "verify"}))
+        self.add("app-glm", "glm", "true", iterations=10)
+        self.add("app-kimi", "kimi", "true")
+        data = scheduler.load(self.sched)
+        data["jobs"][0].update(state="running", attempts=1, run_dir=str(run_dir))
+        data["jobs"][1].update(state="waiting", rate_limits=2, not_before=130)
+        lines = scheduler.format_status(data, now=100).splitlines()
+        self.assertEqual(lines[0].split(), ["Job", "Provider", "State", "Tries", "Phase", "Iter", "Tasks", "Note"])
+        self.assertEqual(lines[1].split(), ["app-glm", "glm", "running", "1", "verify", "3/10", "2/3"])
+        self.assertIn("rate limited ×2, retry in 30s", lines[2])
+
+    def test_main(self):
+        with mock.patch("sys.stdout", io.StringIO()) as out:
+            self.assertEqual(scheduler.main(["status", str(self.sched)]), 1)
+            self.assertEqual(scheduler.main(["add", str(self.sched), "a-glm", "glm", "a.md", "7"]), 0)
+            self.assertEqual(scheduler.main(["status", str(self.sched)]), 0)
+        self.assertIn("a-glm", out.getvalue())
+        self.assertEqual(self.job("a-glm")["iterations"], 7)
+        with mock.patch("sys.stderr", io.StringIO()):
+            self.assertEqual(scheduler.main(["run", str(self.sched), "--bogus", "1"]), 2)
+            self.assertEqual(scheduler.main([]), 2)
+
+    def test_provider_limits(self):
+        config = self.tmpdir / "providers.json"
+        config.write_text(json.dumps({"providers": {"glm": {"max_parallel": 3}, "kimi": {}}}))
+        self.assertEqual(scheduler.provider_limits(config), {"glm": 3})
+        self.assertEqual(scheduler.provider_limits(self.tmpdir / "missing.json"), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,12 +4,19 @@
 Covers: invalid|error|400|404|405 response cases
 """
 
+import gzip
+import http.client
 import json
+import os
 import shutil
+import signal
+import subprocess
 import sys
 import tempfile
 import threading
+import time
 import unittest
+import socket
 from http.server import HTTPServer
 from pathlib import Path
 from urllib.request import Request, urlopen
@@ -45,10 +52,6 @@ def setUpModule():
     # Patch module globals to use our temp dirs
     server_mod.RUN_DIR = run_dir
     server_mod.DATA_DIR = data_dir
-    server_mod.SIGNAL_APPROVE = run_dir / ".signal-approve"
-    server_mod.SIGNAL_STOP = run_dir / ".signal-stop"
-    server_mod.SIGNAL_REQUEST_CHANGES = run_dir / ".signal-request-changes"
-    server_mod.REVIEWS_FILE = run_dir / "reviews.json"
 
 
 def tearDownModule():
@@ -79,7 +82,9 @@ class TestServerEndpoints(unittest.TestCase):
             ".signal-stop",
             ".signal-request-changes",
             "reviews.json",
+            "reviews.journal",
             "state.json",
+            "metrics.jsonl",
         ]:
             p = run_dir / name
             if p.exists():
@@ -115,6 +120,14 @@ class TestServerEndpoints(unittest.TestCase):
         except HTTPError as e:
             return e.code, e.headers, e.read()
 
+    def get_with_headers(self, path, headers):
+        """Send GET with extra headers, return (status, headers, body_bytes)."""
+        try:
+            resp = urlopen(Request(f"{self.base}{path}", headers=headers))
+            return resp.status, resp.headers, resp.read()
+        except HTTPError as e:
+            return e.code, e.headers, e.read()
+
     def get_json(self, path):
         status, _, body = self.get(path)
         return status, json.loads(body)
@@ -150,7 +163,7 @@ class TestServerEndpoints(unittest.TestCase):
         self.assertEqual(data["phase"], "initializing")
         self.assertEqual(data["tasks_total"], 0)
         self.assertEqual(data["tasks_completed"], 0)
-        self.assertIn("iterations", data)
+        self.assertEqual(data["iterations_total"], 0)
 
     def test_get_state_from_file(self):
         """With state.json file, returns its content."""
@@ -175,6 +188,279 @@ class TestServerEndpoints(unittest.TestCase):
         self.assertEqual(status, 500)
         self.assertIn("error", data)
 
+    # -- Conditional GET / compression --
+
+    def test_state_has_validators(self):
+        (run_dir / "state.json").write_text(json.dumps({"phase": "task"}))
+        status, headers, _ = self.get("/state.json")
+        self.assertEqual(status, 200)
+        self.assertTrue(headers.get("ETag"))
+        self.assertTrue(headers.get("Last-Modified"))
+        self.assertEqual(headers.get("Cache-Control"), "no-cache")
+
+    def test_state_served_byte_for_byte(self):
+        raw = json.dumps({"phase": "task", "tasks_total": 3}, indent=2)
+        (run_dir / "state.json").write_text(raw)
+        _, _, body = self.get("/state.json")
+        self.assertEqual(body.decode(), raw)
+
+    def test_state_if_none_match_304(self):
+        (run_dir / "state.json").write_text(json.dumps({"phase": "task"}))
+        _, headers, _ = self.get("/state.json")
+        status, _, body = self.get_with_headers("/state.json", {"If-None-Match": headers["ETag"]})
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b"")
+
+    def test_state_changed_etag_200(self):
+        (run_dir / "state.json").write_text(json.dumps({"phase": "task"}))
+        _, headers, _ = self.get("/state.json")
+        (run_dir / "state.json").write_text(json.dumps({"phase": "verify!"}))
+        status, _, body = self.get_with_headers("/state.json", {"If-None-Match": headers["ETag"]})
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["phase"], "verify!")
+
+    def test_state_if_modified_since_304(self):
+        (run_dir / "state.json").write_text(json.dumps({"phase": "task"}))
+        _, headers, _ = self.get("/state.json")
+        status, _, _ = self.get_with_headers(
+            "/state.json", {"If-Modified-Since": headers["Last-Modified"]})
+        self.assertEqual(status, 304)
+
+    def test_state_gzip(self):
+        state = {"phase": "task", "tasks": "- [ ] x\n" * 500}
+        (run_dir / "state.json").write_text(json.dumps(state))
+        status, headers, body = self.get_with_headers("/state.json", {"Accept-Encoding": "gzip"})
+        self.assertEqual(status, 200)
+        self.assertEqual(headers.get("Content-Encoding"), "gzip")
+        self.assertEqual(headers.get("Vary"), "Accept-Encoding")
+        self.assertEqual(json.loads(gzip.decompress(body))["phase"], "task")
+
+    def test_state_no_gzip_without_accept(self):
+        state = {"phase": "task", "tasks": "- [ ] x\n" * 500}
+        (run_dir / "state.json").write_text(json.dumps(state))
+        _, headers, body = self.get("/state.json")
+        self.assertIsNone(headers.get("Content-Encoding"))
+        self.assertEqual(json.loads(body)["phase"], "task")
+
+    def test_dashboard_if_none_match_304(self):
+        _, headers, _ = self.get("/")
+        status, _, _ = self.get_with_headers("/", {"If-None-Match": headers["ETag"]})
+        self.assertEqual(status, 304)
+
+    # -- GET /iterations --
+
+    def write_iterations(self, files):
+        iter_dir = run_dir / "iterations"
+        iter_dir.mkdir(exist_ok=True)
+        self.addCleanup(shutil.rmtree, iter_dir, True)
+        self.addCleanup(lambda: (run_dir / server_mod.state_indexer.INDEX_FILE).unlink(missing_ok=True))
+        for name, content in files.items():
+            (iter_dir / name).write_text(content)
+        return server_mod.state_indexer.write_state(run_dir, "task")
+
+    def test_iterations_headers(self):
+        self.write_iterations({"1.md": "one", "1-verify.md": "PASS\nok", "2.md": "two"})
+        status, data = self.get_json("/iterations")
+        self.assertEqual(status, 200)
+        self.assertEqual([e["number"] for e in data["iterations"]], [1, 2])
+        self.assertEqual(data["iterations"][0]["verify_result"], "PASS")
+        self.assertNotIn("verify_detail", data["iterations"][0])
+
+    def test_iterations_since(self):
+        state = self.write_iterations({"1.md": "one"})
+        rev = state["iterations_rev"]
+        (run_dir / "iterations" / "2.md").write_text("two")
+        server_mod.state_indexer.write_state(run_dir, "task")
+        status, data = self.get_json(f"/iterations?since={rev}")
+        self.assertEqual(status, 200)
+        self.assertEqual([e["number"] for e in data["iterations"]], [2])
+        self.assertGreater(data["rev"], rev)
+
+    def test_iterations_since_future_rev_resyncs(self):
+        self.write_iterations({"1.md": "one"})
+        status, data = self.get_json("/iterations?since=999999")
+        self.assertEqual(status, 200)
+        self.assertEqual(data["since"], 0)
+        self.assertEqual(len(data["iterations"]), 1)
+
+    def test_iterations_since_invalid(self):
+        status, data = self.get_json("/iterations?since=abc")
+        self.assertEqual(status, 400)
+        self.assertIn("error", data)
+
+    def test_iterations_without_index(self):
+        status, data = self.get_json("/iterations")
+        self.assertEqual(status, 200)
+        self.assertEqual(data["iterations"], [])
+
+    def test_iterations_from_run_store(self):
+        self.write_iterations({"1.md": "one"})
+        store = server_mod.run_store.RunStore(run_dir.parent)
+        for suffix in ("", "-wal", "-shm"):
+            self.addCleanup(Path(str(store.path) + suffix).unlink, missing_ok=True)
+        store.register(run_dir)
+        # Indexed in the store only; the JSON index doesn't know about it
+        (run_dir / "iterations" / "2-verify.md").write_text("FAIL\nbroken")
+        store.sync(run_dir, [2])
+        status, data = self.get_json("/iterations")
+        self.assertEqual(status, 200)
+        self.assertEqual([(e["number"], e["verify_result"]) for e in data["iterations"]],
+                         [(1, ""), (2, "FAIL")])
+        self.assertEqual(data["rev"], store.files("run")[0])
+
+    def test_iteration_detail(self):
+        self.write_iterations({"3.md": "summary three", "3-honesty.md": "HONEST\nyes"})
+        status, data = self.get_json("/iterations/3")
+        self.assertEqual(status, 200)
+        self.assertEqual(data["summary"], "summary three")
+        self.assertEqual(data["honesty_result"], "HONEST")
+        self.assertIn("yes", data["honesty_detail"])
+
+    def test_iteration_detail_missing(self):
+        status, data = self.get_json("/iterations/42")
+        self.assertEqual(status, 404)
+        self.assertIn("error", data)
+
+    def test_iteration_detail_bad_number(self):
+        status, _, _ = self.get("/iterations/../state.json")
+        self.assertEqual(status, 404)
+
+    def test_iteration_stream_offsets(self):
+        self.write_iterations({"2.log": "━━━ task ━━━\nReading\n"})
+        status, headers, body = self.get("/iterations/2/stream")
+        self.assertEqual(status, 200)
+        self.assertTrue(headers["Content-Type"].startswith("text/plain"))
+        self.assertEqual(body.decode(), "━━━ task ━━━\nReading\n")
+        offset = int(headers["X-Stream-Offset"])
+        self.assertEqual(offset, len(body))
+
+        with open(run_dir / "iterations" / "2.log", "a") as f:
+            f.write("→ Bash: pytest\n")
+        _, headers, body = self.get(f"/iterations/2/stream?offset={offset}")
+        self.assertEqual(body, "→ Bash: pytest\n".encode())
+        _, headers, body = self.get(f"/iterations/2/stream?offset={int(headers['X-Stream-Offset'])}")
+        self.assertEqual(body, b"")
+
+        # An offset past the end (the log was replaced) starts over
+        _, headers, body = self.get("/iterations/2/stream?offset=99999")
+        self.assertTrue(body.startswith("━━━ task".encode()))
+
+    def test_iteration_stream_chunked(self):
+        self.write_iterations({"1.log": "x" * 10})
+        original = server_mod.STREAM_CHUNK
+        server_mod.STREAM_CHUNK = 4
+        self.addCleanup(setattr, server_mod, "STREAM_CHUNK", original)
+        _, headers, body = self.get("/iterations/1/stream?offset=2")
+        self.assertEqual((body, headers["X-Stream-Offset"]), (b"xxxx", "6"))
+
+    def test_iteration_stream_follow(self):
+        self.write_iterations({"5.log": "first\n"})
+        for name, value in (("STREAM_IDLE_TIMEOUT", 0.5), ("POLL_INTERVAL", 0.05)):
+            self.addCleanup(setattr, server_mod, name, getattr(server_mod, name))
+            setattr(server_mod, name, value)
+
+        def append():
+            time.sleep(0.2)
+            with open(run_dir / "iterations" / "5.log", "a") as f:
+                f.write("second\n")
+        writer = threading.Thread(target=append)
+        writer.start()
+        status, headers, body = self.get("/iterations/5/stream?follow=1")
+        writer.join()
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Transfer-Encoding"], "chunked")
+        self.assertEqual(body, b"first\nsecond\n")
+
+    def test_iteration_stream_errors(self):
+        self.assertEqual(self.get("/iterations/7/stream")[0], 404)
+        self.write_iterations({"7.log": "x"})
+        self.assertEqual(self.get("/iterations/7/stream?offset=abc")[0], 400)
+        self.assertEqual(self.get("/iterations/7/streams")[0], 404)
+        self.assertEqual(self.get("/iterations/x/stream")[0], 404)
+
+    def test_iteration_artifact_whole(self):
+        self.write_iterations({"2-verify.md": "FAIL\nbroken\n", "2-verify.json": '{"checks": []}'})
+        status, headers, body = self.get("/iterations/2/verify")
+        self.assertEqual((status, body), (200, b"FAIL\nbroken\n"))
+        self.assertEqual(headers["Accept-Ranges"], "bytes")
+        self.assertTrue(headers["Content-Type"].startswith("text/plain"))
+        status, headers, _ = self.get_with_headers("/iterations/2/verify", {"If-None-Match": headers["ETag"]})
+        self.assertEqual(status, 304)
+        status, headers, body = self.get("/iterations/2/checks")
+        self.assertEqual((status, headers["Content-Type"], body), (200, "application/json", b'{"checks": []}'))
+
+    def test_iteration_artifact_large_file_is_copied_in_blocks(self):
+        body = "".join(f"line {i}\n" for i in range(50000))
+        self.write_iterations({"3.log": body})
+        self.addCleanup(setattr, server_mod, "ARTIFACT_BLOCK", server_mod.ARTIFACT_BLOCK)
+        server_mod.ARTIFACT_BLOCK = 4096
+        status, headers, data = self.get("/iterations/3/log")
+        self.assertEqual((status, int(headers["Content-Length"])), (200, len(body)))
+        self.assertEqual(data.decode(), body)
+
+    def test_iteration_artifact_ranges(self):
+        self.write_iterations({"4.log": "0123456789"})
+        cases = {
+            "bytes=2-4": ("234", "bytes 2-4/10"),
+            "bytes=7-": ("789", "bytes 7-9/10"),
+            "bytes=-3": ("789", "bytes 7-9/10"),
+            "bytes=8-99": ("89", "bytes 8-9/10"),
+        }
+        for header, (expected, content_range) in cases.items():
+            status, headers, body = self.get_with_headers("/iterations/4/log", {"Range": header})
+            self.assertEqual((status, body.decode(), headers["Content-Range"]), (206, expected, content_range))
+        status, headers, _ = self.get_with_headers("/iterations/4/log", {"Range": "bytes=10-"})
+        self.assertEqual((status, headers["Content-Range"]), (416, "bytes */10"))
+        # Multiple, malformed or stale (If-Range) ranges get the whole file
+        for extra in ({"Range": "bytes=0-1,4-5"}, {"Range": "lines=1-2"}, {"Range": "bytes=5-2"},
+                      {"Range": "bytes=0-1", "If-Range": '"stale"'}):
+            status, _, body = self.get_with_headers("/iterations/4/log", extra)
+            self.assertEqual((status, body), (200, b"0123456789"))
+
+    def test_iteration_artifact_range_is_capped(self):
+        self.write_iterations({"5.log": "x" * 100})
+        self.addCleanup(setattr, server_mod, "STREAM_CHUNK", server_mod.STREAM_CHUNK)
+        server_mod.STREAM_CHUNK = 16
+        status, headers, body = self.get_with_headers("/iterations/5/log", {"Range": "bytes=10-"})
+        self.assertEqual((status, len(body), headers["Content-Range"]), (206, 16, "bytes 10-25/100"))
+
+    def test_iteration_artifact_tail(self):
+        self.write_iterations({"6.log": "one\ntwo\nthree\n"})
+        status, headers, body = self.get("/iterations/6/log?tail=2")
+        self.assertEqual((status, body), (200, b"two\nthree\n"))
+        self.assertEqual((headers["X-Tail-Offset"], headers["X-Stream-Offset"]), ("4", "14"))
+        self.assertEqual(self.get("/iterations/6/log?tail=0")[0], 400)
+        self.assertEqual(self.get("/iterations/6/log?tail=x")[0], 400)
+
+    def test_compressed_artifact(self):
+        body = "".join(f"check {i}\n" for i in range(5000))
+        self.write_iterations({"7-verify.md": "FAIL\n" + body, "7.log": body})
+        for name in ("7-verify.md", "7.log"):
+            server_mod.artifacts.compress(run_dir / "iterations" / name)
+        # Decompressed unless the client takes gzip
+        status, headers, data = self.get("/iterations/7/verify")
+        self.assertEqual((status, data.decode()), (200, "FAIL\n" + body))
+        self.assertIsNone(headers["Content-Encoding"])
+        status, headers, data = self.get_with_headers("/iterations/7/verify", {"Accept-Encoding": "gzip"})
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(data).decode(), "FAIL\n" + body)
+        self.assertLess(len(data), len(body))
+        # Ranges and tails are of the uncompressed content
+        status, headers, data = self.get_with_headers(
+            "/iterations/7/verify", {"Range": "bytes=5-13", "Accept-Encoding": "gzip"})
+        self.assertEqual((status, data, headers["Content-Encoding"]), (206, b"check 0\nc", None))
+        self.assertEqual(self.get("/iterations/7/log?tail=1")[2], b"check 4999\n")
+        self.assertEqual(self.get("/iterations/7/stream?offset=6")[2], body[6:].encode())
+        _, data = self.get_json("/iterations/7")
+        self.assertEqual(data["verify_result"], "FAIL")
+
+    def test_iteration_artifact_errors(self):
+        self.assertEqual(self.get("/iterations/8/verify")[0], 404)
+        self.write_iterations({"8.md": "x"})
+        self.assertEqual(self.get("/iterations/8/nope")[0], 404)
+        self.assertEqual(self.get("/iterations/x/summary")[0], 404)
+        self.assertEqual(self.get("/iterations/8/summary")[2], b"x")
+
     # -- POST /approve --
 
     def test_post_approve_creates_signal(self):
@@ -243,6 +529,43 @@ class TestServerEndpoints(unittest.TestCase):
 
     # -- GET /reviews --
 
+    def open_control(self):
+        """Create the run's control FIFO and hold it open like more-loop does."""
+        fifo = run_dir / ".control"
+        os.mkfifo(fifo)
+        fd = os.open(fifo, os.O_RDWR | os.O_NONBLOCK)
+        self.addCleanup(fifo.unlink)
+        self.addCleanup(os.close, fd)
+        return fd
+
+    def test_stop_written_to_control_channel(self):
+        fd = self.open_control()
+        status, _ = self.post_json("/stop")
+        self.assertEqual(status, 200)
+        self.assertEqual(os.read(fd, 100), b"stop\n")
+        self.assertTrue((run_dir / ".signal-stop").exists())
+
+    def test_approve_and_request_changes_written_to_control_channel(self):
+        fd = self.open_control()
+        self.post_json("/approve")
+        self.post_json("/request-changes", {"reviews": []})
+        self.assertEqual(os.read(fd, 100), b"approve\nrequest-changes\n")
+
+    def test_control_fifo_without_reader_does_not_block(self):
+        fifo = run_dir / ".control"
+        os.mkfifo(fifo)
+        self.addCleanup(fifo.unlink)
+        status, _ = self.post_json("/stop")
+        self.assertEqual(status, 200)
+        self.assertTrue((run_dir / ".signal-stop").exists())
+
+    def test_control_regular_file_left_alone(self):
+        control = run_dir / ".control"
+        control.write_text("")
+        self.addCleanup(control.unlink)
+        self.post_json("/approve")
+        self.assertEqual(control.read_text(), "")
+
     def test_get_reviews_empty(self):
         """Without reviews.json, returns empty array."""
         status, data = self.get_json("/reviews")
@@ -265,6 +588,76 @@ class TestServerEndpoints(unittest.TestCase):
         self.assertEqual(status, 200)
         self.assertEqual(len(data["reviews"]), 2)
 
+    # -- POST /reviews/{add,edit,delete} --
+
+    def test_single_review_changes(self):
+        self.post_json("/reviews", {"reviews": [{"id": "a", "comment": "first"}]})
+        base = (run_dir / "reviews.json").read_text()
+        status, data = self.post_json("/reviews/add", {"review": {"comment": "second", "section": "tasks"}})
+        self.assertEqual((status, data["status"]), (200, "saved"))
+        added = data["review"]["id"]
+        status, data = self.post_json("/reviews/edit", {"id": "a", "comment": "first!"})
+        self.assertEqual((status, data["review"]), (200, {"id": "a", "comment": "first!"}))
+        status, data = self.post_json("/reviews/delete", {"id": added})
+        self.assertEqual((status, data["status"]), (200, "deleted"))
+        # Only the journal grew
+        self.assertEqual((run_dir / "reviews.json").read_text(), base)
+        self.assertEqual(len((run_dir / "reviews.journal").read_text().splitlines()), 3)
+        _, data = self.get_json("/reviews")
+        self.assertEqual(data["reviews"], [{"id": "a", "comment": "first!"}])
+        # A full save replaces the set and the journal
+        self.post_json("/reviews", {"reviews": []})
+        self.assertFalse((run_dir / "reviews.journal").exists())
+        self.assertEqual(self.get_json("/reviews")[1]["reviews"], [])
+
+    def test_single_review_errors(self):
+        self.post_json("/reviews/add", {"review": {"id": "a"}})
+        self.assertEqual(self.post_json("/reviews/add", {"review": {"id": "a"}})[0], 409)
+        self.assertEqual(self.post_json("/reviews/add", {"review": "text"})[0], 400)
+        self.assertEqual(self.post_json("/reviews/add", {"comment": "x"})[0], 400)
+        status, data = self.post_json("/reviews/edit", {"id": "b", "comment": "x"})
+        self.assertEqual((status, data["error"]), (404, "No review 'b'"))
+        self.assertEqual(self.post_json("/reviews/delete", {"id": "b"})[0], 404)
+        self.assertEqual(self.post_json("/reviews/delete", {})[0], 400)
+        self.assertEqual(self.post_json("/reviews/delete", raw=b"{")[0], 400)
+
+    # -- Request body limits --
+
+    def test_body_over_limit_is_not_read(self):
+        big = {"review": {"comment": "x" * server_mod.MAX_REVIEW_BODY}}
+        status, data = self.post_json("/reviews/add", big)
+        self.assertEqual((status, data["error"]), (413, "Request body too large"))
+        self.assertFalse((run_dir / "reviews.journal").exists())
+        # The full-set route takes the larger limit
+        self.assertEqual(self.post_json("/reviews", {"reviews": [big["review"]]})[0], 200)
+
+    def test_chunked_body(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        body = json.dumps({"review": {"id": "a", "comment": "chunked"}}).encode()
+        conn.request("POST", "/reviews/add", body=iter([body[:10], body[10:]]),
+                     encode_chunked=True, headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        self.assertEqual((resp.status, json.loads(resp.read())["review"]["comment"]), (200, "chunked"))
+        # The connection is still usable for the next request
+        conn.request("POST", "/reviews/delete", body=iter([b'{"id": "a"}']), encode_chunked=True)
+        self.assertEqual(conn.getresponse().read(), b'{"status": "deleted"}')
+        conn.close()
+        # A chunk that would go over the limit is refused before it is read
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as sock:
+            sock.sendall(b"POST /reviews/add HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\n"
+                         b"%x\r\n{" % (server_mod.MAX_REVIEW_BODY + 1))
+            response = sock.makefile("rb").read()
+        self.assertTrue(response.startswith(b"HTTP/1.1 413"), response)
+        self.assertIn(b"Connection: close", response)
+
+    def test_incomplete_body(self):
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as sock:
+            sock.sendall(b"POST /reviews HTTP/1.1\r\nHost: x\r\nContent-Length: 100\r\n\r\n{\"reviews\"")
+            sock.shutdown(socket.SHUT_WR)
+            response = sock.makefile("rb").read()
+        self.assertTrue(response.startswith(b"HTTP/1.1 400"), response)
+        self.assertIn(b"Incomplete request body", response)
+
     # -- POST /request-changes --
 
     def test_request_changes_writes_and_signals(self):
@@ -348,6 +741,356 @@ class TestServerEndpoints(unittest.TestCase):
         status, headers, _ = self.get("/state.json")
         self.assertEqual(headers.get("Access-Control-Allow-Origin"), "*")
 
+    def test_metrics_prometheus_text(self):
+        """GET /metrics aggregates metrics.jsonl per phase, picking up appended lines."""
+        metrics_file = run_dir / "metrics.jsonl"
+        metrics_file.write_text(
+            '{"phase":"task","exit_code":0,"duration":2.5,"input_tokens":100,"cost_usd":0.5,"claude_calls":1}\n'
+            '{"phase":"task","exit_code":1,"duration":1.5,"input_tokens":50,"cost_usd":0.25,"claude_calls":1}\n'
+        )
+        status, headers, body = self.get("/metrics")
+        self.assertEqual(status, 200)
+        self.assertTrue(headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = body.decode()
+        self.assertIn('more_loop_phase_duration_seconds_sum{run="run",phase="task"} 4.0', text)
+        self.assertIn('more_loop_phase_duration_seconds_count{run="run",phase="task"} 2', text)
+        self.assertIn('more_loop_phase_failures_total{run="run",phase="task"} 1', text)
+        self.assertIn('more_loop_tokens_total{run="run",phase="task",kind="input"} 150', text)
+
+        with open(metrics_file, "a") as f:
+            f.write('{"phase":"verify","exit_code":0,"duration":0.25}\n')
+        text = self.get("/metrics")[2].decode()
+        self.assertIn('more_loop_phase_duration_seconds_count{run="run",phase="task"} 2', text)
+        self.assertIn('more_loop_phase_last_duration_seconds{run="run",phase="verify"} 0.25', text)
+
+    def test_metrics_without_file(self):
+        status, _, body = self.get("/metrics")
+        self.assertEqual(status, 200)
+        self.assertIn(b"# TYPE more_loop_phase_duration_seconds summary", body)
+        self.assertNotIn(b"{run=", body)
+
+
+class TestEvents(unittest.TestCase):
+    """Test the /events Server-Sent Events endpoint and RunWatcher."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = server_mod.DashboardServer(("127.0.0.1", 0), server_mod.DashboardHandler)
+        cls.port = cls.server.server_address[1]
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        for name in ("state.json", "reviews.json", "test-guide.md"):
+            p = run_dir / name
+            if p.exists():
+                p.unlink()
+
+    def open_stream(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        conn.request("GET", "/events")
+        resp = conn.getresponse()
+        self.addCleanup(conn.close)
+        return resp
+
+    def read_event(self, resp):
+        """Read one SSE event (skipping comments); returns (event, data)."""
+        event, data = None, []
+        while True:
+            line = resp.fp.readline().decode().rstrip("\n")
+            if line == "":
+                if event is not None:
+                    return event, "\n".join(data)
+                continue
+            if line.startswith(":") or line.startswith("retry:"):
+                continue
+            field, _, value = line.partition(": ")
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
+
+    def test_events_headers(self):
+        resp = self.open_stream()
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(resp.getheader("Content-Type"), "text/event-stream")
+        self.assertEqual(resp.getheader("Cache-Control"), "no-cache")
+
+    def test_initial_state_event(self):
+        server_mod.atomic_write(run_dir / "state.json", json.dumps({"phase": "task"}, indent=2))
+        resp = self.open_stream()
+        event, data = self.read_event(resp)
+        self.assertEqual(event, "state")
+        self.assertEqual(json.loads(data)["phase"], "task")
+
+    def test_initial_state_default(self):
+        resp = self.open_stream()
+        event, data = self.read_event(resp)
+        self.assertEqual(event, "state")
+        self.assertEqual(json.loads(data)["phase"], "initializing")
+
+    def test_pushes_state_change(self):
+        resp = self.open_stream()
+        self.read_event(resp)
+        server_mod.atomic_write(run_dir / "state.json", json.dumps({"phase": "verify"}, indent=2))
+        event, data = self.read_event(resp)
+        self.assertEqual(event, "state")
+        self.assertEqual(json.loads(data)["phase"], "verify")
+
+    def test_pushes_test_guide_change(self):
+        resp = self.open_stream()
+        self.read_event(resp)
+        server_mod.atomic_write(run_dir / "test-guide.md", "# Guide")
+        event, data = self.read_event(resp)
+        self.assertEqual(event, "test-guide")
+        self.assertEqual(json.loads(data)["content"], "# Guide")
+
+    def test_watcher_ignores_unwatched_files(self):
+        quiet_dir = Path(tempfile.mkdtemp(dir=tmpdir))
+        watcher = server_mod.RunWatcher(quiet_dir).start()
+        seq, _ = watcher.snapshot()
+        (quiet_dir / "other.txt").write_text("x")
+        new_seq, _ = watcher.wait_for_change(seq, 0.3)
+        self.assertEqual(new_seq, seq)
+        (quiet_dir / "state.json").write_text("{}")
+        new_seq, _ = watcher.wait_for_change(seq, 3)
+        self.assertNotEqual(new_seq, seq)
+
+    def test_poll_fallback_detects_change(self):
+        watcher = server_mod.RunWatcher(run_dir)
+        watcher.mode = "poll"
+        threading.Thread(target=watcher._poll_loop, daemon=True).start()
+        seq, versions = watcher.snapshot()
+        time.sleep(0.05)
+        (run_dir / "reviews.json").write_text('{"reviews": []}')
+        new_seq, new_versions = watcher.wait_for_change(seq, 3)
+        self.assertNotEqual(new_seq, seq)
+        self.assertNotEqual(new_versions["reviews.json"], versions["reviews.json"])
+        self.assertEqual(new_versions["state.json"], versions["state.json"])
+
+
+class TestConcurrency(unittest.TestCase):
+    """Test the pooled server: keep-alive, overload handling, concurrent writers."""
+
+    def start_server(self, **kwargs):
+        server = server_mod.DashboardServer(
+            ("127.0.0.1", 0), server_mod.DashboardHandler, **kwargs)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server.server_address[1]
+
+    def setUp(self):
+        for name in (".signal-approve", ".signal-stop", "reviews.json", "state.json"):
+            (run_dir / name).unlink(missing_ok=True)
+
+    def test_keep_alive_reuses_connection(self):
+        port = self.start_server()
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        self.addCleanup(conn.close)
+        conn.request("GET", "/state.json")
+        resp = conn.getresponse()
+        self.assertEqual(resp.version, 11)
+        resp.read()
+        sock = conn.sock
+        conn.request("POST", "/approve")
+        resp = conn.getresponse()
+        self.assertEqual(json.loads(resp.read())["status"], "approved")
+        conn.request("GET", "/reviews")
+        resp = conn.getresponse()
+        self.assertEqual(json.loads(resp.read())["reviews"], [])
+        self.assertIs(conn.sock, sock)
+
+    def test_unread_body_closes_connection(self):
+        """A body nobody read must not be parsed as the next request."""
+        port = self.start_server()
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        self.addCleanup(conn.close)
+        conn.request("POST", "/stop", body=b"GET /state.json HTTP/1.1\r\n\r\n")
+        resp = conn.getresponse()
+        self.assertEqual(json.loads(resp.read())["status"], "stopped")
+        self.assertTrue(resp.will_close)
+
+    def test_slow_client_does_not_block_approve(self):
+        port = self.start_server()
+        slow = socket.create_connection(("127.0.0.1", port))
+        self.addCleanup(slow.close)
+        slow.sendall(b"POST /reviews HTTP/1.1\r\nContent-Length: 100000\r\n\r\n{")
+        start = time.monotonic()
+        resp = urlopen(Request(f"http://127.0.0.1:{port}/approve", data=b"", method="POST"), timeout=5)
+        self.assertEqual(resp.status, 200)
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_overload_gets_503(self):
+        port = self.start_server(max_workers=1, max_queued=0)
+        hog = socket.create_connection(("127.0.0.1", port))
+        self.addCleanup(hog.close)
+        hog.sendall(b"GET /state.json HTTP/1.1\r\n\r\n")
+        hog.recv(65536)  # served; the keep-alive connection now pins the only worker
+        with self.assertRaises(HTTPError) as ctx:
+            urlopen(f"http://127.0.0.1:{port}/state.json", timeout=5)
+        self.assertEqual(ctx.exception.code, 503)
+
+    def test_concurrent_review_writers(self):
+        port = self.start_server()
+        errors = []
+
+        def writer(i):
+            body = json.dumps({"reviews": [{"id": i, "text": "x" * 1000}]}).encode()
+            req = Request(f"http://127.0.0.1:{port}/reviews", data=body, method="POST",
+                          headers={"Content-Type": "application/json"})
+            try:
+                urlopen(req, timeout=10).read()
+            except Exception as e:  # noqa: BLE001 - collected for the assertion
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        saved = json.loads((run_dir / "reviews.json").read_text())
+        self.assertIn(saved["reviews"][0]["id"], range(20))
+        self.assertEqual(list(run_dir.glob("*.tmp")), [])
+
+
+class TestSharedServer(unittest.TestCase):
+    """Test the multi-run server: per-run routes, the index and registration."""
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp(prefix="test_shared_"))
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        for name in ("alpha", "beta"):
+            (self.root / name).mkdir()
+        (self.root / "alpha" / "state.json").write_text(json.dumps({
+            "run_name": "alpha", "phase": "task", "current_iteration": 2,
+            "max_iterations": 5, "tasks_completed": 1, "tasks_total": 3,
+        }))
+        (self.root / ".hidden").mkdir()
+        server_mod.RUNS_ROOT = self.root
+        self.addCleanup(setattr, server_mod, "RUNS_ROOT", None)
+        server_mod.REGISTRY = server_mod.RunRegistry()
+        self.addCleanup(setattr, server_mod, "REGISTRY", server_mod.REGISTRY)
+        server = server_mod.DashboardServer(("127.0.0.1", 0), server_mod.DashboardHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def request(self, path, data=None):
+        body = None if data is None else json.dumps(data).encode()
+        req = Request(f"{self.base}{path}", data=body, method="GET" if data is None else "POST",
+                      headers={"Content-Type": "application/json"})
+        try:
+            resp = urlopen(req, timeout=5)
+            return resp.status, resp.read()
+        except HTTPError as e:
+            return e.code, e.read()
+
+    def test_index_summarizes_runs(self):
+        status, body = self.request("/runs")
+        self.assertEqual(status, 200)
+        runs = json.loads(body)["runs"]
+        self.assertEqual([r["name"] for r in runs], ["alpha", "beta"])
+        self.assertEqual(runs[0]["phase"], "task")
+        self.assertEqual(runs[0]["tasks_completed"], 1)
+        self.assertEqual(runs[0]["url"], "/runs/alpha/")
+        self.assertEqual(runs[1]["phase"], "initializing")
+        self.assertFalse(runs[0]["active"])
+
+    def test_index_page_links_runs(self):
+        status, body = self.request("/")
+        self.assertEqual(status, 200)
+        self.assertIn(b'href="/runs/alpha/"', body)
+        self.assertIn(b'href="/runs/beta/"', body)
+
+    def test_per_run_state_and_dashboard(self):
+        status, body = self.request("/runs/alpha/state.json")
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["run_name"], "alpha")
+        status, body = self.request("/runs/beta/state.json")
+        self.assertEqual(json.loads(body)["run_name"], "beta")
+        status, body = self.request("/runs/alpha/")
+        self.assertEqual(status, 200)
+        self.assertIn(b"test dashboard", body)
+
+    def test_run_without_slash_redirects(self):
+        conn = http.client.HTTPConnection("127.0.0.1", int(self.base.rsplit(":", 1)[1]), timeout=5)
+        self.addCleanup(conn.close)
+        conn.request("GET", "/runs/alpha")
+        resp = conn.getresponse()
+        self.assertEqual(resp.status, 301)
+        self.assertEqual(resp.getheader("Location"), "/runs/alpha/")
+
+    def test_per_run_approve(self):
+        status, _ = self.request("/runs/beta/approve", {})
+        self.assertEqual(status, 200)
+        self.assertTrue((self.root / "beta" / ".signal-approve").exists())
+        self.assertFalse((self.root / "alpha" / ".signal-approve").exists())
+
+    def test_unknown_run_404(self):
+        for path in ("/runs/nope/state.json", "/runs/.hidden/state.json", "/runs/../state.json"):
+            status, _ = self.request(path)
+            self.assertEqual(status, 404, path)
+
+    def test_metrics_cover_every_run(self):
+        (self.root / "alpha" / "metrics.jsonl").write_text('{"phase":"task","duration":3}\n')
+        (self.root / "beta" / "metrics.jsonl").write_text('{"phase":"audit","duration":1}\n')
+        status, body = self.request("/metrics")
+        self.assertEqual(status, 200)
+        self.assertIn(b'more_loop_phase_duration_seconds_count{run="alpha",phase="task"} 1', body)
+        self.assertIn(b'more_loop_phase_duration_seconds_count{run="beta",phase="audit"} 1', body)
+        status, body = self.request("/runs/beta/metrics")
+        self.assertEqual(status, 200)
+        self.assertNotIn(b'run="alpha"', body)
+
+    def test_single_run_routes_not_served(self):
+        status, _ = self.request("/state.json")
+        self.assertEqual(status, 404)
+
+    def test_register_marks_run_active(self):
+        status, body = self.request("/runs/alpha/register", {"pid": os.getpid()})
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["url"], "/runs/alpha/")
+        runs = json.loads(self.request("/runs")[1])["runs"]
+        self.assertTrue(runs[0]["active"])
+
+    def test_register_requires_pid(self):
+        status, _ = self.request("/runs/alpha/register", {"pid": "x"})
+        self.assertEqual(status, 400)
+
+    def test_registry_closes_when_owners_exit(self):
+        registry = server_mod.RunRegistry()
+        self.assertFalse(registry.close_if_idle(grace_expired=False))
+        proc = subprocess.Popen([sys.executable, "-c", "pass"])
+        proc.wait()
+        registry.register("alpha", os.getpid())
+        registry.register("beta", proc.pid)
+        self.assertFalse(registry.close_if_idle(grace_expired=True))
+        registry.owners.pop("alpha")
+        self.assertTrue(registry.close_if_idle(grace_expired=False))
+        self.assertFalse(registry.register("alpha", os.getpid()))
+
+    def test_attach_starts_and_reuses_shared_server(self):
+        run_a, run_b = self.root / "alpha", self.root / "gamma"
+        url_a = server_mod.attach(run_a, os.getpid())
+        pid = int((self.root / ".server.pid").read_text())
+        self.addCleanup(os.kill, pid, signal.SIGTERM)
+        url_b = server_mod.attach(run_b, os.getpid())
+        self.assertTrue(url_a.endswith("/runs/alpha/"))
+        self.assertEqual(url_a.rsplit("/runs/", 1)[0], url_b.rsplit("/runs/", 1)[0])
+        self.assertEqual(int((self.root / ".server.pid").read_text()), pid)
+        runs = json.loads(urlopen(url_b.rsplit("/runs/", 1)[0] + "/runs", timeout=5).read())["runs"]
+        self.assertEqual({r["name"] for r in runs if r["active"]}, {"alpha", "gamma"})
+
 
 class TestAtomicWrite(unittest.TestCase):
     """Test the atomic_write helper function."""
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Tests for the incremental state.json builder. Uses only stdlib."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import artifacts
+import state_indexer
+
+
+class TestStateIndexer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="test_indexer_")
+        self.run_dir = Path(self.tmpdir) / "my-run"
+        self.iter_dir = self.run_dir / "iterations"
+        self.iter_dir.mkdir(parents=True)
+        (self.run_dir / "tasks.md").write_text("- [x] Task A\n- [ ] Task B\n")
+        (self.run_dir / "acceptance.md").write_text("- [ ] Accept A\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def write_state(self, phase="task", current_task=""):
+        state_indexer.write_state(self.run_dir, phase, current_task, "opus", 5, 1, 180)
+        return json.loads((self.run_dir / "state.json").read_text())
+
+    def headers(self, since=0):
+        """Iteration headers as the dashboard server reads them from the index."""
+        data = json.loads((self.run_dir / state_indexer.INDEX_FILE).read_text())
+        return state_indexer.iteration_headers(data["files"], since)
+
+    def test_builds_state_fields(self):
+        (self.iter_dir / "1.md").write_text("did task A")
+        (self.iter_dir / "1-verify.md").write_text("PASS\nall good")
+        (self.iter_dir / "1-honesty.md").write_text("HONEST\nlooks real")
+        state = self.write_state("verify", "Task A")
+        self.assertEqual(state["run_name"], "my-run")
+        self.assertEqual(state["phase"], "verify")
+        self.assertEqual(state["tasks_total"], 2)
+        self.assertEqual(state["tasks_completed"], 1)
+        self.assertEqual(state["current_task_name"], "Task A")
+        self.assertEqual(state["approve_timeout"], 180)
+        self.assertEqual(state["iterations_total"], 1)
+        latest = state["latest_iteration"]
+        self.assertEqual(latest["number"], 1)
+        self.assertEqual(latest["verify_result"], "PASS")
+        self.assertEqual(latest["honesty_result"], "HONEST")
+
+    def test_state_does_not_embed_details(self):
+        """state.json stays a fixed-size summary however long the logs get."""
+        for n in range(1, 21):
+            (self.iter_dir / f"{n}-verify.md").write_text("PASS\n" + "x" * 10000)
+        state = self.write_state()
+        self.assertNotIn("iterations", state)
+        self.assertLess((self.run_dir / "state.json").stat().st_size, 2000)
+
+    def test_verdict_classification(self):
+        (self.iter_dir / "1-verify.md").write_text("FAIL (exit code 1)\n")
+        (self.iter_dir / "1-honesty.md").write_text("DISHONEST — nothing\n")
+        (self.iter_dir / "2-verify.md").write_text("SKIP — no verification plan\n")
+        self.write_state()
+        first, second = self.headers()
+        self.assertEqual(first["verify_result"], "FAIL")
+        self.assertEqual(first["honesty_result"], "DISHONEST")
+        self.assertEqual(second["verify_result"], "SKIP")
+
+    def test_iterations_sorted_numerically(self):
+        for n in (10, 2, 1):
+            (self.iter_dir / f"{n}.md").write_text(f"iter {n}")
+        (self.iter_dir / "0-bootstrap.md").write_text("ignored")
+        self.write_state()
+        self.assertEqual([e["number"] for e in self.headers()], [1, 2, 10])
+
+    def test_preserves_started_at_and_task(self):
+        first = self.write_state("task", "Task A")
+        second = self.write_state("verify", "")
+        self.assertEqual(second["started_at"], first["started_at"])
+        self.assertEqual(second["current_task_name"], "Task A")
+
+    def test_meta_seeded_from_existing_state(self):
+        """Runs created before the index existed keep their started_at."""
+        (self.run_dir / "state.json").write_text(json.dumps({
+            "started_at": "2020-01-01T00:00:00Z",
+            "current_task_name": "Old task",
+        }))
+        state = self.write_state()
+        self.assertEqual(state["started_at"], "2020-01-01T00:00:00Z")
+        self.assertEqual(state["current_task_name"], "Old task")
+
+    def test_unchanged_files_not_reread(self):
+        (self.iter_dir / "1-verify.md").write_text("FAIL\n")
+        self.write_state()
+        indexer = state_indexer.StateIndexer(self.run_dir)
+        indexer.files["1-verify.md"]["result"] = "PASS"
+        indexer.dirty = True
+        indexer.save()
+        self.write_state()
+        self.assertEqual(self.headers()[0]["verify_result"], "PASS")
+
+    def test_changed_file_is_reparsed(self):
+        path = self.iter_dir / "1-verify.md"
+        path.write_text("FAIL\n")
+        self.write_state()
+        path.write_text("PASS\nfixed now")
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        self.write_state()
+        self.assertEqual(self.headers()[0]["verify_result"], "PASS")
+
+    def test_since_returns_only_changed_iterations(self):
+        (self.iter_dir / "1.md").write_text("one")
+        (self.iter_dir / "2.md").write_text("two")
+        rev = self.write_state()["iterations_rev"]
+        (self.iter_dir / "2-verify.md").write_text("PASS\n")
+        (self.iter_dir / "3.md").write_text("three")
+        state = self.write_state()
+        self.assertGreater(state["iterations_rev"], rev)
+        self.assertEqual([e["number"] for e in self.headers(since=rev)], [2, 3])
+        self.assertEqual(self.headers(since=state["iterations_rev"]), [])
+
+    def test_removed_file_dropped(self):
+        (self.iter_dir / "1.md").write_text("one")
+        (self.iter_dir / "2.md").write_text("two")
+        self.write_state()
+        (self.iter_dir / "2.md").unlink()
+        state = self.write_state()
+        self.assertEqual(state["iterations_total"], 1)
+        self.assertEqual([e["number"] for e in self.headers()], [1])
+
+    def test_corrupt_index_is_rebuilt(self):
+        (self.iter_dir / "1.md").write_text("one")
+        (self.run_dir / state_indexer.INDEX_FILE).write_text("not json{{")
+        state = self.write_state()
+        self.assertEqual(state["iterations_total"], 1)
+
+    def test_missing_iterations_dir(self):
+        shutil.rmtree(self.iter_dir)
+        state = self.write_state()
+        self.assertEqual(state["iterations_total"], 0)
+        self.assertIsNone(state["latest_iteration"])
+
+    def test_iteration_detail(self):
+        (self.iter_dir / "4.md").write_text("summary 4")
+        (self.iter_dir / "4-verify.md").write_text("FAIL (exit code 2)\nboom")
+        detail = state_indexer.iteration_detail(self.run_dir, 4)
+        self.assertEqual(detail["summary"], "summary 4")
+        self.assertEqual(detail["verify_result"], "FAIL")
+        self.assertIn("boom", detail["verify_detail"])
+        self.assertEqual(detail["honesty_result"], "")
+        self.assertEqual(detail["verify_checks"], [])
+        self.assertIsNone(state_indexer.iteration_detail(self.run_dir, 5))
+
+    def test_long_detail_keeps_the_end(self):
+        body = "FAIL\n" + "".join(f"check {i}\n" for i in range(100))
+        (self.iter_dir / "6-verify.md").write_text(body)
+        detail = state_indexer.iteration_detail(self.run_dir, 6, limit=30)
+        self.assertEqual(detail["verify_result"], "FAIL")
+        self.assertEqual(detail["verify_detail"], "check 97\ncheck 98\ncheck 99\n")
+        self.assertEqual((detail["verify_size"], detail["verify_truncated"]), (len(body), True))
+        self.assertFalse(state_indexer.iteration_detail(self.run_dir, 6)["verify_truncated"])
+
+    def test_compressed_files_keep_their_name(self):
+        (self.iter_dir / "1.md").write_text("one")
+        verify = self.iter_dir / "1-verify.md"
+        verify.write_text("PASS\nok")
+        self.write_state()
+        artifacts.compress(verify)
+        self.write_state()
+        data = json.loads((self.run_dir / state_indexer.INDEX_FILE).read_text())
+        self.assertEqual(sorted(data["files"]), ["1-verify.md", "1.md"])
+        self.assertEqual(self.headers()[0]["verify_result"], "PASS")
+        detail = state_indexer.iteration_detail(self.run_dir, 1)
+        self.assertEqual((detail["verify_result"], detail["verify_detail"]), ("PASS", "PASS\nok"))
+
+    def test_no_temp_files_left(self):
+        self.write_state()
+        self.assertEqual(list(self.run_dir.glob("*.tmp")), [])
+
+    def test_main_usage_error(self):
+        self.assertEqual(state_indexer.main(["only-one-arg"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
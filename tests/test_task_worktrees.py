@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Tests for parallel task selection and worktree merging. Uses only stdlib."""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import task_worktrees
+
+
+def git(repo, *args):
+    return subprocess.run(["git", *args], cwd=repo, capture_output=True, text=True,
+                          check=True).stdout.strip()
+
+
+class TestSelectTasks(unittest.TestCase):
+
+    def test_hints(self):
+        self.assertEqual(task_worktrees.task_hints("Add login form to src/app.py"), {"src/app.py"})
+        self.assertEqual(task_worktrees.task_hints("Update `config` and README.md"), {"config", "README.md"})
+        self.assertEqual(task_worktrees.task_hints("Write the parser"), set())
+
+    def test_skips_checked_and_overlapping_tasks(self):
+        tasks = "\n".join([
+            "# Tasks",
+            "- [x] Set up project",
+            "- [ ] Add parser in parser.py",
+            "- [ ] Add tests for parser.py",
+            "- [ ] Add CLI in cli.py",
+            "- [ ] Add config in config.py",
+        ])
+        self.assertEqual(task_worktrees.select_tasks(tasks, 5),
+                         ["Add parser in parser.py", "Add CLI in cli.py", "Add config in config.py"])
+
+    def test_task_without_hints_runs_alone(self):
+        tasks = "- [ ] Write the parser\n- [ ] Add CLI in cli.py\n"
+        self.assertEqual(task_worktrees.select_tasks(tasks, 5), ["Write the parser"])
+        # It may depend on the tasks before it, and the ones after it on it
+        tasks = "- [ ] Add CLI in cli.py\n- [ ] Write docs\n- [ ] Add config.py\n"
+        self.assertEqual(task_worktrees.select_tasks(tasks, 5), ["Add CLI in cli.py"])
+
+    def test_limit(self):
+        tasks = "- [ ] a.py\n- [ ] b.py\n- [ ] c.py\n"
+        self.assertEqual(task_worktrees.select_tasks(tasks, 2), ["a.py", "b.py"])
+
+    def test_duplicate_task_text_not_run_twice(self):
+        self.assertEqual(task_worktrees.select_tasks("- [ ] a.py\n- [ ] a.py\n", 4), ["a.py"])
+
+
+class TestMarkDone(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_worktrees_"))
+        self.tasks = self.tmpdir / "tasks.md"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_checks_first_matching_task(self):
+        self.tasks.write_text("- [ ] a\n- [ ] b\n- [ ] b\n")
+        self.assertTrue(task_worktrees.mark_done(self.tasks, "b"))
+        self.assertEqual(self.tasks.read_text(), "- [ ] a\n- [x] b\n- [ ] b\n")
+
+    def test_missing_task(self):
+        self.tasks.write_text("- [x] a\n")
+        self.assertFalse(task_worktrees.mark_done(self.tasks, "a"))
+
+
+class TestWorktrees(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_worktrees_"))
+        self.repo = self.tmpdir / "repo"
+        self.repo.mkdir()
+        git(self.repo, "init", "-q")
+        self.lines = [f"v{i} = {i}" for i in range(20)]
+        self.write_app(self.repo, {})
+        git(self.repo, "add", "app.py")
+        git(self.repo, "-c", "user.email=t@example.com", "-c", "user.name=t", "commit", "-qm", "init")
+        self.runs_root = self.repo / ".more-loop"
+        (self.runs_root / "run").mkdir(parents=True)
+        (self.runs_root / "run" / "tasks.md").write_text("- [ ] a\n")
+        cwd = os.getcwd()
+        os.chdir(self.repo)
+        self.addCleanup(os.chdir, cwd)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def write_app(self, tree, changes):
+        lines = [changes.get(i, line) for i, line in enumerate(self.lines)]
+        (tree / "app.py").write_text("\n".join(lines) + "\n")
+
+    def worktree(self, name, base):
+        path = self.runs_root / "run" / "worktrees" / name
+        task_worktrees.add_worktree(path, base)
+        return path
+
+    def test_snapshot_includes_uncommitted_but_not_runs_root(self):
+        (self.repo / "wip.py").write_text("wip = True\n")
+        head = git(self.repo, "rev-parse", "HEAD")
+        base = task_worktrees.snapshot(self.runs_root)
+        wt = self.worktree("1", base)
+        self.assertTrue((wt / "wip.py").exists())
+        self.assertFalse((wt / ".more-loop").exists())
+        # HEAD, branch and index are untouched
+        self.assertEqual(git(self.repo, "rev-parse", "HEAD"), head)
+        self.assertEqual(git(self.repo, "status", "--porcelain", "--", "wip.py"), "?? wip.py")
+
+    def test_no_snapshot_outside_git(self):
+        plain = self.tmpdir / "plain"
+        plain.mkdir()
+        os.chdir(plain)
+        self.assertIsNone(task_worktrees.snapshot(plain / ".more-loop"))
+
+    def test_merges_disjoint_changes_and_rejects_conflicts(self):
+        base = task_worktrees.snapshot(self.runs_root)
+        first, second, third = (self.worktree(n, base) for n in ("1", "2", "3"))
+        self.write_app(first, {0: "v0 = 'first'"})
+        (first / "new.py").write_text("new = 1\n")
+        self.write_app(second, {19: "v19 = 'second'"})
+        # The task may also commit inside its worktree
+        git(second, "-c", "user.email=t@example.com", "-c", "user.name=t", "commit", "-qam", "c")
+        self.write_app(third, {0: "v0 = 'third'"})
+
+        self.assertTrue(task_worktrees.merge_worktree(first, base))
+        self.assertTrue(task_worktrees.merge_worktree(second, base))
+        self.assertFalse(task_worktrees.merge_worktree(third, base))
+        merged = (self.repo / "app.py").read_text().splitlines()
+        self.assertEqual((merged[0], merged[19]), ("v0 = 'first'", "v19 = 'second'"))
+        self.assertEqual((self.repo / "new.py").read_text(), "new = 1\n")
+
+    def test_unchanged_worktree_merges(self):
+        base = task_worktrees.snapshot(self.runs_root)
+        self.assertTrue(task_worktrees.merge_worktree(self.worktree("1", base), base))
+
+    def test_remove(self):
+        base = task_worktrees.snapshot(self.runs_root)
+        wt = self.worktree("1", base)
+        task_worktrees.remove_worktrees([wt.parent])
+        self.assertFalse(wt.exists())
+        self.assertNotIn(str(wt), git(self.repo, "worktree", "list"))
+
+    def test_main_usage(self):
+        self.assertEqual(task_worktrees.main([]), 2)
+        self.assertEqual(task_worktrees.main(["merge", "only-one"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Tests for the content-addressed verify result cache. Uses only stdlib."""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import verify_cache
+
+
+def git(repo, *args):
+    return subprocess.run(["git", *args], cwd=repo, capture_output=True, text=True,
+                          check=True).stdout.strip()
+
+
+class TestCacheKey(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_vcache_"))
+        self.repo = self.tmpdir / "repo"
+        self.repo.mkdir()
+        git(self.repo, "init", "-q")
+        (self.repo / "app.py").write_text("print('hi')\n")
+        git(self.repo, "add", "app.py")
+        git(self.repo, "-c", "user.email=t@example.com", "-c", "user.name=t",
+            "commit", "-qm", "init")
+        self.runs_root = self.repo / ".more-loop"
+        (self.runs_root / "run" / "iterations").mkdir(parents=True)
+        self.verify = self.repo / "verify.sh"
+        self.verify.write_text("exit 0\n")
+        cwd = os.getcwd()
+        os.chdir(self.repo)
+        self.addCleanup(os.chdir, cwd)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def key(self, *extra):
+        return verify_cache.cache_key(self.runs_root, self.verify, extra)
+
+    def test_key_stable_for_unchanged_tree(self):
+        self.assertIsNotNone(self.key())
+        self.assertEqual(self.key(), self.key())
+
+    def test_modified_file_changes_key(self):
+        before = self.key()
+        (self.repo / "app.py").write_text("print('bye')\n")
+        self.assertNotEqual(self.key(), before)
+
+    def test_untracked_file_changes_key(self):
+        before = self.key()
+        (self.repo / "new.py").write_text("x = 1\n")
+        self.assertNotEqual(self.key(), before)
+
+    def test_runs_root_is_ignored(self):
+        before = self.key()
+        (self.runs_root / "run" / "iterations" / "1.md").write_text("summary")
+        self.assertEqual(self.key(), before)
+
+    def test_verify_file_content_changes_key(self):
+        before = self.key()
+        self.verify.write_text("exit 1\n")
+        self.assertNotEqual(self.key(), before)
+
+    def test_extra_files_change_key(self):
+        tasks = self.runs_root / "run" / "tasks.md"
+        tasks.write_text("- [ ] a\n")
+        before = self.key(tasks)
+        tasks.write_text("- [x] a\n")
+        self.assertNotEqual(self.key(tasks), before)
+
+    def test_real_index_untouched(self):
+        (self.repo / "new.py").write_text("x = 1\n")
+        self.key()
+        self.assertEqual(git(self.repo, "status", "--porcelain", "--", "new.py"), "?? new.py")
+
+    def test_no_key_outside_git(self):
+        outside = self.tmpdir / "plain"
+        outside.mkdir()
+        os.chdir(outside)
+        self.assertIsNone(verify_cache.cache_key(outside / ".more-loop", self.verify))
+
+
+class TestVerifyCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_vcache_"))
+        self.iter_dir = self.tmpdir / "run" / "iterations"
+        self.iter_dir.mkdir(parents=True)
+        self.cache = verify_cache.VerifyCache(self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_miss(self):
+        self.assertFalse(self.cache.get("nope", self.iter_dir / "1-verify"))
+        self.assertFalse((self.iter_dir / "1-verify.md").exists())
+
+    def test_roundtrip_labels_cached(self):
+        (self.iter_dir / "1-verify.md").write_text("FAIL (exit code 1)\nboom\n")
+        self.cache.put("k1", self.iter_dir / "1-verify")
+        self.assertTrue(self.cache.get("k1", self.iter_dir / "2-verify"))
+        report = (self.iter_dir / "2-verify.md").read_text()
+        self.assertEqual(report, "FAIL (exit code 1) [cached]\nboom\n")
+        # Caching a cached copy doesn't stack labels
+        self.cache.put("k1", self.iter_dir / "2-verify")
+        self.cache.get("k1", self.iter_dir / "3-verify")
+        self.assertEqual((self.iter_dir / "3-verify.md").read_text().count("[cached]"), 1)
+
+    def test_checks_json_roundtrip(self):
+        (self.iter_dir / "1-verify.md").write_text("PASS\n")
+        (self.iter_dir / "1-verify.json").write_text(json.dumps({"checks": [{"name": "lint"}]}))
+        self.cache.put("k1", self.iter_dir / "1-verify")
+        self.cache.get("k1", self.iter_dir / "2-verify")
+        self.assertEqual(json.loads((self.iter_dir / "2-verify.json").read_text())["checks"][0]["name"], "lint")
+
+    def test_evicts_least_recently_used_by_count(self):
+        cache = verify_cache.VerifyCache(self.tmpdir, max_entries=2)
+        (self.iter_dir / "1-verify.md").write_text("PASS\n")
+        for i, key in enumerate(("a", "b", "c")):
+            cache.put(key, self.iter_dir / "1-verify")
+            entry = cache.dir / f"{key}.md"
+            os.utime(entry, (time.time() + i, time.time() + i))
+        cache.evict()
+        self.assertEqual(sorted(p.stem for p in cache.dir.glob("*.md")), ["b", "c"])
+
+    def test_evicts_by_size(self):
+        cache = verify_cache.VerifyCache(self.tmpdir, max_bytes=1500)
+        (self.iter_dir / "1-verify.md").write_text("PASS\n" + "x" * 1000)
+        cache.put("a", self.iter_dir / "1-verify")
+        os.utime(cache.dir / "a.md", (time.time() - 10, time.time() - 10))
+        cache.put("b", self.iter_dir / "1-verify")
+        self.assertEqual([p.stem for p in cache.dir.glob("*.md")], ["b"])
+
+    def test_main_get_miss_and_usage(self):
+        self.assertEqual(verify_cache.main(["get", str(self.tmpdir), "nope", str(self.iter_dir / "1-verify")]), 1)
+        self.assertEqual(verify_cache.main(["bogus", "x", "y"]), 2)
+        self.assertEqual(verify_cache.main(["put", "x", "y"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Tests for the parallel verify runner. Uses only stdlib."""
+
+import json
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import state_indexer
+import verify_runner
+
+
+class TestLoadPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_verify_"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def plan(self, data):
+        path = self.tmpdir / "verify.json"
+        path.write_text(data if isinstance(data, str) else json.dumps(data))
+        return path
+
+    def assertPlanError(self, data, message):
+        with self.assertRaises(verify_runner.PlanError) as ctx:
+            verify_runner.load_plan(self.plan(data))
+        self.assertIn(message, str(ctx.exception))
+
+    def test_defaults(self):
+        checks, jobs = verify_runner.load_plan(self.plan({"checks": [{"name": "a", "run": "true"}]}))
+        self.assertEqual(jobs, verify_runner.DEFAULT_JOBS)
+        self.assertEqual(checks[0]["timeout"], verify_runner.DEFAULT_TIMEOUT)
+        self.assertEqual(checks[0]["needs"], [])
+
+    def test_plan_timeout_is_default_for_checks(self):
+        checks, _ = verify_runner.load_plan(self.plan({"timeout": 5, "checks": [
+            {"name": "a", "run": "true"}, {"name": "b", "run": "true", "timeout": 9}]}))
+        self.assertEqual([c["timeout"] for c in checks], [5, 9])
+
+    def test_invalid_json(self):
+        self.assertPlanError("{not json", "cannot read")
+
+    def test_missing_checks(self):
+        self.assertPlanError({"checks": []}, "non-empty 'checks'")
+
+    def test_duplicate_name(self):
+        self.assertPlanError({"checks": [{"name": "a", "run": "x"}, {"name": "a", "run": "y"}]},
+                             "duplicate")
+
+    def test_missing_run(self):
+        self.assertPlanError({"checks": [{"name": "a"}]}, "'run'")
+
+    def test_bad_timeout(self):
+        self.assertPlanError({"checks": [{"name": "a", "run": "x", "timeout": 0}]}, "timeout")
+
+    def test_unknown_dependency(self):
+        self.assertPlanError({"checks": [{"name": "a", "run": "x", "needs": ["b"]}]}, "unknown check 'b'")
+
+    def test_cycle(self):
+        self.assertPlanError({"checks": [
+            {"name": "a", "run": "x", "needs": ["b"]},
+            {"name": "b", "run": "x", "needs": ["a"]},
+        ]}, "cycle")
+
+
+class TestVerifyRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_verify_"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def check(self, name, run, timeout=30, needs=()):
+        return {"name": name, "run": run, "timeout": timeout, "needs": list(needs)}
+
+    def run_checks(self, *checks, jobs=4):
+        return {r["name"]: r for r in verify_runner.VerifyRunner(list(checks), jobs).run()}
+
+    def test_independent_checks_run_concurrently(self):
+        start = time.monotonic()
+        results = self.run_checks(self.check("a", "sleep 0.5"), self.check("b", "sleep 0.5"),
+                                  self.check("c", "sleep 0.5"))
+        self.assertLess(time.monotonic() - start, 1.2)
+        self.assertEqual({r["status"] for r in results.values()}, {"pass"})
+
+    def test_jobs_limits_concurrency(self):
+        start = time.monotonic()
+        self.run_checks(self.check("a", "sleep 0.3"), self.check("b", "sleep 0.3"), jobs=1)
+        self.assertGreaterEqual(time.monotonic() - start, 0.6)
+
+    def test_dependency_waits_for_need(self):
+        marker = self.tmpdir / "first"
+        results = self.run_checks(
+            self.check("second", f"test -f {marker}", needs=["first"]),
+            self.check("first", f"sleep 0.2; touch {marker}"),
+        )
+        self.assertEqual(results["second"]["status"], "pass")
+
+    def test_failed_dependency_skips_dependents(self):
+        results = self.run_checks(
+            self.check("unit", "echo broken; exit 3"),
+            self.check("smoke", "true", needs=["unit"]),
+            self.check("deep", "true", needs=["smoke"]),
+            self.check("lint", "true"),
+        )
+        self.assertEqual(results["unit"]["status"], "fail")
+        self.assertEqual(results["unit"]["exit_code"], 3)
+        self.assertIn("broken", results["unit"]["output"])
+        self.assertEqual(results["smoke"]["status"], "skipped")
+        self.assertEqual(results["deep"]["status"], "skipped")
+        self.assertEqual(results["lint"]["status"], "pass")
+
+    def test_timeout_kills_process_group(self):
+        pid_file = self.tmpdir / "child.pid"
+        start = time.monotonic()
+        results = self.run_checks(self.check("slow", f"sleep 30 & echo $! > {pid_file}; wait", timeout=0.5))
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(results["slow"]["status"], "timeout")
+        self.assertIn("timed out", results["slow"]["output"])
+
+    def test_results_in_plan_order_with_duration(self):
+        checks = [self.check("b", "sleep 0.2"), self.check("a", "true")]
+        results = verify_runner.VerifyRunner(checks, 2).run()
+        self.assertEqual([r["name"] for r in results], ["b", "a"])
+        self.assertGreaterEqual(results[0]["duration"], 0.2)
+
+
+class TestReport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="test_verify_"))
+        self.iter_dir = self.tmpdir / "iterations"
+        self.iter_dir.mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def write_plan(self, checks):
+        path = self.tmpdir / "verify.json"
+        path.write_text(json.dumps({"checks": checks}))
+        return str(path)
+
+    def test_main_pass_writes_both_files(self):
+        plan = self.write_plan([{"name": "lint", "run": "echo lint ok"}])
+        rc = verify_runner.main([plan, str(self.iter_dir / "1-verify")])
+        self.assertEqual(rc, 0)
+        report = (self.iter_dir / "1-verify.md").read_text()
+        self.assertTrue(report.startswith("PASS"))
+        self.assertIn("lint ok", report)
+        summary = json.loads((self.iter_dir / "1-verify.json").read_text())
+        self.assertEqual(summary["status"], "pass")
+        self.assertEqual(summary["checks"][0]["name"], "lint")
+        self.assertNotIn("output", summary["checks"][0])
+
+    def test_main_fail_names_failed_checks(self):
+        plan = self.write_plan([{"name": "lint", "run": "true"}, {"name": "unit", "run": "false"}])
+        rc = verify_runner.main([plan, str(self.iter_dir / "2-verify")])
+        self.assertEqual(rc, 1)
+        first_line = (self.iter_dir / "2-verify.md").read_text().split("\n", 1)[0]
+        self.assertTrue(first_line.startswith("FAIL"))
+        self.assertIn("unit (fail)", first_line)
+        self.assertEqual(state_indexer.classify_verdict("verify", first_line), "FAIL")
+
+    def test_main_invalid_plan(self):
+        plan = self.write_plan([])
+        self.assertEqual(verify_runner.main([plan, str(self.iter_dir / "1-verify")]), 2)
+        self.assertFalse((self.iter_dir / "1-verify.md").exists())
+
+    def test_main_usage_error(self):
+        self.assertEqual(verify_runner.main(["only-one-arg"]), 2)
+
+    def test_output_truncated(self):
+        results = [{"name": "big", "status": "pass", "duration": 0.1,
+                    "output": "x" * (verify_runner.MAX_OUTPUT * 2)}]
+        report = verify_runner.render_report(results, 0.1)
+        self.assertIn("output truncated", report)
+        self.assertLess(len(report), verify_runner.MAX_OUTPUT + 1000)
+
+    def test_iteration_detail_includes_checks(self):
+        plan = self.write_plan([{"name": "lint", "run": "true"}, {"name": "unit", "run": "false"}])
+        verify_runner.main([plan, str(self.iter_dir / "3-verify")])
+        detail = state_indexer.iteration_detail(self.tmpdir, 3)
+        self.assertEqual(detail["verify_result"], "FAIL")
+        self.assertEqual([c["status"] for c in detail["verify_checks"]], ["pass", "fail"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Content-addressed cache of verify results. Uses only stdlib.
+
+The key is a hash of the working tree (a git tree hash that includes
+uncommitted and untracked files) plus the verify file's content, so a verify
+of code that hasn't changed since a previous verify is answered from the
+cache instead of re-running tests or a claude evaluation. The tree hash is
+built in a throwaway index, so the repository's real index is untouched, and
+the runs root (.more-loop/) is left out of it since every iteration writes
+there.
+
+Entries live in <runs-root>/.verify-cache/ as <key>.md (the N-verify.md
+that was produced) plus <key>.json when the verify runner wrote one. The
+cache is bounded by entry count and total size; least recently used entries
+are evicted first.
+
+Usage (called by more-loop's run_verify):
+    verify_cache.py key <runs-root> <verify-file> [extra-file...]
+    verify_cache.py get <runs-root> <key> <dest-prefix>
+    verify_cache.py put <runs-root> <key> <src-prefix>
+
+`key` prints nothing and exits 1 outside a git work tree; `get` exits 1 on
+a miss.
+"""
+
+import contextlib
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from state_indexer import atomic_write
+
+CACHE_DIR = ".verify-cache"
+MAX_ENTRIES = 256
+MAX_BYTES = 32 * 1024 * 1024
+CACHED_LABEL = " [cached]"
+
+
+def git(*args, env=None, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, env=env, capture_output=True,
+                          text=True, check=True).stdout.strip()
+
+
+@contextlib.contextmanager
+def working_tree_index(runs_root):
+    """A throwaway index holding the whole working tree, minus the runs root.
+
+    Yields (env, top): the environment that points git at the index and the
+    work tree's top directory. Yields None outside a git work tree.
+    """
+    try:
+        top = git("rev-parse", "--show-toplevel")
+        index = Path(git("rev-parse", "--git-path", "index"))
+    except (OSError, subprocess.CalledProcessError):
+        yield None
+        return
+    if not index.is_absolute():
+        index = Path.cwd() / index
+    exclude = os.path.relpath(Path(runs_root).resolve(), top)
+    pathspec = ["."] if exclude.startswith("..") else [".", f":(exclude){exclude}"]
+    with tempfile.TemporaryDirectory(prefix="more-loop-index-") as tmp:
+        tmp_index = Path(tmp) / "index"
+        if index.exists():
+            # Starting from the real index reuses its stat cache: only files
+            # that changed since the last `git add` get rehashed
+            shutil.copyfile(index, tmp_index)
+        env = dict(os.environ, GIT_INDEX_FILE=str(tmp_index))
+        try:
+            git("add", "-A", "--", *pathspec, env=env, cwd=top)
+        except (OSError, subprocess.CalledProcessError):
+            yield None
+            return
+        yield env, top
+
+
+def tree_hash(runs_root):
+    """Hash of the whole working tree (tracked, modified and untracked files).
+
+    Returns None outside a git work tree.
+    """
+    with working_tree_index(runs_root) as snapshot:
+        if snapshot is None:
+            return None
+        env, top = snapshot
+        try:
+            return git("write-tree", env=env, cwd=top)
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+
+def cache_key(runs_root, verify_file, extra_files=()):
+    """Key for verifying the current tree with verify_file, or None."""
+    tree = tree_hash(runs_root)
+    if tree is None:
+        return None
+    h = hashlib.sha256()
+    h.update(tree.encode())
+    for path in (verify_file, *extra_files):
+        h.update(b"\0" + Path(path).suffix.encode() + b"\0")
+        try:
+            h.update(Path(path).read_bytes())
+        except OSError:
+            pass
+    return h.hexdigest()[:32]
+
+
+class VerifyCache:
+    """Directory of cached verify results, LRU-evicted by count and size."""
+
+    def __init__(self, runs_root, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.dir = Path(runs_root) / CACHE_DIR
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def get(self, key, dest_prefix):
+        """Copy a cached result to <dest_prefix>.md/.json. Returns True on a hit."""
+        src = self.dir / f"{key}.md"
+        try:
+            report = src.read_text()
+        except (OSError, UnicodeDecodeError):
+            return False
+        first, sep, rest = report.partition("\n")
+        if not first.endswith(CACHED_LABEL):
+            first += CACHED_LABEL
+        dest_prefix = Path(dest_prefix)
+        checks = self.dir / f"{key}.json"
+        if checks.exists():
+            atomic_write(dest_prefix.with_name(dest_prefix.name + ".json"), checks.read_bytes())
+        atomic_write(dest_prefix.with_name(dest_prefix.name + ".md"), first + sep + rest)
+        # Hits count as use for LRU eviction
+        os.utime(src)
+        return True
+
+    def put(self, key, src_prefix):
+        """Store <src_prefix>.md (and .json if present) under key, then evict."""
+        src_prefix = Path(src_prefix)
+        report = src_prefix.with_name(src_prefix.name + ".md")
+        checks = src_prefix.with_name(src_prefix.name + ".json")
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if checks.exists():
+            atomic_write(self.dir / f"{key}.json", checks.read_bytes())
+        else:
+            (self.dir / f"{key}.json").unlink(missing_ok=True)
+        atomic_write(self.dir / f"{key}.md", report.read_bytes())
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for path in self.dir.glob("*.md"):
+            try:
+                st = path.stat()
+                size = st.st_size
+                checks = path.with_suffix(".json")
+                if checks.exists():
+                    size += checks.stat().st_size
+            except OSError:
+                continue
+            entries.append((st.st_mtime, size, path))
+        entries.sort(reverse=True)
+        total = 0
+        for count, (_, size, path) in enumerate(entries, 1):
+            total += size
+            if count > self.max_entries or total > self.max_bytes:
+                path.unlink(missing_ok=True)
+                path.with_suffix(".json").unlink(missing_ok=True)
+
+
+def main(argv):
+    if len(argv) < 3 or argv[0] not in ("key", "get", "put") or (argv[0] != "key" and len(argv) != 4):
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+    command, runs_root = argv[0], argv[1]
+    if command == "key":
+        key = cache_key(runs_root, argv[2], argv[3:])
+        if key is None:
+            return 1
+        print(key)
+        return 0
+    cache = VerifyCache(runs_root)
+    if command == "get":
+        return 0 if cache.get(argv[2], argv[3]) else 1
+    cache.put(argv[2], argv[3])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""Parallel runner for structured (.json) verify plans. Uses only stdlib.
+
+A verify plan lists named shell checks, optionally depending on each other:
+
+    {
+      "jobs": 4,
+      "timeout": 600,
+      "checks": [
+        {"name": "lint",  "run": "ruff check ."},
+        {"name": "types", "run": "mypy src", "timeout": 120},
+        {"name": "unit",  "run": "pytest -q"},
+        {"name": "smoke", "run": "./smoke.sh", "needs": ["unit"]}
+      ]
+    }
+
+Checks whose dependencies have passed run concurrently (at most `jobs` at a
+time), each in its own process group under its own timeout. A check whose
+dependency did not pass is skipped. Results are written to <prefix>.md
+(PASS/FAIL first line, then one section per check, as more-loop expects from
+N-verify.md) and <prefix>.json (per-check status and duration, shown by the
+dashboard).
+
+Usage (called by more-loop's run_verify for .json verify files):
+    verify_runner.py <plan.json> <output-prefix>
+
+Exit status: 0 if every check passed, 1 if any did not, 2 for an invalid plan.
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from state_indexer import atomic_write
+
+DEFAULT_TIMEOUT = 600
+DEFAULT_JOBS = os.cpu_count() or 2
+# Only the tail of each check's output is kept in N-verify.md
+MAX_OUTPUT = 16 * 1024
+
+
+class PlanError(ValueError):
+    """The verify plan is malformed (bad JSON, unknown dependency, cycle...)."""
+
+
+def load_plan(path):
+    """Parse and validate a verify plan. Returns (checks, jobs)."""
+    try:
+        data = json.loads(Path(path).read_text())
+    except (OSError, ValueError) as e:
+        raise PlanError(f"cannot read verify plan: {e}") from e
+    if not isinstance(data, dict) or not isinstance(data.get("checks"), list) or not data["checks"]:
+        raise PlanError("verify plan needs a non-empty 'checks' list")
+
+    default_timeout = data.get("timeout", DEFAULT_TIMEOUT)
+    jobs = data.get("jobs", DEFAULT_JOBS)
+    if not isinstance(jobs, int) or jobs < 1:
+        raise PlanError("'jobs' must be a positive integer")
+
+    checks = []
+    names = set()
+    for raw in data["checks"]:
+        if not isinstance(raw, dict):
+            raise PlanError("every check must be an object")
+        name, run = raw.get("name"), raw.get("run")
+        if not isinstance(name, str) or not name:
+            raise PlanError("every check needs a 'name'")
+        if name in names:
+            raise PlanError(f"duplicate check name: {name}")
+        if not isinstance(run, str) or not run.strip():
+            raise PlanError(f"check '{name}' needs a 'run' command")
+        timeout = raw.get("timeout", default_timeout)
+        if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0:
+            raise PlanError(f"check '{name}' has an invalid timeout")
+        needs = raw.get("needs", [])
+        if not isinstance(needs, list) or not all(isinstance(n, str) for n in needs):
+            raise PlanError(f"check '{name}': 'needs' must be a list of check names")
+        names.add(name)
+        checks.append({"name": name, "run": run, "timeout": timeout, "needs": needs})
+
+    for check in checks:
+        for need in check["needs"]:
+            if need not in names:
+                raise PlanError(f"check '{check['name']}' needs unknown check '{need}'")
+    _check_acyclic(checks)
+    return checks, jobs
+
+
+def _check_acyclic(checks):
+    needs = {c["name"]: c["needs"] for c in checks}
+    done, visiting = set(), set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise PlanError(f"dependency cycle through check '{name}'")
+        visiting.add(name)
+        for need in needs[name]:
+            visit(need)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in needs:
+        visit(name)
+
+
+class VerifyRunner:
+    """Run a plan's checks concurrently, respecting dependencies and timeouts."""
+
+    def __init__(self, checks, jobs=DEFAULT_JOBS, cwd=None):
+        self.checks = checks
+        self.jobs = jobs
+        self.cwd = cwd
+        self.lock = threading.Lock()
+        self.running = {}
+        self.stopping = False
+
+    def run(self):
+        """Run every check; returns results in plan order."""
+        results = {}
+        pending = list(self.checks)
+        with ThreadPoolExecutor(self.jobs, thread_name_prefix="verify") as pool:
+            futures = {}
+            while pending or futures:
+                for check in list(pending):
+                    states = [results[n]["status"] if n in results else None for n in check["needs"]]
+                    if any(s not in (None, "pass") for s in states):
+                        pending.remove(check)
+                        results[check["name"]] = self.skipped(check)
+                    elif all(s == "pass" for s in states):
+                        pending.remove(check)
+                        futures[pool.submit(self.run_check, check)] = check
+                if not futures:
+                    continue
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    check = futures.pop(future)
+                    results[check["name"]] = future.result()
+        return [results[c["name"]] for c in self.checks]
+
+    def skipped(self, check):
+        return self.result(check, "skipped", None, 0.0, "Skipped: a dependency did not pass")
+
+    @staticmethod
+    def result(check, status, exit_code, duration, output):
+        return {
+            "name": check["name"],
+            "status": status,
+            "exit_code": exit_code,
+            "duration": round(duration, 3),
+            "timeout": check["timeout"],
+            "needs": check["needs"],
+            "output": output,
+        }
+
+    def run_check(self, check):
+        start = time.monotonic()
+        with self.lock:
+            if self.stopping:
+                return self.result(check, "skipped", None, 0.0, "Skipped: verify was stopped")
+            try:
+                # Own session: a timeout kills the check's whole process tree
+                proc = subprocess.Popen(
+                    ["bash", "-c", check["run"]], cwd=self.cwd,
+                    stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                    start_new_session=True,
+                )
+            except OSError as e:
+                return self.result(check, "error", None, 0.0, f"Failed to start: {e}")
+            self.running[check["name"]] = proc
+        try:
+            out, _ = proc.communicate(timeout=check["timeout"])
+            status = "pass" if proc.returncode == 0 else "fail"
+        except subprocess.TimeoutExpired:
+            self.kill(proc)
+            out, _ = proc.communicate()
+            status = "timeout"
+        finally:
+            with self.lock:
+                self.running.pop(check["name"], None)
+        output = out.decode(errors="replace")
+        if status == "timeout":
+            output += f"\n[timed out after {check['timeout']}s]"
+        return self.result(check, status, proc.returncode, time.monotonic() - start, output)
+
+    @staticmethod
+    def kill(proc):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    def terminate(self):
+        """Kill every running check and start no new ones."""
+        with self.lock:
+            self.stopping = True
+            procs = list(self.running.values())
+        for proc in procs:
+            self.kill(proc)
+
+
+def verdict(results):
+    """The N-verify.md first line: PASS/FAIL plus a one-line summary."""
+    failed = [r for r in results if r["status"] != "pass"]
+    if not failed:
+        return f"PASS — {len(results)}/{len(results)} checks passed"
+    names = ", ".join(f"{r['name']} ({r['status']})" for r in failed)
+    return f"FAIL — {len(failed)} of {len(results)} checks did not pass: {names}"
+
+
+def render_report(results, duration):
+    lines = [verdict(results), "", f"Wall time: {duration:.1f}s", "",
+             "| Check | Status | Duration |", "|-------|--------|----------|"]
+    for r in results:
+        lines.append(f"| {r['name']} | {r['status']} | {r['duration']:.1f}s |")
+    for r in results:
+        output = r["output"]
+        if len(output) > MAX_OUTPUT:
+            output = "[... output truncated ...]\n" + output[-MAX_OUTPUT:]
+        lines += ["", f"## {r['name']} ({r['status']}, {r['duration']:.1f}s)", "", "```",
+                  output.rstrip("\n"), "```"]
+    return "\n".join(lines) + "\n"
+
+
+def write_results(prefix, results, duration):
+    """Write <prefix>.md and <prefix>.json."""
+    prefix = Path(prefix)
+    summary = {
+        "status": "pass" if all(r["status"] == "pass" for r in results) else "fail",
+        "duration": round(duration, 3),
+        "checks": [{k: v for k, v in r.items() if k != "output"} for r in results],
+    }
+    # .json first: the .md change is what bumps the state index revision, so
+    # by the time the dashboard refetches the iteration both are in place
+    atomic_write(prefix.with_name(prefix.name + ".json"), json.dumps(summary, indent=2))
+    atomic_write(prefix.with_name(prefix.name + ".md"), render_report(results, duration))
+    return summary
+
+
+def main(argv):
+    if len(argv) != 2:
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+    plan_path, prefix = argv
+    try:
+        checks, jobs = load_plan(plan_path)
+    except PlanError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    runner = VerifyRunner(checks, jobs)
+
+    def on_signal(signum, _frame):
+        # more-loop's stop kills this process group; the checks have their own
+        runner.terminate()
+        sys.exit(128 + signum)
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    start = time.monotonic()
+    results = runner.run()
+    duration = time.monotonic() - start
+    summary = write_results(prefix, results, duration)
+    print(verdict(results))
+    for r in results:
+        print(f"  {r['name']:<20} {r['status']:<8} {r['duration']:.1f}s")
+    return 0 if summary["status"] == "pass" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))